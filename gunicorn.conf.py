@@ -0,0 +1,22 @@
+# gunicorn.conf.py
+import os
+
+# /eventos/flujo (Server-Sent Events) mantiene abierta cada conexión hasta
+# EVENTOS_DURACION_MAX segundos (300 por defecto). Con el worker síncrono
+# cada flujo bloquearía un proceso entero; con gthread sólo ocupa un hilo.
+#
+# Dimensionado:
+# - Cada worker atiende a la vez tantas peticiones como `threads`, flujos
+#   SSE incluidos. Con F usuarios con la app abierta (un flujo cada uno) y
+#   P peticiones simultáneas del resto de la API hace falta
+#   workers * threads >= F + P.
+# - workers: uno o dos por núcleo (WEB_CONCURRENCY). Más hilos por worker
+#   cuestan poca memoria porque los flujos pasan casi todo el tiempo
+#   esperando en su cola de eventos.
+# - Los flujos devuelven su conexión a la base al empezar, así que el pool
+#   de cada worker (DB_POOL_SIZE + DB_MAX_OVERFLOW) sólo cubre las P
+#   peticiones normales: unas P / workers. Con EVENTOS_BACKEND=postgres
+#   cada worker usa además una conexión fija para LISTEN.
+worker_class = 'gthread'
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+threads = int(os.getenv('GUNICORN_THREADS', 32))
@@ -5,6 +5,8 @@ from flask import current_app
 
 from alembic import context
 
+from api.particiones import es_particion
+
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -90,9 +92,16 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # the monthly partitions of ingresos/egresos (and detached ones) are not
+    # in the models: keep autogenerate from dropping them
+    def include_object(object, name, type_, reflected, compare_to):
+        return not (type_ == "table" and reflected and es_particion(name))
+
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    if conf_args.get("include_object") is None:
+        conf_args["include_object"] = include_object
 
     connectable = get_engine()
 
@@ -0,0 +1,42 @@
+"""egresos archivados e indice por plan de ahorro
+
+Revision ID: 1e7f3b9a0c25
+Revises: c5d2e8a4f613
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1e7f3b9a0c25'
+down_revision = 'c5d2e8a4f613'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_egresos_plan_ahorro_id', 'egresos', ['plan_ahorro_id'], unique=False)
+    op.create_table(
+        'egresos_archivados',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('monto', sa.Float(), nullable=False),
+        sa.Column('descripcion', sa.String(length=255), nullable=True),
+        sa.Column('fecha', sa.Date(), nullable=True),
+        sa.Column('usuario_id', sa.Integer(), nullable=False),
+        sa.Column('categoria_id', sa.Integer(), nullable=False),
+        sa.Column('plan_ahorro_id', sa.Integer(), nullable=True),
+        sa.Column('nombre_plan', sa.String(length=255), nullable=True),
+        sa.Column('archivado_en', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['categoria_id'], ['categorias.id'], ),
+        sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_egresos_archivados_usuario_id', 'egresos_archivados', ['usuario_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_egresos_archivados_usuario_id', table_name='egresos_archivados')
+    op.drop_table('egresos_archivados')
+    op.drop_index('ix_egresos_plan_ahorro_id', table_name='egresos')
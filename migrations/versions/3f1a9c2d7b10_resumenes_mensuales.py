@@ -0,0 +1,53 @@
+"""resumenes mensuales por usuario
+
+Revision ID: 3f1a9c2d7b10
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1a9c2d7b10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'resumenes_mensuales',
+        sa.Column('usuario_id', sa.Integer(), nullable=False),
+        sa.Column('anio', sa.Integer(), nullable=False),
+        sa.Column('mes', sa.Integer(), nullable=False),
+        sa.Column('ingresos', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('egresos', sa.Float(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id'], ),
+        sa.PrimaryKeyConstraint('usuario_id', 'anio', 'mes')
+    )
+    # Backfill (como `flask reconstruir-resumenes`): los totales de
+    # /usuarios/totales y /usuarios/datosmensuales salen sólo de esta tabla
+    ramas = []
+    for nombre, columna in (('ingresos', 'ingresos'), ('egresos', 'egresos')):
+        tabla = sa.table(nombre, sa.column('usuario_id', sa.Integer), sa.column('fecha', sa.Date),
+                         sa.column('monto', sa.Float))
+        ramas.append(sa.select([
+            tabla.c.usuario_id,
+            sa.cast(sa.extract('year', tabla.c.fecha), sa.Integer).label('anio'),
+            sa.cast(sa.extract('month', tabla.c.fecha), sa.Integer).label('mes'),
+            (tabla.c.monto if columna == 'ingresos' else sa.literal(0.0)).label('ingresos'),
+            (tabla.c.monto if columna == 'egresos' else sa.literal(0.0)).label('egresos'),
+        ]).where(tabla.c.fecha != None))
+    movimientos = sa.union_all(*ramas).alias('movimientos')
+    resumenes = sa.table('resumenes_mensuales', *[sa.column(c) for c in ('usuario_id', 'anio', 'mes', 'ingresos', 'egresos')])
+    op.execute(resumenes.insert().from_select(
+        ['usuario_id', 'anio', 'mes', 'ingresos', 'egresos'],
+        sa.select([movimientos.c.usuario_id, movimientos.c.anio, movimientos.c.mes,
+                   sa.func.sum(movimientos.c.ingresos), sa.func.sum(movimientos.c.egresos)])
+        .group_by(movimientos.c.usuario_id, movimientos.c.anio, movimientos.c.mes)
+    ))
+
+def downgrade():
+    op.drop_table('resumenes_mensuales')
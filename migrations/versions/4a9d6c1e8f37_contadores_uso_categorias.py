@@ -0,0 +1,49 @@
+"""contadores de uso en categorias e indices por categoria_id
+
+Revision ID: 4a9d6c1e8f37
+Revises: 1e7f3b9a0c25
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4a9d6c1e8f37'
+down_revision = '1e7f3b9a0c25'
+branch_labels = None
+depends_on = None
+
+categorias = sa.table(
+    'categorias',
+    sa.column('id', sa.Integer),
+    sa.column('is_default', sa.Boolean),
+    sa.column('usos_ingresos', sa.Integer),
+    sa.column('usos_egresos', sa.Integer),
+)
+
+
+def _contar(tabla):
+    movimientos = sa.table(tabla, sa.column('categoria_id', sa.Integer))
+    return sa.select([sa.func.count()]).where(movimientos.c.categoria_id == categorias.c.id).as_scalar()
+
+
+def upgrade():
+    op.add_column('categorias', sa.Column('usos_ingresos', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('categorias', sa.Column('usos_egresos', sa.Integer(), server_default='0', nullable=False))
+    op.create_index('ix_ingresos_categoria_id', 'ingresos', ['categoria_id'], unique=False)
+    op.create_index('ix_egresos_categoria_id', 'egresos', ['categoria_id'], unique=False)
+    # Backfill de las categorías propias (como `flask recalcular-usos-categorias`):
+    # con los contadores en 0, eliminar_categoria daría por libre una categoría en uso
+    op.execute(categorias.update().where(categorias.c.is_default == sa.false()).values(
+        usos_ingresos=_contar('ingresos'),
+        usos_egresos=_contar('egresos') + _contar('egresos_archivados'),
+    ))
+
+
+def downgrade():
+    op.drop_index('ix_egresos_categoria_id', table_name='egresos')
+    op.drop_index('ix_ingresos_categoria_id', table_name='ingresos')
+    op.drop_column('categorias', 'usos_egresos')
+    op.drop_column('categorias', 'usos_ingresos')
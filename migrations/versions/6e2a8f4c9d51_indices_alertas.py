@@ -0,0 +1,27 @@
+"""indices del feed de alertas y parcial de no leidas
+
+Revision ID: 6e2a8f4c9d51
+Revises: 9c3b7e2f5a14
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6e2a8f4c9d51'
+down_revision = '9c3b7e2f5a14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_alertas_usuario_creada_id', 'alertas', ['usuario_id', 'creada_en', 'id'], unique=False)
+    op.create_index('ix_alertas_usuario_no_leidas', 'alertas', ['usuario_id'], unique=False,
+                    postgresql_where=sa.text('NOT leida'), sqlite_where=sa.text('NOT leida'))
+
+
+def downgrade():
+    op.drop_index('ix_alertas_usuario_no_leidas', table_name='alertas')
+    op.drop_index('ix_alertas_usuario_creada_id', table_name='alertas')
@@ -0,0 +1,26 @@
+"""indices (usuario_id, fecha, id) para listados keyset
+
+Revision ID: 8b4e0d51c2a7
+Revises: 3f1a9c2d7b10
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b4e0d51c2a7'
+down_revision = '3f1a9c2d7b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_ingresos_usuario_fecha_id', 'ingresos', ['usuario_id', 'fecha', 'id'], unique=False)
+    op.create_index('ix_egresos_usuario_fecha_id', 'egresos', ['usuario_id', 'fecha', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_egresos_usuario_fecha_id', table_name='egresos')
+    op.drop_index('ix_ingresos_usuario_fecha_id', table_name='ingresos')
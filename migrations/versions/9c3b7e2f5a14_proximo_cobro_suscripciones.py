@@ -0,0 +1,28 @@
+"""proximo cobro de suscripciones
+
+Revision ID: 9c3b7e2f5a14
+Revises: 4a9d6c1e8f37
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c3b7e2f5a14'
+down_revision = '4a9d6c1e8f37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('suscripciones', sa.Column('proximo_cobro', sa.Date(), nullable=True))
+    op.create_index('ix_suscripciones_proximo_cobro_usuario', 'suscripciones',
+                    ['proximo_cobro', 'usuario_id'], unique=False)
+    # Las suscripciones existentes se inicializan en la primera `flask facturar-suscripciones`
+
+
+def downgrade():
+    op.drop_index('ix_suscripciones_proximo_cobro_usuario', table_name='suscripciones')
+    op.drop_column('suscripciones', 'proximo_cobro')
@@ -0,0 +1,37 @@
+"""indice por categoria_id en egresos_archivados
+
+Revision ID: a6d4e2f8c1b7
+Revises: f3c9a7e1b5d2
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6d4e2f8c1b7'
+down_revision = 'f3c9a7e1b5d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Lo usan la comprobación al eliminar una categoría y el recálculo de usos
+    op.create_index('ix_egresos_archivados_categoria_id', 'egresos_archivados', ['categoria_id'], unique=False)
+    # Los planes cancelados antes de esta versión descontaron sus egresos
+    # archivados de usos_egresos: se vuelven a contar (con el índice recién creado)
+    categorias = sa.table('categorias', sa.column('id', sa.Integer), sa.column('is_default', sa.Boolean),
+                          sa.column('usos_egresos', sa.Integer))
+
+    def contar(tabla):
+        movimientos = sa.table(tabla, sa.column('categoria_id', sa.Integer))
+        return sa.select([sa.func.count()]).where(movimientos.c.categoria_id == categorias.c.id).as_scalar()
+
+    op.execute(categorias.update().where(categorias.c.is_default == sa.false()).values(
+        usos_egresos=contar('egresos') + contar('egresos_archivados'),
+    ))
+
+
+def downgrade():
+    op.drop_index('ix_egresos_archivados_categoria_id', table_name='egresos_archivados')
@@ -0,0 +1,40 @@
+"""refrescos de vistas y ultima modificacion de cada resumen mensual
+
+Revision ID: b2e7c4a9d6f3
+Revises: a6d4e2f8c1b7
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2e7c4a9d6f3'
+down_revision = 'a6d4e2f8c1b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Meses con movimientos escritos después del último refresco: en ellos
+    # /usuarios/por_categoria no usa la vista. Las filas existentes cuentan
+    # como recién modificadas hasta el próximo `flask refrescar-gastos-categorias`
+    op.add_column('resumenes_mensuales', sa.Column('modificado_en', sa.DateTime(timezone=True), nullable=True))
+    op.execute('UPDATE resumenes_mensuales SET modificado_en = CURRENT_TIMESTAMP')
+
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    # Sin fila (vista aún no refrescada por el comando) se agrupa desde egresos
+    op.create_table(
+        'refrescos_vistas',
+        sa.Column('vista', sa.String(length=63), nullable=False),
+        sa.Column('refrescada_en', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('vista')
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_table('refrescos_vistas')
+    op.drop_column('resumenes_mensuales', 'modificado_en')
@@ -0,0 +1,49 @@
+"""importaciones de extractos y huella de movimientos
+
+Revision ID: c5d2e8a4f613
+Revises: 8b4e0d51c2a7
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d2e8a4f613'
+down_revision = '8b4e0d51c2a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('ingresos', sa.Column('huella', sa.String(length=64), nullable=True))
+    op.add_column('egresos', sa.Column('huella', sa.String(length=64), nullable=True))
+    op.create_index('ix_ingresos_usuario_huella', 'ingresos', ['usuario_id', 'huella'], unique=False)
+    op.create_index('ix_egresos_usuario_huella', 'egresos', ['usuario_id', 'huella'], unique=False)
+
+    op.create_table(
+        'importaciones',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('usuario_id', sa.Integer(), nullable=False),
+        sa.Column('nombre_archivo', sa.String(length=255), nullable=True),
+        sa.Column('estado', sa.String(length=20), nullable=False),
+        sa.Column('total_filas', sa.Integer(), nullable=True),
+        sa.Column('procesadas', sa.Integer(), nullable=True),
+        sa.Column('insertadas', sa.Integer(), nullable=True),
+        sa.Column('duplicadas', sa.Integer(), nullable=True),
+        sa.Column('errores', sa.Text(), nullable=True),
+        sa.Column('creada_en', sa.DateTime(), nullable=True),
+        sa.Column('finalizada_en', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    # Después de aplicar: `flask rellenar-huellas` para los movimientos existentes
+
+
+def downgrade():
+    op.drop_table('importaciones')
+    op.drop_index('ix_egresos_usuario_huella', table_name='egresos')
+    op.drop_index('ix_ingresos_usuario_huella', table_name='ingresos')
+    op.drop_column('egresos', 'huella')
+    op.drop_column('ingresos', 'huella')
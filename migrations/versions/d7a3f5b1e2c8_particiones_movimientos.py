@@ -0,0 +1,112 @@
+"""particiones mensuales por fecha de ingresos y egresos (PostgreSQL)
+
+Revision ID: d7a3f5b1e2c8
+Revises: 6e2a8f4c9d51
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from datetime import date
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a3f5b1e2c8'
+down_revision = '6e2a8f4c9d51'
+branch_labels = None
+depends_on = None
+
+# Reescribe ambas tablas: aplicar en una ventana de mantenimiento. En otros
+# motores (SQLite en desarrollo) no hace nada. Después, `flask
+# mantener-particiones` cada mes crea las particiones siguientes.
+
+# Meses por adelantado con partición al migrar
+MESES_FUTUROS = 3
+
+INDICES = {
+    'ingresos': [
+        ('ix_ingresos_usuario_fecha_id', ['usuario_id', 'fecha', 'id']),
+        ('ix_ingresos_usuario_huella', ['usuario_id', 'huella']),
+        ('ix_ingresos_categoria_id', ['categoria_id']),
+    ],
+    'egresos': [
+        ('ix_egresos_usuario_fecha_id', ['usuario_id', 'fecha', 'id']),
+        ('ix_egresos_usuario_huella', ['usuario_id', 'huella']),
+        ('ix_egresos_plan_ahorro_id', ['plan_ahorro_id']),
+        ('ix_egresos_categoria_id', ['categoria_id']),
+    ],
+}
+
+CLAVES_FORANEAS = {
+    'ingresos': [('usuario_id', 'usuarios'), ('categoria_id', 'categorias')],
+    'egresos': [('usuario_id', 'usuarios'), ('categoria_id', 'categorias'), ('plan_ahorro_id', 'planes_ahorro')],
+}
+
+
+def _mes_siguiente(mes):
+    return date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+
+def _secuencia(tabla):
+    return op.get_bind().execute(sa.text("SELECT pg_get_serial_sequence(:tabla, 'id')"), tabla=tabla).scalar()
+
+
+def _reemplazar(tabla, nueva, clave_primaria):
+    # La secuencia del id pertenece a la tabla vieja: se suelta antes de
+    # borrarla y se asigna a la nueva, que ya la usa por el DEFAULT copiado
+    secuencia = _secuencia(tabla)
+    op.execute(f'ALTER SEQUENCE {secuencia} OWNED BY NONE')
+    op.execute(f'INSERT INTO {nueva} SELECT * FROM {tabla}')
+    op.drop_table(tabla)
+    op.rename_table(nueva, tabla)
+    op.execute(f'ALTER SEQUENCE {secuencia} OWNED BY {tabla}.id')
+
+    # En una tabla particionada se declaran una vez y PostgreSQL los crea en cada partición
+    op.create_primary_key(f'{tabla}_pkey', tabla, clave_primaria)
+    for columna, referida in CLAVES_FORANEAS[tabla]:
+        op.create_foreign_key(f'{tabla}_{columna}_fkey', tabla, referida, [columna], ['id'])
+    for nombre, columnas in INDICES[tabla]:
+        op.create_index(nombre, tabla, columnas, unique=False)
+
+
+def _particionar(tabla):
+    # La clave de partición no admite NULL y debe formar parte de la clave primaria
+    op.execute(f'UPDATE {tabla} SET fecha = CURRENT_DATE WHERE fecha IS NULL')
+    op.execute(f'CREATE TABLE {tabla}_particionada (LIKE {tabla} INCLUDING DEFAULTS) PARTITION BY RANGE (fecha)')
+    op.execute(f'ALTER TABLE {tabla}_particionada ALTER COLUMN fecha SET NOT NULL')
+
+    primera = op.get_bind().execute(sa.text(f'SELECT min(fecha) FROM {tabla}')).scalar() or date.today()
+    ultima = date.today().replace(day=1)
+    for _ in range(MESES_FUTUROS):
+        ultima = _mes_siguiente(ultima)
+
+    mes = primera.replace(day=1)
+    while mes <= ultima:
+        siguiente = _mes_siguiente(mes)
+        op.execute(f"CREATE TABLE {tabla}_p{mes:%Y_%m} PARTITION OF {tabla}_particionada "
+                   f"FOR VALUES FROM ('{mes}') TO ('{siguiente}')")
+        mes = siguiente
+    op.execute(f'CREATE TABLE {tabla}_default PARTITION OF {tabla}_particionada DEFAULT')
+
+    _reemplazar(tabla, f'{tabla}_particionada', ['id', 'fecha'])
+
+
+def _desparticionar(tabla):
+    # Las particiones ya desacopladas con mantener-particiones no se reincorporan
+    op.execute(f'CREATE TABLE {tabla}_sin_particionar (LIKE {tabla} INCLUDING DEFAULTS)')
+    op.execute(f'ALTER TABLE {tabla}_sin_particionar ALTER COLUMN fecha DROP NOT NULL')
+    _reemplazar(tabla, f'{tabla}_sin_particionar', ['id'])
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for tabla in ('ingresos', 'egresos'):
+        _particionar(tabla)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for tabla in ('ingresos', 'egresos'):
+        _desparticionar(tabla)
@@ -0,0 +1,38 @@
+"""vista materializada de gasto mensual por categoria (PostgreSQL)
+
+Revision ID: e8b4c2d6f1a3
+Revises: d7a3f5b1e2c8
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8b4c2d6f1a3'
+down_revision = 'd7a3f5b1e2c8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # En otros motores /usuarios/por_categoria agrupa siempre desde egresos
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute(
+        "CREATE MATERIALIZED VIEW gastos_por_categoria_mensual AS "
+        "SELECT usuario_id, date_trunc('month', fecha)::date AS mes, categoria_id, "
+        "sum(monto) AS total, count(*) AS cantidad "
+        "FROM egresos GROUP BY usuario_id, date_trunc('month', fecha)::date, categoria_id "
+        "WITH DATA"
+    )
+    # Único: lo exige REFRESH MATERIALIZED VIEW CONCURRENTLY
+    op.create_index('ux_gastos_por_categoria_mensual', 'gastos_por_categoria_mensual',
+                    ['usuario_id', 'mes', 'categoria_id'], unique=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('DROP MATERIALIZED VIEW gastos_por_categoria_mensual')
@@ -0,0 +1,39 @@
+"""cola de importaciones en la base de datos
+
+Revision ID: f3c9a7e1b5d2
+Revises: e8b4c2d6f1a3
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3c9a7e1b5d2'
+down_revision = 'e8b4c2d6f1a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # El CSV se guarda con la importación para que `flask procesar-importaciones`
+    # la tome (y la retome tras un reinicio) desde otro proceso
+    op.add_column('importaciones', sa.Column('contenido', sa.Text(), nullable=True))
+    op.add_column('importaciones', sa.Column('intentos', sa.Integer(), nullable=True))
+    op.add_column('importaciones', sa.Column('actualizada_en', sa.DateTime(), nullable=True))
+    op.create_index('ix_importaciones_estado_id', 'importaciones', ['estado', 'id'], unique=False)
+
+    # Las que quedaron a medias en el pool de hilos del proceso web no tienen
+    # el CSV y no pueden retomarse
+    op.execute(
+        "UPDATE importaciones SET estado = 'fallida', finalizada_en = CURRENT_TIMESTAMP "
+        "WHERE estado IN ('pendiente', 'procesando')"
+    )
+
+
+def downgrade():
+    op.drop_index('ix_importaciones_estado_id', table_name='importaciones')
+    op.drop_column('importaciones', 'actualizada_en')
+    op.drop_column('importaciones', 'intentos')
+    op.drop_column('importaciones', 'contenido')
@@ -1,32 +1,39 @@
 # api/__init__.py
 
-from flask import Flask
-import os
+from flask import Flask, jsonify
 from dotenv import load_dotenv
 from flask_cors import CORS
 from .models import db
 from .routes import init_app  # Este es el que registra los blueprints
 from .commands import setup_commands
-
-def create_app():
-    # Crea la aplicación Flask
+from .instrumentacion import init_instrumentacion
+from .eventos import init_eventos
+from .cache_respuestas import init_cache_respuestas
+from .replica import init_replica
+from .json_rapido import init_json
+from .pool_conexiones import init_pool
+from .config import configurar
+from .utils import APIException
+
+def create_app(configuracion=None):
+    # Crea la aplicación Flask; `configuracion` sobrescribe valores (tests, benchmark)
     app = Flask(__name__)
     app.url_map.strict_slashes = False
 
-    # Configuración directa desde aquí (ya no desde config.py)
-    db_url = os.getenv("DATABASE_URL")
-    if db_url is not None:
-        app.config['SQLALCHEMY_DATABASE_URI'] = db_url.replace(
-            "postgres://", "postgresql://")
-
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    app.config['SECRET_KEY'] = os.getenv("FLASK_APP_KEY")  # Esto también funcionará para JWT
+    # Configuración desde el entorno (api/config.py)
+    configurar(app, configuracion)
 
     # Inicializa la base de datos
     db.init_app(app)
+    init_instrumentacion(app)
+    init_eventos(app)
+    init_cache_respuestas(app)
+    init_replica(app)
+    init_json(app)
+    init_pool(app)
 
     # Configura CORS
-    CORS(app)
+    CORS(app, expose_headers=['X-Siguiente-Cursor', 'Server-Timing', 'ETag'])
 
 
     # Configura los comandos personalizados
@@ -35,4 +42,9 @@ def create_app():
     # Registra las rutas
     init_app(app)
 
+    # Errores de validación como JSON
+    @app.errorhandler(APIException)
+    def handle_invalid_usage(error):
+        return jsonify(error.to_dict()), error.status_code
+
     return app
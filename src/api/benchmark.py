@@ -0,0 +1,405 @@
+# api/benchmark.py
+import json
+import os
+import re
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timezone
+from flask import jsonify
+from api import create_app, json_rapido
+from api.json_rapido import filas_a_dicts
+from api.models import db, Usuario, Egreso, PlanAhorro, Alerta
+from api.datos_prueba import CONTRASENA_PRUEBA, sembrar
+from api.pool_conexiones import opciones_engine
+
+# Rutas que no se miden: el flujo SSE no termina y static no es de la API
+EXCLUIDAS = {'eventos.flujo_de_eventos', 'static'}
+
+# Clave de /api/metricas/pool en la app del benchmark
+METRICAS_CLAVE = 'benchmark'
+
+CSV_IMPORTACION = "fecha,descripcion,monto\n2024-01-05,Supermercado,-45.10\n2024-01-06,Sueldo,2500\n"
+
+_SERVER_TIMING_DB = re.compile(r'db;dur=([\d.]+);desc="(\d+) sentencias"')
+
+
+def _caso(metodo, ruta, cuerpo=None, preparar=None, datos=None):
+    # cuerpo(ctx) -> JSON; preparar(ctx, cliente) agrega a ctx lo que la petición
+    # necesita (fuera de la medición); datos: cuerpo crudo en lugar de JSON
+    return {'metodo': metodo, 'ruta': ruta, 'cuerpo': cuerpo, 'preparar': preparar, 'datos': datos}
+
+
+def _crear(ctx, cliente, ruta, cuerpo, clave, envoltura=None):
+    # Guarda en ctx[clave] el id creado; algunas rutas lo devuelven dentro de `envoltura`
+    datos = cliente.post(ruta, json=cuerpo, headers=ctx['headers']).get_json() or {}
+    ctx[clave] = (datos.get(envoltura) or {} if envoltura else datos).get('id')
+
+
+def _nuevo_plan(ctx, cliente):
+    respuesta = cliente.post('/plandeahorro/agregarplan', headers=ctx['headers'], json={
+        'nombre_plan': f"Bench {ctx['i']}", 'monto_objetivo': 1000, 'monto_inicial': 10,
+        'fecha_inicio': ctx['hoy'], 'fecha_objetivo': '2099-01-01'})
+    ctx['plan_nuevo'] = ((respuesta.get_json() or {}).get('nuevo_plan') or {}).get('id')
+
+
+def _nuevo_usuario(ctx, cliente):
+    correo = f"baja{ctx['i']}@bench.local"
+    cliente.post('/usuarios/signup', json={'nombre_usuario': f"baja{ctx['i']}", 'correo': correo, 'contrasena': 'x'})
+    ctx['usuario_baja'] = (cliente.post('/usuarios/login', json={'correo': correo, 'contrasena': 'x'})
+                           .get_json() or {}).get('usuario', {}).get('id')
+
+
+def _movimiento(ctx):
+    return {'monto': 12.5, 'descripcion': f"bench {ctx['i']}", 'fecha': ctx['hoy'],
+            'categoria_id': ctx['categoria_id'], 'usuario_id': ctx['usuario_id']}
+
+
+# Un caso por endpoint de los blueprints, identificado por su nombre en Flask
+CASOS = {
+    'alertas.obtener_alertas': _caso('GET', '/alertas/alertas'),
+    'alertas.contar_no_leidas': _caso('GET', '/alertas/no_leidas'),
+    'alertas.marcar_leidas': _caso('PUT', '/alertas/leidas', lambda ctx: {'ids': ctx['alertas']}),
+    'api.obtener_metricas_pool': _caso('GET', '/api/metricas/pool'),
+    'categorias.listar_categorias': _caso('GET', '/categorias/traertodas'),
+    'categorias.crear_categoria': _caso('POST', '/categorias/categoria',
+                                        lambda ctx: {'nombre': f"Bench {ctx['i']}", 'icono': f"b{ctx['i']}"}),
+    'categorias.eliminar_categoria': _caso(
+        'DELETE', '/categorias/categoria', lambda ctx: {'id': ctx['categoria_nueva']},
+        lambda ctx, c: _crear(ctx, c, '/categorias/categoria',
+                              {'nombre': f"Baja {ctx['i']}", 'icono': f"x{ctx['i']}"}, 'categoria_nueva')),
+    'categorias.insertar_categorias_por_defecto': _caso('POST', '/categorias/default'),
+    'categorias.eliminar_todas_las_categorias': _caso('DELETE', '/categorias/eliminartodas'),
+    'egresos.obtener_egresos': _caso('GET', '/egresos/egresos'),
+    'egresos.crear_egreso': _caso('POST', '/egresos/agrega_egreso', _movimiento),
+    'egresos.crear_egresos_lote': _caso('POST', '/egresos/lote', lambda ctx: [_movimiento(ctx)] * 100),
+    'ingresos.obtener_ingresos': _caso('GET', '/ingresos/ingresos'),
+    'ingresos.crear_ingreso': _caso('POST', '/ingresos/ingreso', _movimiento),
+    'ingresos.crear_ingresos_lote': _caso('POST', '/ingresos/lote', lambda ctx: [_movimiento(ctx)] * 100),
+    'fondos_emergencia.obtener_fondo_emergencia_activo': _caso('GET', '/fondos_emergencia/fondos_emergencia/activo'),
+    'fondos_emergencia.crear_fondo_emergencia': _caso('POST', '/fondos_emergencia/fondos_emergencia',
+                                                      lambda ctx: {'monto': 1000, 'razon': 'bench'}),
+    'fondos_emergencia.eliminar_fondo_emergencia': _caso(
+        'DELETE', '/fondos_emergencia/fondos_emergencia', lambda ctx: {'id': ctx['fondo_nuevo']},
+        lambda ctx, c: _crear(ctx, c, '/fondos_emergencia/fondos_emergencia',
+                              {'monto': 500, 'razon': 'baja'}, 'fondo_nuevo')),
+    'importaciones.importar_csv': _caso('POST', '/importaciones/csv', datos=CSV_IMPORTACION),
+    'importaciones.estado_importacion': _caso('GET', '/importaciones/{importacion_id}'),
+    'plandeahorro.obtener_planes_ahorro': _caso('GET', '/plandeahorro/traerplan'),
+    'plandeahorro.obtener_proyeccion_planes': _caso('GET', '/plandeahorro/proyeccion'),
+    'plandeahorro.agregar_plan_ahorro': _caso('POST', '/plandeahorro/agregarplan', lambda ctx: {
+        'nombre_plan': f"Plan {ctx['i']}", 'monto_objetivo': 5000, 'monto_inicial': 100,
+        'fecha_inicio': ctx['hoy'], 'fecha_objetivo': '2099-01-01'}),
+    'plandeahorro.registrar_deposito_plan': _caso('POST', '/plandeahorro/depositar', lambda ctx: {
+        'plan_id': ctx['plan_id'], 'monto_ahorro': 25, 'fecha': ctx['hoy']}),
+    'plandeahorro.editar_plan_ahorro': _caso('PUT', '/plandeahorro/editarplan', lambda ctx: {
+        'id': ctx['plan_id'], 'nombre_plan': f"Editado {ctx['i']}"}),
+    'plandeahorro.eliminar_plan_ahorro': _caso(
+        'DELETE', '/plandeahorro/eliminar_plan_ahorro', lambda ctx: {'plan_ahorro_id': ctx['plan_nuevo']}, _nuevo_plan),
+    'suscripciones.obtener_suscripciones': _caso('GET', '/suscripciones/suscripcion'),
+    'suscripciones.crear_suscripcion': _caso('POST', '/suscripciones/suscripcion', lambda ctx: {
+        'nombre': f"Bench {ctx['i']}", 'costo': 9.99, 'frecuencia': 'mensual', 'fecha_inicio': ctx['hoy']}),
+    'suscripciones.eliminar_suscripcion': _caso(
+        'DELETE', '/suscripciones/suscripcion', lambda ctx: {'id': ctx['suscripcion_nueva']},
+        lambda ctx, c: _crear(ctx, c, '/suscripciones/suscripcion', {
+            'nombre': 'Baja', 'costo': 1, 'frecuencia': 'mensual', 'fecha_inicio': ctx['hoy']},
+            'suscripcion_nueva', 'suscripcion')),
+    # Sólo se paga un periodo vencido: una suscripción nueva (vence hoy) por repetición
+    'suscripciones.pagar_suscripcion': _caso(
+        'POST', '/suscripciones/suscripcion/pagar', lambda ctx: {'id': ctx['suscripcion_pago']},
+        lambda ctx, c: _crear(ctx, c, '/suscripciones/suscripcion', {
+            'nombre': f"Pago {ctx['i']}", 'costo': 5, 'frecuencia': 'semanal', 'fecha_inicio': ctx['hoy']},
+            'suscripcion_pago', 'suscripcion')),
+    'usuarios.obtener_datos_mensuales': _caso('POST', '/usuarios/datosmensuales',
+                                              lambda ctx: {'meses': ['Enero', 'Febrero', 'Marzo']}),
+    'usuarios.exportar_historial': _caso('GET', '/usuarios/exportar'),
+    'usuarios.login': _caso('POST', '/usuarios/login',
+                            lambda ctx: {'correo': ctx['correo'], 'contrasena': CONTRASENA_PRUEBA}),
+    'usuarios.signup': _caso('POST', '/usuarios/signup', lambda ctx: {
+        'nombre_usuario': f"alta{ctx['i']}", 'correo': f"alta{ctx['i']}@bench.local", 'contrasena': 'x'}),
+    'usuarios.obtener_reportes': _caso('GET', '/usuarios/reportes'),
+    'usuarios.obtener_totales_usuario': _caso('GET', '/usuarios/totales'),
+    'usuarios.obtener_gastos_por_categoria': _caso('GET', '/usuarios/por_categoria'),
+    'usuarios.obtener_usuario': _caso('GET', '/usuarios/usuario/{usuario_id}'),
+    'usuarios.eliminar_usuario': _caso('DELETE', '/usuarios/usuario/{usuario_baja}', preparar=_nuevo_usuario),
+    'usuarios.obtener_usuarios': _caso('GET', '/usuarios/usuarios'),
+    'usuarios.actualizar_usuario': _caso('PUT', '/usuarios/usuarios',
+                                         lambda ctx: {'id': ctx['usuario_id'], 'moneda': 'USD'}),
+}
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def _contexto(cliente, hoy):
+    # Usuario sembrado n.º 1 y los ids que necesitan los casos
+    usuario = Usuario.query.filter_by(correo='bench1@prueba.local').one()
+    token = cliente.post('/usuarios/login', json={'correo': usuario.correo, 'contrasena': CONTRASENA_PRUEBA}).get_json()['token']
+    ctx = {
+        'usuario_id': usuario.id,
+        'correo': usuario.correo,
+        # La clave de /api/metricas/pool viaja con todas las peticiones; las demás rutas la ignoran
+        'headers': {'Authorization': f'Bearer {token}', 'X-Metricas-Clave': METRICAS_CLAVE},
+        'hoy': hoy.isoformat(),
+        # Una categoría que el usuario ya usa: /categorias/eliminartodas no la borra
+        'categoria_id': db.session.query(Egreso.categoria_id).filter_by(usuario_id=usuario.id).limit(1).scalar(),
+        'alertas': [id for (id,) in db.session.query(Alerta.id).filter_by(usuario_id=usuario.id).limit(20)],
+    }
+    plan = PlanAhorro.query.filter_by(usuario_id=usuario.id).first()
+    if plan is None:
+        _nuevo_plan(dict(ctx, i=0), cliente)
+        plan = PlanAhorro.query.filter_by(usuario_id=usuario.id).first()
+    ctx['plan_id'] = plan.id
+    respuesta = cliente.post('/importaciones/csv', data=CSV_IMPORTACION, headers=ctx['headers'])
+    ctx['importacion_id'] = respuesta.get_json()['importacion']['id']
+    return ctx
+
+
+def _medir(cliente, ctx, caso, repeticiones):
+    tiempos, db_ms, sentencias, estados = [], [], [], set()
+    for i in range(repeticiones + 1):  # la primera es de calentamiento
+        ctx['i'] = f"{time.monotonic_ns()}"[-9:] + str(i)
+        if caso['preparar']:
+            caso['preparar'](ctx, cliente)
+        ruta = caso['ruta'].format(**ctx)
+        opciones = {'headers': ctx['headers']}
+        if caso['cuerpo']:
+            opciones['json'] = caso['cuerpo'](ctx)
+        elif caso['datos']:
+            opciones['data'] = caso['datos']
+
+        inicio = time.perf_counter()
+        respuesta = cliente.open(ruta, method=caso['metodo'], **opciones)
+        respuesta.get_data()  # incluye el cuerpo de las respuestas en streaming
+        transcurrido = (time.perf_counter() - inicio) * 1000
+        if i == 0:
+            continue
+
+        tiempos.append(transcurrido)
+        estados.add(respuesta.status_code)
+        for valor in respuesta.headers.getlist('Server-Timing'):
+            encontrado = _SERVER_TIMING_DB.match(valor)
+            if encontrado:
+                db_ms.append(float(encontrado.group(1)))
+                sentencias.append(int(encontrado.group(2)))
+
+    return {
+        'metodo': caso['metodo'],
+        'ruta': caso['ruta'],
+        'estados': sorted(estados),
+        'media_ms': round(statistics.mean(tiempos), 3),
+        'p50_ms': round(_percentil(tiempos, 50), 3),
+        'p95_ms': round(_percentil(tiempos, 95), 3),
+        'db_ms': round(statistics.mean(db_ms), 3) if db_ms else None,
+        'sentencias': max(sentencias) if sentencias else None,
+    }
+
+
+def _crear_app(url):
+    return create_app({
+        'SQLALCHEMY_DATABASE_URI': url,
+        'SQLALCHEMY_ENGINE_OPTIONS': opciones_engine(url),
+        'SECRET_KEY': os.getenv('FLASK_APP_KEY') or 'benchmark',
+        'TESTING': True,
+        # Un endpoint roto se mide como 500 en vez de abortar el benchmark
+        'PROPAGATE_EXCEPTIONS': False,
+        'SQL_PRESUPUESTO_ESTRICTO': False,
+        # Se mide el trabajo real de cada ruta, no los aciertos de la caché
+        'CACHE_RESPUESTAS_BACKEND': 'ninguno',
+        'METRICAS_CLAVE': METRICAS_CLAVE,
+    })
+
+
+def _escenario(url, usuarios, meses, movimientos_por_mes, repeticiones, semilla):
+    app = _crear_app(url)
+    hoy = date.today()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        filas = sembrar(usuarios, meses, movimientos_por_mes, semilla=semilla, prefijo='bench', hoy=hoy)
+        cliente = app.test_client()
+        ctx = _contexto(cliente, hoy)
+
+    # Cada petición con su propio contexto, como en producción
+    resultados = {nombre: _medir(cliente, ctx, caso, repeticiones) for nombre, caso in CASOS.items()}
+    sin_cubrir = sorted({regla.endpoint for regla in app.url_map.iter_rules()} - set(CASOS) - EXCLUIDAS)
+    with app.app_context():
+        db.engine.dispose()
+    return {'usuarios': usuarios, 'meses': meses, 'filas': dict(filas), 'endpoints': resultados}, sin_cubrir
+
+
+def medir_serializacion(filas=5000, repeticiones=5, url=None):
+    """Filas por segundo al listar egresos con cada combinación de lectura y serializador.
+
+    Compara entidades del ORM + to_dict() + jsonify() (el camino anterior
+    de los listados) con filas de columnas + json_rapido (el actual) y las
+    dos combinaciones intermedias. Siembra un usuario con `filas` egresos
+    en una base temporal (o en `url`, ¡se borran sus tablas!) y devuelve
+    {variante: {'filas', 'ms', 'filas_por_segundo'}} con la mejor de
+    `repeticiones` ejecuciones.
+    """
+    with tempfile.TemporaryDirectory() as directorio:
+        app = _crear_app(url or f"sqlite:///{os.path.join(directorio, 'serializacion.db')}")
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            sembrar(1, meses=max(1, filas // 200), movimientos_por_mes=200, semilla=42, prefijo='bench')
+            usuario_id = db.session.query(Usuario.id).filter_by(correo='bench1@prueba.local').scalar()
+
+            def entidades():
+                return Egreso.query.filter_by(usuario_id=usuario_id).order_by(Egreso.id).limit(filas).all()
+
+            def columnas():
+                return db.session.query(
+                    Egreso.id, Egreso.monto, Egreso.descripcion, Egreso.fecha, Egreso.categoria_id, Egreso.usuario_id
+                ).filter(Egreso.usuario_id == usuario_id).order_by(Egreso.id).limit(filas).all()
+
+            variantes = {
+                'entidades_jsonify': lambda: jsonify([e.to_dict() for e in entidades()]).get_data(),
+                'entidades_json_rapido': lambda: json_rapido.dumps([e.to_dict() for e in entidades()]),
+                'columnas_jsonify': lambda: jsonify(filas_a_dicts(columnas())).get_data(),
+                'columnas_json_rapido': lambda: json_rapido.dumps(filas_a_dicts(columnas())),
+            }
+            resultado = {}
+            for nombre, variante in variantes.items():
+                tiempos = []
+                for _ in range(repeticiones):
+                    db.session.expunge_all()  # sin reutilizar entidades del mapa de identidad
+                    inicio = time.perf_counter()
+                    variante()
+                    tiempos.append(time.perf_counter() - inicio)
+                leidas = len(columnas())
+                resultado[nombre] = {
+                    'filas': leidas,
+                    'ms': round(min(tiempos) * 1000, 3),
+                    'filas_por_segundo': round(leidas / min(tiempos)),
+                }
+            db.session.remove()
+            db.engine.dispose()
+    return resultado
+
+
+def _totales_en_python(usuario):
+    # Camino anterior de calcular_totales: todas las filas del usuario como entidades
+    return sum(i.monto for i in usuario.ingresos), sum(e.monto for e in usuario.egresos)
+
+
+def medir_totales(tamanos=(1000, 10000, 50000), repeticiones=5, url=None):
+    """Latencia y memoria de los totales del usuario según el largo de su historial.
+
+    Por cada tamaño siembra un usuario con unos `tamano` egresos (200 por
+    mes) en una base temporal (o en `url`, ¡se borran sus tablas!) y compara
+    sumar las entidades en Python (el camino anterior) con
+    Usuario.calcular_totales() (SUM sobre resumenes_mensuales). Devuelve
+    una lista de {'egresos', 'meses', variante: {'ms', 'memoria_kb'}} con
+    la mejor de `repeticiones` ejecuciones y el pico de memoria (tracemalloc).
+    """
+    resultado = []
+    with tempfile.TemporaryDirectory() as directorio:
+        for tamano in tamanos:
+            meses = max(1, tamano // 200)
+            app = _crear_app(url or f"sqlite:///{os.path.join(directorio, f'totales_{tamano}.db')}")
+            with app.app_context():
+                db.drop_all()
+                db.create_all()
+                filas = sembrar(1, meses=meses, movimientos_por_mes=200, semilla=42, prefijo='bench')
+                usuario_id = db.session.query(Usuario.id).filter_by(correo='bench1@prueba.local').scalar()
+
+                variantes = {
+                    'suma_en_python': lambda usuario: _totales_en_python(usuario),
+                    'resumen_mensual': lambda usuario: usuario.calcular_totales(),
+                }
+                medida = {'egresos': filas['egresos'], 'meses': meses}
+                for nombre, variante in variantes.items():
+                    tiempos, picos = [], []
+                    for _ in range(repeticiones):
+                        db.session.expunge_all()  # sin reutilizar entidades del mapa de identidad
+                        usuario = db.session.query(Usuario).get(usuario_id)
+                        tracemalloc.start()
+                        inicio = time.perf_counter()
+                        variante(usuario)
+                        tiempos.append(time.perf_counter() - inicio)
+                        picos.append(tracemalloc.get_traced_memory()[1])
+                        tracemalloc.stop()
+                    medida[nombre] = {'ms': round(min(tiempos) * 1000, 3), 'memoria_kb': round(min(picos) / 1024)}
+                resultado.append(medida)
+                db.session.remove()
+                db.engine.dispose()
+    return resultado
+
+
+def _version():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def ejecutar_benchmark(tamanos, meses, movimientos_por_mes=30, repeticiones=20, url=None, semilla=42):
+    """Mide todos los endpoints con el cliente de pruebas de Flask.
+
+    Por cada combinación de `tamanos` (usuarios sembrados) y `meses` (largo
+    del historial de cada usuario) crea una base nueva, la siembra y hace
+    `repeticiones` peticiones a cada endpoint con el usuario n.º 1. Con
+    `url` se usa esa base (¡se borran sus tablas!); si no, un SQLite
+    temporal por escenario. Devuelve el resultado como diccionario.
+    """
+    resultado = {
+        'fecha': datetime.now(timezone.utc).isoformat(),
+        'version': _version(),
+        'repeticiones': repeticiones,
+        'escenarios': [],
+    }
+    with tempfile.TemporaryDirectory() as directorio:
+        for usuarios in tamanos:
+            for m in meses:
+                destino = url or f"sqlite:///{os.path.join(directorio, f'bench_{usuarios}_{m}.db')}"
+                escenario, sin_cubrir = _escenario(destino, usuarios, m, movimientos_por_mes, repeticiones, semilla)
+                resultado['escenarios'].append(escenario)
+                resultado['sin_cubrir'] = sin_cubrir
+                resultado['motor'] = destino.split(':', 1)[0]
+    return resultado
+
+
+def comparar(actual, anterior, umbral=0.2, minimo_ms=1.0):
+    """Regresiones de `actual` frente a `anterior` (mismo escenario y endpoint).
+
+    Una regresión es un p50 que crece más de `umbral` (proporción) y más de
+    `minimo_ms`, o un aumento en el número de sentencias SQL.
+    """
+    previos = {(e['usuarios'], e['meses']): e['endpoints'] for e in anterior.get('escenarios', [])}
+    regresiones = []
+    for escenario in actual['escenarios']:
+        base = previos.get((escenario['usuarios'], escenario['meses']), {})
+        for nombre, medida in escenario['endpoints'].items():
+            previa = base.get(nombre)
+            if previa is None:
+                continue
+            crecio = medida['p50_ms'] - previa['p50_ms']
+            mas_sql = (medida['sentencias'] or 0) > (previa['sentencias'] or 0)
+            if mas_sql or (crecio > minimo_ms and crecio > previa['p50_ms'] * umbral):
+                regresiones.append({
+                    'usuarios': escenario['usuarios'],
+                    'meses': escenario['meses'],
+                    'endpoint': nombre,
+                    'p50_anterior_ms': previa['p50_ms'],
+                    'p50_ms': medida['p50_ms'],
+                    'sentencias_anteriores': previa['sentencias'],
+                    'sentencias': medida['sentencias'],
+                })
+    return regresiones
+
+
+def guardar(resultado, ruta):
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+
+
+def cargar(ruta):
+    with open(ruta, encoding='utf-8') as archivo:
+        return json.load(archivo)
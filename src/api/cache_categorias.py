@@ -0,0 +1,74 @@
+# api/cache_categorias.py
+import threading
+import time
+from flask import current_app
+from api.models import db, Categoria
+
+# Categorías predeterminadas cacheadas en el proceso. Cambian muy poco
+# (sólo con /categorias/default o al eliminarlas), así que se invalidan
+# explícitamente desde esas rutas y, para los demás workers de gunicorn,
+# caducan a los CACHE_CATEGORIAS_TTL segundos.
+_lock = threading.Lock()
+_cache = {'cargado_en': None, 'predeterminadas': [], 'por_nombre': {}}
+
+
+def _serializar(categoria):
+    return {
+        'id': categoria.id,
+        'nombre': categoria.nombre,
+        'icono': categoria.icono,
+        'is_default': categoria.is_default,
+    }
+
+
+def _vigente():
+    ttl = current_app.config.get('CACHE_CATEGORIAS_TTL', 300)
+    cargado_en = _cache['cargado_en']
+    return cargado_en is not None and time.monotonic() - cargado_en < ttl
+
+
+def _cargar():
+    predeterminadas = [_serializar(c) for c in
+                       Categoria.query.filter_by(is_default=True).order_by(Categoria.nombre)]
+    with _lock:
+        _cache['predeterminadas'] = predeterminadas
+        _cache['por_nombre'] = {c['nombre']: c for c in predeterminadas}
+        _cache['cargado_en'] = time.monotonic()
+
+
+def invalidar_categorias():
+    """Descarta la caché; llamarla después de crear o eliminar categorías."""
+    with _lock:
+        _cache['cargado_en'] = None
+
+
+def categorias_predeterminadas():
+    """Lista (ordenada por nombre) de las categorías predeterminadas serializadas."""
+    if not _vigente():
+        _cargar()
+    return _cache['predeterminadas']
+
+
+def ids_predeterminadas():
+    """Conjunto de ids de las categorías predeterminadas."""
+    return frozenset(c['id'] for c in categorias_predeterminadas())
+
+
+def id_categoria(nombre):
+    """Id de una categoría predeterminada bien conocida ("Plan de ahorro", "Suscripciones"...)."""
+    if not _vigente():
+        _cargar()
+    categoria = _cache['por_nombre'].get(nombre)
+    if categoria is None:
+        # Puede haberse creado en otro worker después de la última carga
+        categoria_id = db.session.query(Categoria.id).filter_by(nombre=nombre).scalar()
+        if categoria_id is not None:
+            invalidar_categorias()
+        return categoria_id
+    return categoria['id']
+
+
+def categorias_de_usuario(usuario_id):
+    """Predeterminadas (desde la caché) más las del usuario, ordenadas por nombre."""
+    propias = [_serializar(c) for c in Categoria.query.filter_by(user_id=usuario_id)]
+    return sorted(categorias_predeterminadas() + propias, key=lambda c: c['nombre'])
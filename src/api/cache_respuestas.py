@@ -0,0 +1,245 @@
+# api/cache_respuestas.py
+import hashlib
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+from flask import current_app, has_app_context, make_response, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from api.models import db, Usuario
+from api.replica import escrituras_recientes, registrar_escrituras
+
+try:
+    import redis
+except ImportError:  # Dependencia opcional: sólo para CACHE_RESPUESTAS_BACKEND=redis
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Caché de respuestas de lectura por usuario. La clave incluye una versión
+# de los datos del usuario que se incrementa al confirmar cualquier
+# transacción que los modifique: las entradas viejas no se borran, dejan de
+# consultarse. Una petición cuya versión no cambió se sirve sin tocar la
+# base de datos (o con 304 si el navegador ya tiene esa versión).
+# Los mismos usuarios modificados se anotan en el registro de escrituras
+# recientes de api/replica.py, para leer de la primaria justo después.
+
+
+class CacheMemoria:
+    """LRU en el proceso, con caducidad por entrada.
+
+    Sólo para un único proceso (desarrollo, tests): cada worker de gunicorn
+    tendría la suya y sólo vería las escrituras hechas en él mismo, así que
+    las de otros workers o de comandos flask no invalidarían sus respuestas
+    hasta caducar la entrada (CACHE_RESPUESTAS_TTL). Nunca se elige por
+    defecto; con varios workers usar redis.
+    """
+
+    def __init__(self, max_entradas=10000, ttl=60):
+        self._lock = threading.Lock()
+        self._max_entradas = max_entradas
+        self._ttl = ttl
+        self._instancia = os.urandom(4).hex()
+        self._entradas = OrderedDict()
+        self._versiones = OrderedDict()
+        # Versiones crecientes en todo el proceso. Un usuario sin versión
+        # registrada (nunca escrito u olvidado al llenarse) toma `_piso`, que
+        # avanza al olvidar a alguien: así nunca reaparece una versión vieja.
+        self._contador = itertools.count(1)
+        self._piso = 0
+
+    def version(self, usuario_id):
+        with self._lock:
+            numero = self._versiones.get(usuario_id, self._piso)
+        # El proceso (los contadores de cada worker coinciden por azar) y la
+        # ventana de TTL: un ETag de aquí no valida más allá de lo que dura
+        # una entrada, porque las escrituras de otros procesos no se ven
+        return f"{os.getpid()}.{self._instancia}.{numero}.{int(time.time() // self._ttl)}"
+
+    def incrementar_versiones(self, usuario_ids):
+        with self._lock:
+            for usuario_id in usuario_ids:
+                self._versiones[usuario_id] = next(self._contador)
+                self._versiones.move_to_end(usuario_id)
+            while len(self._versiones) > self._max_entradas:
+                self._versiones.popitem(last=False)
+                self._piso = next(self._contador)
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            vence, valor = entrada
+            if vence < time.monotonic():
+                del self._entradas[clave]
+                return None
+            self._entradas.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave, valor, ttl):
+        with self._lock:
+            self._entradas[clave] = (time.monotonic() + ttl, valor)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self._max_entradas:
+                self._entradas.popitem(last=False)
+
+
+class CacheRedis:
+    """Caché compartida por todos los workers y comandos en un Redis.
+
+    Las versiones se guardan sin caducidad y las respuestas con TTL: el
+    servidor debe usar una política de desalojo volatile-* (por ejemplo
+    volatile-lru) para que nunca se descarte una versión.
+    """
+
+    PREFIJO = 'respuestas:'
+
+    def __init__(self, url):
+        if redis is None:
+            raise RuntimeError("CACHE_RESPUESTAS_BACKEND=redis requiere el paquete 'redis'")
+        self._cliente = redis.Redis.from_url(url)
+
+    def version(self, usuario_id):
+        return int(self._cliente.get(f'{self.PREFIJO}version:{usuario_id}') or 0)
+
+    def incrementar_versiones(self, usuario_ids):
+        tuberia = self._cliente.pipeline(transaction=False)
+        for usuario_id in usuario_ids:
+            tuberia.incr(f'{self.PREFIJO}version:{usuario_id}')
+        tuberia.execute()
+
+    def obtener(self, clave):
+        return self._cliente.get(self.PREFIJO + clave)
+
+    def guardar(self, clave, valor, ttl):
+        self._cliente.set(self.PREFIJO + clave, valor, ex=ttl)
+
+
+def cache():
+    """Backend de caché de la aplicación en curso (None si está desactivada)."""
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('cache_respuestas')
+
+
+def _siguiendo_modificados():
+    # Sólo se anotan los usuarios modificados si alguien los va a usar
+    return cache() is not None or escrituras_recientes() is not None
+
+
+def marcar_modificados(usuario_ids):
+    """Registra usuarios cuyos datos cambió la transacción en curso.
+
+    Los cambios hechos con el ORM se detectan solos al hacer flush; esta
+    función es para los UPDATE/INSERT en bloque (Core o Query.update). Las
+    versiones se incrementan al confirmar; si se revierte, no pasa nada.
+    """
+    if _siguiendo_modificados():
+        db.session.info.setdefault('usuarios_modificados', set()).update(
+            usuario_id for usuario_id in usuario_ids if usuario_id is not None
+        )
+
+
+def _tras_flush(session, contexto):
+    if not _siguiendo_modificados():
+        return
+    modificados = session.info.setdefault('usuarios_modificados', set())
+    for objeto in itertools.chain(session.new, session.dirty, session.deleted):
+        if isinstance(objeto, Usuario):
+            modificados.add(objeto.id)
+        elif getattr(objeto, 'usuario_id', None) is not None:
+            modificados.add(objeto.usuario_id)
+
+
+def _notificar_modificados(session):
+    modificados = session.info.pop('usuarios_modificados', None)
+    registrar_escrituras(modificados)
+    actual = cache()
+    if modificados and actual is not None:
+        try:
+            actual.incrementar_versiones(modificados)
+        except Exception:
+            # La transacción ya se confirmó: no se puede fallar aquí
+            logger.exception('No se pudieron invalidar las respuestas cacheadas de %s', modificados)
+
+
+def _descartar_modificados(session):
+    session.info.pop('usuarios_modificados', None)
+
+
+def _etag(usuario_id, version):
+    # Estable entre procesos (hash() no lo es). La fecha hace caducar a
+    # medianoche lo que depende del día, como los próximos cobros.
+    base = f"{request.endpoint}|{request.query_string.decode()}|{usuario_id}|{version}|{date.today()}"
+    return hashlib.blake2b(base.encode(), digest_size=12).hexdigest()
+
+
+def respuesta_en_cache(f):
+    """Cachea por usuario la respuesta 200 de una ruta GET y la valida con ETag.
+
+    Se coloca debajo de @token_required. La respuesta queda asociada a la
+    versión de datos del usuario: cualquier escritura confirmada sobre sus
+    datos la invalida. Con If-None-Match igual al ETag vigente se responde
+    304 sin ejecutar la ruta.
+    """
+    @wraps(f)
+    def decorada(payload, *args, **kwargs):
+        actual = cache()
+        usuario_id = payload.get('id')
+        if actual is None or not usuario_id:
+            return f(payload, *args, **kwargs)
+
+        try:
+            etag = _etag(usuario_id, actual.version(usuario_id))
+            if etag in request.if_none_match:
+                respuesta = current_app.response_class(status=304)
+            else:
+                cuerpo = actual.obtener(etag)
+                respuesta = current_app.response_class(cuerpo, mimetype='application/json') if cuerpo else None
+        except Exception:
+            logger.exception('Caché de respuestas no disponible')
+            return f(payload, *args, **kwargs)
+
+        if respuesta is None:
+            respuesta = make_response(f(payload, *args, **kwargs))
+            if respuesta.status_code != 200:
+                return respuesta
+            try:
+                actual.guardar(etag, respuesta.get_data(), current_app.config.get('CACHE_RESPUESTAS_TTL', 60))
+            except Exception:
+                logger.exception('No se pudo guardar la respuesta en caché')
+
+        respuesta.set_etag(etag)
+        # Respuesta de un usuario: el navegador puede guardarla, pero debe revalidarla siempre
+        respuesta.headers['Cache-Control'] = 'private, no-cache'
+        respuesta.vary.add('Authorization')
+        return respuesta
+
+    return decorada
+
+
+def init_cache_respuestas(app):
+    # CACHE_RESPUESTAS_BACKEND: 'redis', 'ninguno' o 'memoria'. Por defecto
+    # 'redis' si hay CACHE_RESPUESTAS_REDIS_URL y si no 'ninguno': las
+    # versiones deben verse desde todos los workers para invalidar bien
+    backend = app.config.get('CACHE_RESPUESTAS_BACKEND') or (
+        'redis' if app.config.get('CACHE_RESPUESTAS_REDIS_URL') else 'ninguno')
+    if backend == 'redis':
+        app.extensions['cache_respuestas'] = CacheRedis(app.config['CACHE_RESPUESTAS_REDIS_URL'])
+    elif backend == 'memoria':
+        app.extensions['cache_respuestas'] = CacheMemoria(app.config.get('CACHE_RESPUESTAS_MAX_ENTRADAS', 10000),
+                                                          app.config.get('CACHE_RESPUESTAS_TTL', 60))
+    else:
+        app.extensions['cache_respuestas'] = None
+
+    # Listeners globales: una sola vez por proceso
+    if not event.contains(Session, 'after_flush', _tras_flush):
+        event.listen(Session, 'after_flush', _tras_flush)
+        event.listen(Session, 'after_commit', _notificar_modificados)
+        event.listen(Session, 'after_rollback', _descartar_modificados)
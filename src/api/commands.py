@@ -1,5 +1,15 @@
 import click
-from api.models import db, Usuario  # Asegúrate de importar la clase correcta
+import time
+from datetime import date, datetime, timedelta, timezone
+from api.models import db, Usuario, Alerta  # Asegúrate de importar la clase correcta
+from api.movimientos import reconstruir_resumenes, reconstruir_usos_categorias, rellenar_huellas
+from api.facturacion import facturar_suscripciones, inicializar_proximos_cobros
+from api.datos_prueba import CONTRASENA_PRUEBA, sembrar
+from api.particiones import mantener_particiones, particionadas
+from api.gastos_categorias import refrescar_gastos_por_categoria
+from api.proyecciones import proyectar_todos, VENTANA_MESES
+from api.importaciones import procesar_siguiente
+from api import json_rapido
 
 """
 In this file, you can add as many commands as you want using the @app.cli.command decorator
@@ -18,16 +28,285 @@ def setup_commands(app):
     def insert_test_users(count):
         print("Creating test users")
         for x in range(1, int(count) + 1):
-            user = Usuario()  # Usa la clase Usuario en lugar de User
-            user.email = "test_user" + str(x) + "@test.com"
-            user.password = "123456"
-            user.is_active = True
+            user = Usuario(nombre_usuario="test_user" + str(x), correo="test_user" + str(x) + "@test.com")
+            user.establecer_contrasena(CONTRASENA_PRUEBA)
             db.session.add(user)
             db.session.commit()
-            print("User: ", user.email, " created.")
+            print("User: ", user.correo, " created.")
 
         print("All test users created")
 
     @app.cli.command("insert-test-data")
     def insert_test_data():
-        pass
+        print("Filas creadas:", dict(sembrar(5, meses=6, movimientos_por_mes=10, semilla=1)))
+
+    """
+    Siembra usuarios sintéticos con historial completo (ingresos, egresos,
+    planes, suscripciones, alertas) para pruebas de carga:
+    $ flask sembrar-datos --usuarios 10000 --meses 24 --movimientos 40
+    """
+    @app.cli.command("sembrar-datos")
+    @click.option("--usuarios", "usuarios", type=int, default=100)
+    @click.option("--meses", "meses", type=int, default=12)
+    @click.option("--movimientos", "movimientos_por_mes", type=int, default=30, help="Egresos por usuario y mes")
+    @click.option("--semilla", "semilla", type=int, default=None, help="Para repetir exactamente los mismos datos")
+    @click.option("--prefijo", "prefijo", default="prueba")
+    def sembrar_datos(usuarios, meses, movimientos_por_mes, semilla, prefijo):
+        filas = sembrar(usuarios, meses, movimientos_por_mes, semilla=semilla, prefijo=prefijo)
+        print("Filas creadas:", ", ".join(f"{nombre}: {total}" for nombre, total in sorted(filas.items())))
+
+    """
+    Mide la latencia de todos los endpoints sobre bases sembradas de
+    distintos tamaños (--tamanos usuarios x --meses de historial). Usa un
+    SQLite temporal por escenario salvo que se indique --url (¡borra sus tablas!):
+    $ flask benchmark --tamanos 10,100 --meses 6,24 --salida bench.json
+    $ flask benchmark --comparar bench.json --umbral 0.25 --fallar
+    """
+    @app.cli.command("benchmark")
+    @click.option("--tamanos", "tamanos", default="10,100", help="Usuarios sembrados, separados por comas")
+    @click.option("--meses", "meses", default="12", help="Meses de historial, separados por comas")
+    @click.option("--movimientos", "movimientos_por_mes", type=int, default=30)
+    @click.option("--repeticiones", "repeticiones", type=int, default=20)
+    @click.option("--url", "url", envvar="BENCHMARK_DATABASE_URL", default=None)
+    @click.option("--salida", "salida", default=None, help="Archivo JSON con los resultados")
+    @click.option("--comparar", "comparar", default=None, help="JSON de una ejecución anterior")
+    @click.option("--umbral", "umbral", type=float, default=0.2, help="Aumento tolerado del p50 (0.2 = 20%)")
+    @click.option("--fallar", "fallar", is_flag=True, default=False, help="Código de salida 1 si hay regresiones")
+    def ejecutar_benchmark(tamanos, meses, movimientos_por_mes, repeticiones, url, salida, comparar, umbral, fallar):
+        # Importación diferida: el benchmark (y sus dependencias) sólo se carga al usarlo
+        from api import benchmark
+
+        resultado = benchmark.ejecutar_benchmark(
+            [int(t) for t in tamanos.split(',')], [int(m) for m in meses.split(',')],
+            movimientos_por_mes, repeticiones, url
+        )
+        for escenario in resultado['escenarios']:
+            print(f"\n{escenario['usuarios']} usuarios x {escenario['meses']} meses "
+                  f"({escenario['filas'].get('egresos', 0)} egresos)")
+            for nombre, medida in sorted(escenario['endpoints'].items(), key=lambda e: -e[1]['p50_ms']):
+                print(f"  {medida['p50_ms']:9.2f} ms p50 {medida['p95_ms']:9.2f} ms p95 "
+                      f"{medida['sentencias'] if medida['sentencias'] is not None else '-':>4} SQL  "
+                      f"{medida['metodo']:6} {medida['ruta']} {medida['estados']}")
+        if resultado.get('sin_cubrir'):
+            print("\nEndpoints sin caso de benchmark:", ", ".join(resultado['sin_cubrir']))
+        if salida:
+            benchmark.guardar(resultado, salida)
+
+        if comparar:
+            regresiones = benchmark.comparar(resultado, benchmark.cargar(comparar), umbral)
+            for r in regresiones:
+                print(f"REGRESIÓN {r['endpoint']} ({r['usuarios']}x{r['meses']}): "
+                      f"{r['p50_anterior_ms']} -> {r['p50_ms']} ms, "
+                      f"{r['sentencias_anteriores']} -> {r['sentencias']} sentencias")
+            if regresiones and fallar:
+                raise SystemExit(1)
+
+    """
+    Compara filas por segundo al listar egresos: entidades del ORM con
+    to_dict() + jsonify() frente a columnas + serializador rápido (orjson
+    si está instalado):
+    $ flask benchmark-serializacion --filas 20000
+    """
+    @app.cli.command("benchmark-serializacion")
+    @click.option("--filas", "filas", type=int, default=5000)
+    @click.option("--repeticiones", "repeticiones", type=int, default=5)
+    @click.option("--url", "url", envvar="BENCHMARK_DATABASE_URL", default=None)
+    def ejecutar_benchmark_serializacion(filas, repeticiones, url):
+        from api import benchmark
+
+        print("orjson:", "sí" if json_rapido.orjson is not None else "no (json estándar)")
+        for nombre, medida in benchmark.medir_serializacion(filas, repeticiones, url).items():
+            print(f"  {nombre:24} {medida['filas']:7} filas {medida['ms']:9.2f} ms "
+                  f"{medida['filas_por_segundo']:10} filas/s")
+
+    """
+    Latencia y memoria de los totales de un usuario (/usuarios/totales)
+    según el largo de su historial: suma de entidades en Python (el camino
+    anterior) frente al SUM sobre resumenes_mensuales:
+    $ flask benchmark-totales --tamanos 1000,10000,100000
+    """
+    @app.cli.command("benchmark-totales")
+    @click.option("--tamanos", "tamanos", default="1000,10000,50000", help="Egresos del usuario, separados por comas")
+    @click.option("--repeticiones", "repeticiones", type=int, default=5)
+    @click.option("--url", "url", envvar="BENCHMARK_DATABASE_URL", default=None)
+    def ejecutar_benchmark_totales(tamanos, repeticiones, url):
+        from api import benchmark
+
+        for medida in benchmark.medir_totales([int(t) for t in tamanos.split(',')], repeticiones, url):
+            print(f"{medida['egresos']:8} egresos ({medida['meses']} meses)")
+            for nombre in ('suma_en_python', 'resumen_mensual'):
+                print(f"  {nombre:16} {medida[nombre]['ms']:9.2f} ms {medida[nombre]['memoria_kb']:8} KiB")
+
+    """
+    Recalcula la tabla resumenes_mensuales a partir de ingresos y egresos.
+    La migración 3f1a9c2d7b10 ya hace el backfill inicial; esto es para
+    corregir desvíos:
+    $ flask reconstruir-resumenes            (todos los usuarios)
+    $ flask reconstruir-resumenes --usuario 7
+    """
+    @app.cli.command("reconstruir-resumenes")
+    @click.option("--usuario", "usuario_id", type=int, default=None)
+    def reconstruir_resumenes_mensuales(usuario_id):
+        filas = reconstruir_resumenes(usuario_id)
+        db.session.commit()
+        print("Resúmenes mensuales reconstruidos:", filas)
+
+    """
+    Calcula la huella (detección de duplicados al importar extractos) de los
+    ingresos y egresos creados antes de que existiera la columna:
+    $ flask rellenar-huellas
+    """
+    @app.cli.command("rellenar-huellas")
+    @click.option("--lote", "tamano_lote", type=int, default=1000)
+    def rellenar_huellas_movimientos(tamano_lote):
+        print("Huellas calculadas:", rellenar_huellas(tamano_lote))
+
+    """
+    Recalcula los contadores de uso (usos_ingresos / usos_egresos) de las
+    categorías propias. La migración 4a9d6c1e8f37 ya hace el backfill
+    inicial; esto es para corregir desvíos:
+    $ flask recalcular-usos-categorias
+    """
+    @app.cli.command("recalcular-usos-categorias")
+    def recalcular_usos_categorias():
+        categorias = reconstruir_usos_categorias()
+        db.session.commit()
+        print("Categorías recalculadas:", categorias)
+
+    """
+    Cobra las suscripciones vencidas de todos los usuarios (pensado para cron
+    nocturno). Es idempotente por periodo: relanzarlo no duplica cobros.
+    $ flask facturar-suscripciones
+    $ flask facturar-suscripciones --bloque 2000 --procesos 4
+    $ flask facturar-suscripciones --fecha 2024-06-30
+    """
+    @app.cli.command("facturar-suscripciones")
+    @click.option("--fecha", "fecha", default=None, help="Fecha de corte (YYYY-MM-DD), hoy por defecto")
+    @click.option("--bloque", "tamano_bloque", type=int, default=1000, help="Usuarios por transacción")
+    @click.option("--procesos", "procesos", type=int, default=1)
+    def facturar_suscripciones_vencidas(fecha, tamano_bloque, procesos):
+        hoy = date.fromisoformat(fecha) if fecha else date.today()
+        print("Suscripciones inicializadas:", inicializar_proximos_cobros(hoy))
+        try:
+            total = facturar_suscripciones(hoy, tamano_bloque, procesos)
+        except RuntimeError as e:
+            raise click.ClickException(str(e))
+        print(f"Usuarios: {total['usuarios']}, suscripciones cobradas: {total['suscripciones']}, "
+              f"egresos: {total['cobros']}, monto: {total['monto']:.2f}, omitidas: {total['omitidas']}")
+
+    """
+    Elimina las alertas más antiguas que --dias (por defecto ALERTAS_TTL_DIAS)
+    para mantener acotada la tabla. Borra por lotes para no bloquearla:
+    $ flask purgar-alertas
+    $ flask purgar-alertas --dias 30 --solo-leidas
+    """
+    @app.cli.command("purgar-alertas")
+    @click.option("--dias", "dias", type=int, default=None)
+    @click.option("--solo-leidas", "solo_leidas", is_flag=True, default=False)
+    @click.option("--lote", "tamano_lote", type=int, default=5000)
+    def purgar_alertas_antiguas(dias, solo_leidas, tamano_lote):
+        if dias is None:
+            dias = app.config.get('ALERTAS_TTL_DIAS', 90)
+        limite = datetime.now(timezone.utc) - timedelta(days=dias)
+        condicion = Alerta.creada_en < limite
+        if solo_leidas:
+            condicion = condicion & (Alerta.leida == True)
+
+        total = 0
+        while True:
+            ids = [id for (id,) in db.session.query(Alerta.id).filter(condicion).limit(tamano_lote)]
+            if not ids:
+                break
+            total += Alerta.query.filter(Alerta.id.in_(ids)).delete(synchronize_session=False)
+            db.session.commit()
+        print("Alertas eliminadas:", total)
+
+    """
+    Mantenimiento de las particiones mensuales de ingresos y egresos
+    (PostgreSQL, tras la migración d7a3f5b1e2c8). Crea las de los próximos
+    meses y las de fechas que hayan caído en la partición por defecto; con
+    --retener-meses desacopla las más antiguas. Pensado para cron mensual:
+    $ flask mantener-particiones
+    $ flask mantener-particiones --meses-futuros 6 --retener-meses 84
+    """
+    @app.cli.command("mantener-particiones")
+    @click.option("--meses-futuros", "meses_futuros", type=int, default=3)
+    @click.option("--retener-meses", "retener_meses", type=int, default=None,
+                  help="Desacopla las particiones de meses más antiguos (no las borra)")
+    def mantener_particiones_movimientos(meses_futuros, retener_meses):
+        if not particionadas():
+            print("ingresos y egresos no están particionadas (sólo PostgreSQL, tras `flask db upgrade`)")
+            return
+        resultado = mantener_particiones(meses_futuros, retener_meses)
+        db.session.commit()
+        print("Particiones creadas:", ", ".join(resultado['creadas']) or "ninguna")
+        print("Particiones desacopladas:", ", ".join(resultado['desacopladas']) or "ninguna")
+
+    """
+    Refresca la vista materializada del gasto mensual por categoría
+    (PostgreSQL) sin bloquear /usuarios/por_categoria y anota cuándo.
+    Pensado para cron nocturno: desde entonces se leen de la vista los meses
+    anteriores al del refresco sin movimientos contabilizados después.
+    $ flask refrescar-gastos-categorias
+    """
+    @app.cli.command("refrescar-gastos-categorias")
+    @click.option("--bloqueante", "bloqueante", is_flag=True, default=False,
+                  help="Sin CONCURRENTLY: más rápido, pero bloquea las lecturas")
+    def refrescar_gastos_categorias(bloqueante):
+        if not refrescar_gastos_por_categoria(concurrente=not bloqueante):
+            print("La vista sólo existe en PostgreSQL: nada que refrescar")
+            return
+        db.session.commit()
+        print("Vista gastos_por_categoria_mensual refrescada")
+
+    """
+    Proyecta todos los planes de ahorro de la base de datos por bloques
+    (dos consultas por bloque) e informa cuántos van en camino. Con
+    --salida escribe una proyección por línea (NDJSON):
+    $ flask proyectar-planes
+    $ flask proyectar-planes --bloque 5000 --salida proyecciones.ndjson
+    """
+    @app.cli.command("proyectar-planes")
+    @click.option("--bloque", "tamano_bloque", type=int, default=1000, help="Planes por bloque")
+    @click.option("--ventana", "ventana_meses", type=int, default=VENTANA_MESES, help="Meses de historial")
+    @click.option("--salida", "salida", default=None, help="Archivo NDJSON con cada proyección")
+    def proyectar_planes(tamano_bloque, ventana_meses, salida):
+        archivo = open(salida, 'wb') if salida else None
+        total = en_camino = sin_aporte = 0
+        try:
+            for bloque in proyectar_todos(tamano_bloque, ventana_meses=ventana_meses):
+                total += len(bloque)
+                en_camino += sum(1 for p in bloque if p['en_camino'])
+                sin_aporte += sum(1 for p in bloque if p['restante'] and p['fecha_proyectada'] is None)
+                if archivo:
+                    archivo.writelines(json_rapido.dumps(p) + b"\n" for p in bloque)
+        finally:
+            if archivo:
+                archivo.close()
+        print(f"Planes: {total}, en camino: {en_camino}, atrasados: {total - en_camino}, "
+              f"sin aporte suficiente: {sin_aporte}")
+
+    """
+    Worker de importaciones de extractos CSV (línea `worker` del Procfile).
+    Toma las pendientes de la tabla importaciones, de a una, y retoma las
+    que quedaron a medias si su worker murió. Se pueden lanzar varios: cada
+    importación la procesa uno solo (FOR UPDATE SKIP LOCKED en PostgreSQL).
+    $ flask procesar-importaciones
+    $ flask procesar-importaciones --una-vez
+    """
+    @app.cli.command("procesar-importaciones")
+    @click.option("--intervalo", "intervalo", type=float, default=2.0, help="Segundos de espera con la cola vacía")
+    @click.option("--una-vez", "una_vez", is_flag=True, default=False, help="Vacía la cola y termina")
+    def procesar_importaciones(intervalo, una_vez):
+        procesadas = 0
+        while True:
+            importacion_id = procesar_siguiente(app)
+            db.session.remove()
+            if importacion_id is not None:
+                procesadas += 1
+                print("Importación procesada:", importacion_id)
+            elif una_vez:
+                break
+            else:
+                time.sleep(intervalo)
+        print("Importaciones procesadas:", procesadas)
@@ -0,0 +1,56 @@
+# api/config.py
+import os
+from api.pool_conexiones import opciones_engine
+
+
+def configurar(app, configuracion=None):
+    """Carga en app.config la configuración desde el entorno.
+
+    La comparten create_app() y src/app.py (la app de gunicorn y de la
+    CLI). `configuracion` sobrescribe valores (tests, benchmark); las
+    opciones del engine se calculan con la URI final.
+    """
+    db_url = os.getenv("DATABASE_URL")
+    if db_url is not None:
+        app.config['SQLALCHEMY_DATABASE_URI'] = db_url.replace(
+            "postgres://", "postgresql://")
+
+    # Réplica de sólo lectura opcional (rutas con @lectura_en_replica)
+    replica_url = os.getenv("DATABASE_REPLICA_URL")
+    if replica_url is not None:
+        app.config['SQLALCHEMY_BINDS'] = {'replica': replica_url.replace(
+            "postgres://", "postgresql://")}
+
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = os.getenv("FLASK_APP_KEY")  # Esto también funcionará para JWT
+    app.config['TAMANO_PAGINA'] = int(os.getenv("TAMANO_PAGINA", 50))  # Filas por página en los listados
+    app.config['TAMANO_PAGINA_MAX'] = int(os.getenv("TAMANO_PAGINA_MAX", 500))
+    app.config['TAMANO_LOTE_MAX'] = int(os.getenv("TAMANO_LOTE_MAX", 5000))  # Filas por carga en lote
+    app.config['IMPORTACION_WORKERS'] = int(os.getenv("IMPORTACION_WORKERS", 0))  # Hilos del proceso web que además procesan importaciones
+    app.config['IMPORTACION_TIEMPO_MUERTO'] = int(os.getenv("IMPORTACION_TIEMPO_MUERTO", 300))  # Segundos sin avances para retomar una importación
+    app.config['IMPORTACION_MAX_INTENTOS'] = int(os.getenv("IMPORTACION_MAX_INTENTOS", 3))  # Intentos antes de darla por fallida
+    app.config['CACHE_CATEGORIAS_TTL'] = int(os.getenv("CACHE_CATEGORIAS_TTL", 300))  # Segundos de caché de categorías
+    app.config['CACHE_RESPUESTAS_REDIS_URL'] = os.getenv("CACHE_RESPUESTAS_REDIS_URL", os.getenv("REDIS_URL"))  # Redis compartido por los workers (backend 'redis')
+    app.config['CACHE_RESPUESTAS_BACKEND'] = os.getenv("CACHE_RESPUESTAS_BACKEND")  # 'redis', 'ninguno' o 'memoria' (un solo proceso); por defecto 'redis' si hay URL
+    app.config['CACHE_RESPUESTAS_TTL'] = int(os.getenv("CACHE_RESPUESTAS_TTL", 60))  # Segundos máximos de una respuesta cacheada
+    app.config['CACHE_RESPUESTAS_MAX_ENTRADAS'] = int(os.getenv("CACHE_RESPUESTAS_MAX_ENTRADAS", 10000))  # Tamaño de la LRU del backend 'memoria'
+    app.config['REPLICA_VENTANA_SEGUNDOS'] = int(os.getenv("REPLICA_VENTANA_SEGUNDOS", 5))  # Tras escribir, las lecturas del usuario van a la primaria durante estos segundos
+    app.config['REPLICA_REDIS_URL'] = os.getenv("REPLICA_REDIS_URL", os.getenv("REDIS_URL"))  # Redis donde los workers comparten las escrituras recientes
+    app.config['REPLICA_ESCRITURAS_BACKEND'] = os.getenv("REPLICA_ESCRITURAS_BACKEND")  # 'redis' o 'memoria' (un solo proceso); sin registro se lee siempre de la primaria
+    app.config['SQL_PRESUPUESTO_ESTRICTO'] = os.getenv("SQL_PRESUPUESTO_ESTRICTO") == "1"  # Falla si una ruta excede su presupuesto SQL o repite consultas (N+1)
+    app.config['SQL_REPETICIONES_N_MAS_1'] = int(os.getenv("SQL_REPETICIONES_N_MAS_1", 5))  # Parámetros distintos de una misma sentencia que delatan un N+1
+    app.config['SQL_LENTA_MS'] = int(os.getenv("SQL_LENTA_MS", 500))  # Registra las peticiones con más tiempo en base de datos
+    app.config['SQL_SENTENCIAS_AVISO'] = int(os.getenv("SQL_SENTENCIAS_AVISO", 50))  # ... o con más sentencias SQL
+    app.config['SERVER_TIMING'] = os.getenv("SERVER_TIMING", "1") == "1"  # Encabezado Server-Timing con tiempo de base de datos
+    app.config['ALERTAS_TTL_DIAS'] = int(os.getenv("ALERTAS_TTL_DIAS", 90))  # Antigüedad máxima en `flask purgar-alertas`
+    app.config['EVENTOS_BACKEND'] = os.getenv("EVENTOS_BACKEND")  # 'postgres' (LISTEN/NOTIFY) o 'local'; por defecto según la base
+    app.config['EVENTOS_LATIDO'] = int(os.getenv("EVENTOS_LATIDO", 15))  # Segundos entre latidos del flujo SSE
+    app.config['EVENTOS_DURACION_MAX'] = int(os.getenv("EVENTOS_DURACION_MAX", 300))  # Segundos antes de que el cliente reconecte
+    app.config['DB_STATEMENT_TIMEOUT_MS'] = int(os.getenv("DB_STATEMENT_TIMEOUT_MS") or 0)  # Límite por sentencia en las peticiones web (0: sin límite; no aplica a la CLI)
+    app.config['METRICAS_CLAVE'] = os.getenv("METRICAS_CLAVE")  # Clave para /api/metricas/pool (sin ella la ruta no existe)
+
+    if configuracion:
+        app.config.update(configuracion)
+    if 'SQLALCHEMY_ENGINE_OPTIONS' not in (configuracion or {}):
+        # Pool desde DB_POOL_*, según el motor de la base configurada
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opciones_engine(app.config.get('SQLALCHEMY_DATABASE_URI'))
@@ -0,0 +1,290 @@
+# api/datos_prueba.py
+import csv
+import io
+import random
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta, timezone
+from dateutil.relativedelta import relativedelta
+from api.models import (db, Usuario, Categoria, Ingreso, Egreso, PlanAhorro, Suscripcion,
+                        FondoEmergencia, Alerta, ResumenMensual, calcular_huella)
+from api.cache_categorias import invalidar_categorias
+from api.facturacion import primer_cobro
+from api.routes.default_categories import default_categories
+
+# Contraseña de todos los usuarios generados (para iniciar sesión en pruebas)
+CONTRASENA_PRUEBA = '123456'
+
+# Usuarios que se generan y confirman juntos
+USUARIOS_POR_BLOQUE = 200
+
+# Filas por sentencia en motores sin COPY
+FILAS_POR_LOTE = 5000
+
+# Rango de montos (mínimo, máximo) por categoría predeterminada
+INGRESOS = {
+    'Salario': (1500, 4000),
+    'Freelance / Trabajo Independiente': (100, 900),
+    'Rendimientos Bancarios': (5, 60),
+    'Ingreso Extraordinario': (50, 500),
+}
+EGRESOS = {
+    'Comida': (5, 120),
+    'Transporte': (2, 60),
+    'Gastos Varios': (1, 50),
+    'Entretenimiento': (5, 80),
+    'Cuidado Personal': (5, 60),
+    'Salud': (10, 200),
+    'Educación': (20, 300),
+    'Seguros': (20, 150),
+}
+SUSCRIPCIONES = [
+    ('Streaming', 12.99, 'mensual'),
+    ('Música', 9.99, 'mensual'),
+    ('Gimnasio', 35.0, 'mensual'),
+    ('Seguro del auto', 420.0, 'semestral'),
+    ('Dominio web', 15.0, 'anual'),
+    ('Periódico', 4.5, 'semanal'),
+    ('Almacenamiento en la nube', 2.99, 'mensual'),
+]
+PLANES = ['Vacaciones', 'Auto nuevo', 'Fondo de estudios', 'Casa propia', 'Computadora']
+MENSAJES_ALERTA = [
+    'Tus egresos de este mes superan a tus ingresos',
+    'Se cobró una suscripción',
+    'Alcanzaste el 50% de tu plan de ahorro',
+    'Tu capital bajó del mínimo configurado',
+]
+
+
+def asegurar_categorias():
+    """Crea las categorías predeterminadas si faltan y devuelve {nombre: id}."""
+    existentes = {nombre: id for id, nombre in db.session.query(Categoria.id, Categoria.nombre)
+                  .filter(Categoria.is_default == True)}
+    faltantes = [{'nombre': c['nombre'], 'icono': c['icono'], 'is_default': True, 'user_id': None}
+                 for c in default_categories if c['nombre'] not in existentes]
+    if faltantes:
+        db.session.execute(Categoria.__table__.insert(), faltantes)
+        db.session.commit()
+        invalidar_categorias()
+        return asegurar_categorias()
+    return existentes
+
+
+def insertar_en_bloque(tabla, filas):
+    """Inserta filas (diccionarios con las mismas claves) lo más rápido posible.
+
+    En PostgreSQL usa COPY ... FROM STDIN (CSV) por la conexión de la
+    sesión, así que queda en la misma transacción; en los demás motores,
+    executemany por lotes. Los defaults de Python de las columnas no se
+    aplican con COPY: las filas deben traer todos sus valores.
+    """
+    if not filas:
+        return
+    columnas = list(filas[0])
+
+    if db.session.get_bind().dialect.name == 'postgresql':
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer)
+        for fila in filas:
+            escritor.writerow(fila[c] for c in columnas)
+        buffer.seek(0)
+        cursor = db.session.connection().connection.cursor()
+        cursor.copy_expert(f"COPY {tabla.name} ({', '.join(columnas)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        cursor.close()
+        return
+
+    for inicio in range(0, len(filas), FILAS_POR_LOTE):
+        db.session.execute(tabla.insert(), filas[inicio:inicio + FILAS_POR_LOTE])
+
+
+def _movimiento(usuario_id, categoria_id, monto, fecha, descripcion, plan_ahorro_id=None, egreso=False):
+    monto = round(monto, 2)
+    fila = {
+        'monto': monto,
+        'descripcion': descripcion,
+        'fecha': fecha,
+        'usuario_id': usuario_id,
+        'categoria_id': categoria_id,
+        'huella': calcular_huella(usuario_id, fecha, monto, descripcion),
+    }
+    if egreso:
+        fila['plan_ahorro_id'] = plan_ahorro_id
+    return fila
+
+
+def _generar_usuario(azar, usuario_id, categorias, meses, movimientos_por_mes, hoy):
+    # Historial de un usuario: (ingresos, egresos, planes, suscripciones, fondos, alertas)
+    ingresos, egresos, planes, suscripciones, fondos, alertas = [], [], [], [], [], []
+    inicio = (hoy - relativedelta(months=meses - 1)).replace(day=1)
+
+    for m in range(meses):
+        mes = inicio + relativedelta(months=m)
+        dias = ((mes + relativedelta(months=1)) - mes).days
+        ultimo_dia = min(dias, (hoy - mes).days + 1)
+
+        minimo, maximo = INGRESOS['Salario']
+        ingresos.append(_movimiento(usuario_id, categorias['Salario'], azar.uniform(minimo, maximo),
+                                    mes.replace(day=min(5, ultimo_dia)), 'Salario'))
+        for nombre in ('Freelance / Trabajo Independiente', 'Rendimientos Bancarios', 'Ingreso Extraordinario'):
+            if azar.random() < 0.3:
+                minimo, maximo = INGRESOS[nombre]
+                ingresos.append(_movimiento(usuario_id, categorias[nombre], azar.uniform(minimo, maximo),
+                                            mes + timedelta(days=azar.randrange(ultimo_dia)), nombre))
+
+        egresos.append(_movimiento(usuario_id, categorias['Alquiler'], azar.uniform(400, 1200),
+                                   mes, 'Alquiler', egreso=True))
+        for _ in range(movimientos_por_mes):
+            nombre = azar.choice(list(EGRESOS))
+            minimo, maximo = EGRESOS[nombre]
+            egresos.append(_movimiento(usuario_id, categorias[nombre], azar.uniform(minimo, maximo),
+                                       mes + timedelta(days=azar.randrange(ultimo_dia)),
+                                       f"{nombre} #{azar.randrange(10000)}", egreso=True))
+
+    for nombre in azar.sample(PLANES, azar.randrange(3)):
+        fecha_inicio = min(inicio + timedelta(days=azar.randrange(28)), hoy)
+        planes.append({
+            'nombre_plan': nombre,
+            'fecha_inicio': fecha_inicio,
+            'monto_inicial': round(azar.uniform(0, 500), 2),
+            'fecha_objetivo': fecha_inicio + relativedelta(years=azar.randint(1, 3)),
+            'monto_objetivo': round(azar.uniform(2000, 20000), 2),
+            'usuario_id': usuario_id,
+        })
+
+    for nombre, costo, frecuencia in azar.sample(SUSCRIPCIONES, azar.randrange(5)):
+        fecha_inicio = min(inicio + timedelta(days=azar.randrange(28)), hoy)
+        suscripciones.append({
+            'nombre': nombre,
+            'costo': costo,
+            'frecuencia': frecuencia,
+            'fecha_inicio': fecha_inicio,
+            'proximo_cobro': primer_cobro(frecuencia, fecha_inicio, hoy),
+            'usuario_id': usuario_id,
+        })
+
+    if azar.random() < 0.3:
+        fondos.append({'monto': round(azar.uniform(1000, 10000), 2), 'monto_actual': 0.0,
+                       'razon': 'Imprevistos', 'usuario_id': usuario_id})
+
+    ahora = datetime.now(timezone.utc).replace(tzinfo=None)
+    for _ in range(azar.randrange(12)):
+        alertas.append({
+            'mensaje': azar.choice(MENSAJES_ALERTA),
+            'leida': azar.random() < 0.6,
+            'creada_en': ahora - timedelta(minutes=azar.randrange(meses * 30 * 24 * 60)),
+            'usuario_id': usuario_id,
+        })
+    return ingresos, egresos, planes, suscripciones, fondos, alertas
+
+
+def _depositos(azar, planes, categoria_id, hoy):
+    # Depósito inicial y mensuales de cada plan; actualiza monto_acumulado
+    egresos = []
+    for plan in planes:
+        fechas = [plan['fecha_inicio']]
+        while fechas[-1] + relativedelta(months=1) <= hoy:
+            fechas.append(fechas[-1] + relativedelta(months=1))
+        acumulado = 0.0
+        for i, fecha in enumerate(fechas):
+            monto = plan['monto_inicial'] if i == 0 else round(azar.uniform(50, 300), 2)
+            if monto <= 0:
+                continue
+            acumulado += monto
+            egresos.append(_movimiento(plan['usuario_id'], categoria_id, monto, fecha,
+                                       'Depósito inicial' if i == 0 else 'Deposito al plan de ahorro',
+                                       plan_ahorro_id=plan['id'], egreso=True))
+        plan['monto_acumulado'] = round(acumulado, 2)
+    return egresos
+
+
+def sembrar(usuarios, meses=12, movimientos_por_mes=30, semilla=None, prefijo='prueba', hoy=None):
+    """Genera `usuarios` usuarios sintéticos con su historial completo.
+
+    Cada usuario recibe `meses` de ingresos (salario y extras), unos
+    `movimientos_por_mes` egresos por mes repartidos entre categorías,
+    planes de ahorro con depósitos, suscripciones, a veces un fondo de
+    emergencia y alertas. Se insertan en bloque (COPY en PostgreSQL) y se
+    dejan coherentes capital_actual, resúmenes mensuales y huellas. Todos
+    usan la contraseña CONTRASENA_PRUEBA y el correo
+    <prefijo><n>@prueba.local. Devuelve un Counter con las filas creadas.
+    """
+    azar = random.Random(semilla)
+    hoy = hoy or date.today()
+    categorias = asegurar_categorias()
+    plantilla = Usuario()
+    plantilla.establecer_contrasena(CONTRASENA_PRUEBA)
+    contrasena_hash = plantilla.contrasena_hash
+
+    # Continuar la numeración si ya se sembró antes con el mismo prefijo
+    desde = db.session.query(db.func.count(Usuario.id)).filter(
+        Usuario.correo.like(f'{prefijo}%@prueba.local')
+    ).scalar()
+    totales = Counter()
+
+    for bloque in range(desde, desde + usuarios, USUARIOS_POR_BLOQUE):
+        numeros = range(bloque + 1, min(bloque + USUARIOS_POR_BLOQUE, desde + usuarios) + 1)
+        ahora = datetime.now(timezone.utc).replace(tzinfo=None)
+        capitales = {n: round(azar.uniform(500, 5000), 2) for n in numeros}
+        insertar_en_bloque(Usuario.__table__, [{
+            'nombre_usuario': f'{prefijo}{n}',
+            'correo': f'{prefijo}{n}@prueba.local',
+            'contrasena_hash': contrasena_hash,
+            'creado_en': ahora,
+            'capital_inicial': capitales[n],
+            'capital_actual': capitales[n],
+            'moneda': 'USD',
+        } for n in numeros])
+        ids = dict(db.session.query(Usuario.correo, Usuario.id).filter(
+            Usuario.correo.in_([f'{prefijo}{n}@prueba.local' for n in numeros])
+        ))
+
+        generados = defaultdict(list)
+        for n in numeros:
+            usuario_id = ids[f'{prefijo}{n}@prueba.local']
+            for nombre, filas in zip(('ingresos', 'egresos', 'planes', 'suscripciones', 'fondos', 'alertas'),
+                                     _generar_usuario(azar, usuario_id, categorias, meses, movimientos_por_mes, hoy)):
+                generados[nombre].extend(filas)
+
+        # Los planes se insertan primero: los depósitos necesitan su id
+        insertar_en_bloque(PlanAhorro.__table__, [dict(p, monto_acumulado=0.0) for p in generados['planes']])
+        ids_planes = {(usuario_id, nombre): id for id, usuario_id, nombre in db.session.query(
+            PlanAhorro.id, PlanAhorro.usuario_id, PlanAhorro.nombre_plan
+        ).filter(PlanAhorro.usuario_id.in_(list(ids.values())))}
+        for plan in generados['planes']:
+            plan['id'] = ids_planes[(plan['usuario_id'], plan['nombre_plan'])]
+        generados['egresos'].extend(_depositos(azar, generados['planes'], categorias['Plan de ahorro'], hoy))
+        if generados['planes']:
+            tabla = PlanAhorro.__table__
+            acumulados = {p['id']: p['monto_acumulado'] for p in generados['planes']}
+            db.session.execute(tabla.update().where(tabla.c.id.in_(list(acumulados))).values(
+                monto_acumulado=db.case(acumulados, value=tabla.c.id)
+            ))
+
+        insertar_en_bloque(Ingreso.__table__, generados['ingresos'])
+        insertar_en_bloque(Egreso.__table__, generados['egresos'])
+        insertar_en_bloque(Suscripcion.__table__, generados['suscripciones'])
+        insertar_en_bloque(FondoEmergencia.__table__, generados['fondos'])
+        insertar_en_bloque(Alerta.__table__, generados['alertas'])
+
+        # Resúmenes mensuales y capital_actual calculados aquí mismo
+        resumenes = defaultdict(lambda: {'ingresos': 0.0, 'egresos': 0.0})
+        deltas = defaultdict(float)
+        for columna, signo in (('ingresos', 1), ('egresos', -1)):
+            for fila in generados[columna]:
+                fecha = fila['fecha']
+                resumenes[(fila['usuario_id'], fecha.year, fecha.month)][columna] += fila['monto']
+                deltas[fila['usuario_id']] += signo * fila['monto']
+        insertar_en_bloque(ResumenMensual.__table__, [
+            {'usuario_id': uid, 'anio': anio, 'mes': mes,
+             'ingresos': round(v['ingresos'], 2), 'egresos': round(v['egresos'], 2)}
+            for (uid, anio, mes), v in resumenes.items()
+        ])
+        tabla = Usuario.__table__
+        db.session.execute(tabla.update().where(tabla.c.id.in_(list(deltas))).values(
+            capital_actual=tabla.c.capital_actual + db.case(dict(deltas), value=tabla.c.id, else_=0.0)
+        ))
+        db.session.commit()
+
+        totales['usuarios'] += len(numeros)
+        for nombre, filas in generados.items():
+            totales[nombre] += len(filas)
+    return totales
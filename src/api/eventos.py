@@ -0,0 +1,167 @@
+# api/eventos.py
+import json
+import logging
+import queue
+import select
+import threading
+import time
+from flask import current_app, has_app_context
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session, object_session
+from api.models import db, Alerta
+
+logger = logging.getLogger(__name__)
+
+# Canal de LISTEN/NOTIFY en PostgreSQL
+CANAL = 'eventos'
+
+# Eventos que puede acumular una conexión lenta antes de empezar a descartarlos
+MAX_PENDIENTES_POR_CONEXION = 100
+
+
+class BrokerLocal:
+    """Reparte eventos entre las conexiones SSE abiertas en este proceso.
+
+    Los eventos se publican al confirmar la transacción que los generó
+    (after_commit). Sólo llegan a los clientes conectados al mismo proceso:
+    sirve para desarrollo, tests o un único worker.
+    """
+    transaccional = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._colas = {}
+
+    def suscribir(self, usuario_id):
+        cola = queue.Queue(maxsize=MAX_PENDIENTES_POR_CONEXION)
+        with self._lock:
+            self._colas.setdefault(usuario_id, set()).add(cola)
+        return cola
+
+    def cancelar(self, usuario_id, cola):
+        with self._lock:
+            colas = self._colas.get(usuario_id)
+            if colas is not None:
+                colas.discard(cola)
+                if not colas:
+                    del self._colas[usuario_id]
+
+    def repartir(self, usuario_id, evento):
+        with self._lock:
+            colas = list(self._colas.get(usuario_id, ()))
+        for cola in colas:
+            try:
+                cola.put_nowait(evento)
+            except queue.Full:
+                # El cliente no consume: se pierde el evento en lugar de frenar al escritor
+                pass
+
+
+class BrokerPostgres(BrokerLocal):
+    """Fan-out entre procesos con LISTEN/NOTIFY de PostgreSQL.
+
+    Los eventos se envían con pg_notify dentro de la transacción que los
+    genera, así PostgreSQL sólo los entrega si se confirma. Cada proceso
+    escucha el canal en un hilo con una conexión dedicada (creada con la
+    primera suscripción) y reparte a sus conexiones SSE.
+    """
+    transaccional = True
+
+    def __init__(self, app):
+        super().__init__()
+        self._app = app
+        self._hilo = None
+
+    def suscribir(self, usuario_id):
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._escuchar, name='eventos-listen', daemon=True)
+                self._hilo.start()
+        return super().suscribir(usuario_id)
+
+    def _escuchar(self):
+        while True:
+            try:
+                with self._app.app_context():
+                    conexion = db.engine.raw_connection()
+                # Fuera del pool: queda ocupada escuchando mientras viva el proceso
+                conexion.detach()
+                dbapi = conexion.connection
+                dbapi.autocommit = True
+                with dbapi.cursor() as cursor:
+                    cursor.execute(f'LISTEN {CANAL}')
+                while True:
+                    if select.select([dbapi], [], [], 30) == ([], [], []):
+                        continue
+                    dbapi.poll()
+                    while dbapi.notifies:
+                        carga = json.loads(dbapi.notifies.pop(0).payload)
+                        self.repartir(carga['usuario_id'], {'tipo': carga['tipo'], 'datos': carga['datos']})
+            except Exception:
+                logger.exception('Se perdió la conexión LISTEN de eventos; reintentando')
+                time.sleep(5)
+
+
+def broker():
+    """Broker de eventos de la aplicación en curso (None fuera de contexto)."""
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('eventos')
+
+
+def registrar_eventos(eventos, conexion=None):
+    """Publica eventos [(usuario_id, tipo, datos)] cuando se confirme la transacción.
+
+    Con el broker de PostgreSQL se envían en el acto con un único
+    SELECT pg_notify (por `conexion` si se llama durante un flush); con el
+    local se guardan en la sesión hasta after_commit. Si la transacción se
+    revierte no se publica nada.
+    """
+    actual = broker()
+    if actual is None or not eventos:
+        return
+    cargas = [{'usuario_id': usuario_id, 'tipo': tipo, 'datos': datos} for usuario_id, tipo, datos in eventos]
+
+    if actual.transaccional:
+        (conexion or db.session).execute(
+            text('SELECT pg_notify(:canal, carga) FROM unnest(CAST(:cargas AS text[])) AS carga'),
+            {'canal': CANAL, 'cargas': [json.dumps(c, default=str) for c in cargas]}
+        )
+    else:
+        db.session.info.setdefault('eventos_pendientes', []).extend(cargas)
+
+
+def registrar_evento(usuario_id, tipo, datos, conexion=None):
+    registrar_eventos([(usuario_id, tipo, datos)], conexion)
+
+
+def _publicar_pendientes(session):
+    pendientes = session.info.pop('eventos_pendientes', None)
+    actual = broker()
+    if pendientes and actual is not None:
+        for carga in pendientes:
+            actual.repartir(carga['usuario_id'], {'tipo': carga['tipo'], 'datos': carga['datos']})
+
+
+def _descartar_pendientes(session):
+    session.info.pop('eventos_pendientes', None)
+
+
+def _alerta_insertada(mapper, conexion, alerta):
+    if object_session(alerta) is db.session():
+        registrar_evento(alerta.usuario_id, 'alerta', alerta.to_dict(), conexion)
+
+
+def init_eventos(app):
+    # EVENTOS_BACKEND: 'postgres' (LISTEN/NOTIFY) o 'local'; por defecto según la base de datos
+    backend = app.config.get('EVENTOS_BACKEND')
+    if not backend:
+        uri = app.config.get('SQLALCHEMY_DATABASE_URI') or ''
+        backend = 'postgres' if uri.startswith('postgresql') else 'local'
+    app.extensions['eventos'] = BrokerPostgres(app) if backend == 'postgres' else BrokerLocal()
+
+    # Listeners globales: una sola vez por proceso
+    if not event.contains(Session, 'after_commit', _publicar_pendientes):
+        event.listen(Session, 'after_commit', _publicar_pendientes)
+        event.listen(Session, 'after_rollback', _descartar_pendientes)
+        event.listen(Alerta, 'after_insert', _alerta_insertada)
@@ -0,0 +1,224 @@
+# api/facturacion.py
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from dateutil.relativedelta import relativedelta
+from flask import current_app
+from sqlalchemy import and_, select
+from api.models import db, Suscripcion, Egreso
+from api.cache_categorias import id_categoria
+from api.movimientos import FILAS_POR_INSERT, ajustar_capitales, contabilizar
+from api.cache_respuestas import marcar_modificados
+
+# Periodo de cobro de cada frecuencia admitida. Las suscripciones con otra
+# frecuencia no se cobran automáticamente (sólo con /suscripcion/pagar).
+PERIODOS = {
+    'semanal': relativedelta(weeks=1),
+    'quincenal': relativedelta(days=15),
+    'mensual': relativedelta(months=1),
+    'bimestral': relativedelta(months=2),
+    'trimestral': relativedelta(months=3),
+    'semestral': relativedelta(months=6),
+    'anual': relativedelta(years=1),
+}
+
+# Aplicación heredada por los procesos del pool (se crean con fork)
+_app = None
+
+
+def _periodo(frecuencia):
+    return PERIODOS.get((frecuencia or '').strip().lower())
+
+
+def siguiente_cobro(frecuencia, fecha_inicio, desde):
+    """Primera fecha de cobro estrictamente posterior a `desde`.
+
+    Las fechas se calculan siempre desde fecha_inicio (inicio + k periodos)
+    para que un cobro el 31 no derive al 28 tras pasar por febrero.
+    Devuelve None si la frecuencia no se reconoce.
+    """
+    periodo = _periodo(frecuencia)
+    if periodo is None:
+        return None
+    if desde < fecha_inicio:
+        return fecha_inicio
+
+    # Estimación por días y ajuste fino (los meses no tienen largo fijo)
+    dias_periodo = max((fecha_inicio + periodo - fecha_inicio).days, 1)
+    k = (desde - fecha_inicio).days // dias_periodo
+    while k > 0 and fecha_inicio + periodo * k > desde:
+        k -= 1
+    while fecha_inicio + periodo * k <= desde:
+        k += 1
+    return fecha_inicio + periodo * k
+
+
+def primer_cobro(frecuencia, fecha_inicio, hoy):
+    """Primer cobro a partir de hoy (inclusive); no se cobran periodos pasados."""
+    if _periodo(frecuencia) is None:
+        return None
+    if fecha_inicio >= hoy:
+        return fecha_inicio
+    return siguiente_cobro(frecuencia, fecha_inicio, hoy - timedelta(days=1))
+
+
+def inicializar_proximos_cobros(hoy, tamano_lote=1000):
+    """Calcula proximo_cobro de las suscripciones que aún no lo tienen.
+
+    Recorre por id en lotes; cada lote es un UPDATE ... CASE. Devuelve el
+    número de suscripciones inicializadas. Hace commit por lote.
+    """
+    tabla = Suscripcion.__table__
+    total, ultimo_id = 0, 0
+    while True:
+        filas = db.session.execute(
+            select([tabla.c.id, tabla.c.usuario_id, tabla.c.frecuencia, tabla.c.fecha_inicio])
+            .where(and_(tabla.c.proximo_cobro.is_(None), tabla.c.id > ultimo_id))
+            .order_by(tabla.c.id).limit(tamano_lote)
+        ).fetchall()
+        if not filas:
+            return total
+        ultimo_id = filas[-1].id
+
+        proximos = {f.id: primer_cobro(f.frecuencia, f.fecha_inicio, hoy) for f in filas}
+        proximos = {id: fecha for id, fecha in proximos.items() if fecha is not None}
+        if proximos:
+            db.session.execute(tabla.update().where(tabla.c.id.in_(list(proximos))).values(
+                proximo_cobro=db.case(proximos, value=tabla.c.id)
+            ))
+            marcar_modificados({f.usuario_id for f in filas if f.id in proximos})
+            db.session.commit()
+            total += len(proximos)
+
+
+def _usuarios_con_cobros(hoy):
+    tabla = Suscripcion.__table__
+    return [uid for (uid,) in db.session.execute(
+        select([tabla.c.usuario_id]).where(tabla.c.proximo_cobro <= hoy)
+        .distinct().order_by(tabla.c.usuario_id)
+    )]
+
+
+def _categoria_suscripciones():
+    categoria_id = id_categoria("Suscripciones")
+    if categoria_id is None:
+        raise RuntimeError("No existe la categoría predeterminada 'Suscripciones': "
+                           "créala con POST /categorias/default antes de facturar")
+    return categoria_id
+
+
+def facturar_bloque(usuario_ids, hoy, intentos=3):
+    """Cobra las suscripciones vencidas de un bloque de usuarios.
+
+    Cada suscripción se cobra una vez por periodo vencido hasta `hoy`. La
+    idempotencia la da un UPDATE condicional que mueve proximo_cobro sólo
+    si sigue valiendo lo que se leyó: las filas que otra ejecución (o un
+    pago manual) ya avanzó no se vuelven a cobrar. Luego un INSERT
+    multi-VALUES crea los egresos y se ajustan en bloque resúmenes y
+    capitales. Todo el bloque va en una transacción. Devuelve un Counter
+    con 'suscripciones', 'cobros', 'omitidas' y 'monto'.
+    """
+    # Antes de reclamar nada: sin categoría no se podría insertar ningún egreso
+    categoria_id = _categoria_suscripciones()
+    tabla = Suscripcion.__table__
+    resultado = Counter()
+    pendientes = db.session.execute(
+        select([tabla.c.id, tabla.c.usuario_id, tabla.c.nombre, tabla.c.costo,
+                tabla.c.frecuencia, tabla.c.fecha_inicio, tabla.c.proximo_cobro])
+        .where(and_(tabla.c.usuario_id.in_(usuario_ids), tabla.c.proximo_cobro <= hoy))
+    ).fetchall()
+
+    anteriores, nuevos, cobros = {}, {}, {}
+    for s in pendientes:
+        fechas, fecha = [], s.proximo_cobro
+        while fecha is not None and fecha <= hoy:
+            fechas.append(fecha)
+            fecha = siguiente_cobro(s.frecuencia, s.fecha_inicio, fecha)
+        if fecha is None:
+            resultado['omitidas'] += 1
+            continue
+        anteriores[s.id], nuevos[s.id], cobros[s.id] = s.proximo_cobro, fecha, (s, fechas)
+
+    if not nuevos:
+        db.session.rollback()
+        return resultado
+
+    # Reclamar los periodos: sólo avanza la fila si nadie la movió desde la lectura
+    stmt = tabla.update().where(and_(
+        tabla.c.id.in_(list(nuevos)),
+        tabla.c.proximo_cobro == db.case(anteriores, value=tabla.c.id),
+    )).values(proximo_cobro=db.case(nuevos, value=tabla.c.id))
+
+    if db.session.get_bind().dialect.name == 'postgresql':
+        reclamadas = {id for (id,) in db.session.execute(stmt.returning(tabla.c.id))}
+    elif db.session.execute(stmt).rowcount == len(nuevos):
+        reclamadas = set(nuevos)
+    else:
+        # Sin RETURNING no sabemos qué filas se perdieron: reintentar el bloque
+        db.session.rollback()
+        if intentos <= 1:
+            raise RuntimeError('No se pudo reclamar el bloque de suscripciones')
+        return facturar_bloque(usuario_ids, hoy, intentos - 1)
+
+    egresos, deltas = [], Counter()
+    for id in reclamadas:
+        s, fechas = cobros[id]
+        for fecha in fechas:
+            egresos.append({
+                'monto': s.costo,
+                'descripcion': f"Pago de suscripción: {s.nombre}",
+                'fecha': fecha,
+                'usuario_id': s.usuario_id,
+                'categoria_id': categoria_id,
+            })
+        deltas[s.usuario_id] -= s.costo * len(fechas)
+
+    for inicio in range(0, len(egresos), FILAS_POR_INSERT):
+        db.session.execute(Egreso.__table__.insert().values(egresos[inicio:inicio + FILAS_POR_INSERT]))
+    contabilizar(None, 'egreso', egresos)
+    ajustar_capitales(deltas)
+    db.session.commit()
+
+    resultado['suscripciones'] += len(reclamadas)
+    resultado['cobros'] += len(egresos)
+    resultado['monto'] += sum(e['monto'] for e in egresos)
+    return resultado
+
+
+def _facturar_en_proceso(usuario_ids, hoy):
+    with _app.app_context():
+        try:
+            return facturar_bloque(usuario_ids, hoy)
+        finally:
+            db.session.remove()
+
+
+def facturar_suscripciones(hoy, tamano_bloque=1000, procesos=1):
+    """Cobra todas las suscripciones vencidas hasta `hoy`, por bloques de usuarios.
+
+    Con procesos > 1 los bloques se reparten en un pool de procesos; cada
+    bloque es independiente (sus propios usuarios y su propia transacción),
+    así que una ejecución interrumpida se puede relanzar sin duplicar cobros.
+    Devuelve un Counter con los totales; lanza RuntimeError si falta la
+    categoría 'Suscripciones'.
+    """
+    global _app
+    _categoria_suscripciones()
+    usuarios = _usuarios_con_cobros(hoy)
+    bloques = [usuarios[i:i + tamano_bloque] for i in range(0, len(usuarios), tamano_bloque)]
+    total = Counter(usuarios=len(usuarios))
+
+    if procesos <= 1 or len(bloques) <= 1:
+        for bloque in bloques:
+            total.update(facturar_bloque(bloque, hoy))
+        return total
+
+    # Los hijos no deben heredar conexiones abiertas del padre
+    _app = current_app._get_current_object()
+    db.session.remove()
+    db.engine.dispose()
+    with ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context('fork')) as pool:
+        for parcial in pool.map(_facturar_en_proceso, bloques, [hoy] * len(bloques)):
+            total.update(parcial)
+    return total
@@ -0,0 +1,169 @@
+# api/gastos_categorias.py
+from datetime import date, timedelta
+from sqlalchemy import and_, column, select, table, union_all
+from api.models import db, Categoria, Egreso, ResumenMensual
+from api.particiones import sumar_meses
+
+# Gasto por categoría. En PostgreSQL los meses ya cerrados se leen de la
+# vista materializada gastos_por_categoria_mensual (migración e8b4c2d6f1a3),
+# que `flask refrescar-gastos-categorias` refresca sin bloquear lecturas
+# (REFRESH ... CONCURRENTLY, gracias a su índice único) y anota en
+# refrescos_vistas. La vista sólo cubre los meses anteriores al de su último
+# refresco, y de ellos no los que tengan movimientos contabilizados después
+# (resumenes_mensuales.modificado_en: importaciones, /lote, cancelación de
+# planes...). El resto del rango, o todo si la vista nunca se refrescó o en
+# otros motores, se agrupa al vuelo desde egresos, en la misma sentencia.
+VISTA = 'gastos_por_categoria_mensual'
+
+# Una transacción que empezó antes del REFRESH y confirmó después no está en
+# la vista, y su modificado_en (now(), el inicio de la transacción) es
+# anterior al refresco: las modificaciones de este margen previo también cuentan
+MARGEN_REFRESCO = timedelta(hours=1)
+
+vista = table(
+    VISTA,
+    column('usuario_id'),
+    column('mes'),  # día 1 del mes
+    column('categoria_id'),
+    column('total'),
+    column('cantidad'),
+)
+
+refrescos = table(
+    'refrescos_vistas',
+    column('vista'),
+    column('refrescada_en', db.DateTime(timezone=True)),
+)
+
+
+def _usar_vista():
+    return db.session.get_bind().dialect.name == 'postgresql'
+
+
+def _estado_vista(usuario_id, desde, hasta):
+    """Instante del último refresco de la vista (None si nunca se refrescó) y
+    meses (día 1) de los años de [desde, hasta] en los que el usuario tiene
+    movimientos contabilizados después. Una sola consulta.
+    """
+    resumenes = ResumenMensual.__table__
+    filas = db.session.execute(
+        select([refrescos.c.refrescada_en, resumenes.c.anio, resumenes.c.mes])
+        .select_from(refrescos.outerjoin(resumenes, and_(
+            resumenes.c.usuario_id == usuario_id,
+            resumenes.c.anio.between(desde.year, hasta.year),
+            resumenes.c.modificado_en > refrescos.c.refrescada_en - MARGEN_REFRESCO,
+        )))
+        .where(refrescos.c.vista == VISTA)
+    ).fetchall()
+    if not filas:
+        return None, set()
+    return filas[0].refrescada_en, {date(f.anio, f.mes, 1) for f in filas if f.anio is not None}
+
+
+def _agregar(rangos, inicio, fin):
+    # Une los rangos contiguos: una rama menos en la consulta
+    if rangos and rangos[-1][1] == inicio:
+        rangos[-1] = (rangos[-1][0], fin)
+    else:
+        rangos.append((inicio, fin))
+
+
+def _tramos(desde, hasta, corte, desactualizados=()):
+    """Divide el rango [desde, hasta] en meses completos anteriores a `corte`,
+    que se leen de la vista, y los tramos que se calculan desde egresos: los
+    extremos incompletos, lo posterior a `corte` y los meses (día 1) de
+    `desactualizados`.
+
+    Devuelve (meses, tramos), dos listas de (desde, fin); los fines son
+    exclusivos.
+    """
+    fin = hasta + timedelta(days=1)
+    primero = desde if desde.day == 1 else sumar_meses(desde, 1)
+    ultimo = min(fin.replace(day=1), corte)
+    if primero >= ultimo:
+        return [], [(desde, fin)]
+
+    meses, tramos = [], []
+    if desde < primero:
+        _agregar(tramos, desde, primero)
+    mes = primero
+    while mes < ultimo:
+        siguiente = sumar_meses(mes, 1)
+        _agregar(tramos if mes in desactualizados else meses, mes, siguiente)
+        mes = siguiente
+    if ultimo < fin:
+        _agregar(tramos, ultimo, fin)
+    return meses, tramos
+
+
+def _rama_egresos(usuario_id, desde, fin):
+    egresos = Egreso.__table__
+    return select([
+        egresos.c.categoria_id,
+        db.func.sum(egresos.c.monto).label('total'),
+        db.func.count().label('cantidad'),
+    ]).where(and_(
+        egresos.c.usuario_id == usuario_id, egresos.c.fecha >= desde, egresos.c.fecha < fin
+    )).group_by(egresos.c.categoria_id)
+
+
+def _rama_vista(usuario_id, primero, fin):
+    return select([vista.c.categoria_id, vista.c.total, vista.c.cantidad]).where(and_(
+        vista.c.usuario_id == usuario_id, vista.c.mes >= primero, vista.c.mes < fin
+    ))
+
+
+def gastos_por_categoria(usuario_id, desde, hasta):
+    """Total, número de egresos y porcentaje del gasto de cada categoría
+    entre `desde` y `hasta` (ambos incluidos), de mayor a menor total.
+
+    Una sola consulta, ya unida a categorias para traer nombre e icono (más
+    otra, en PostgreSQL, para saber qué meses están al día en la vista).
+    """
+    meses, tramos = [], [(desde, hasta + timedelta(days=1))]
+    if _usar_vista():
+        refrescada_en, desactualizados = _estado_vista(usuario_id, desde, hasta)
+        if refrescada_en is not None:
+            # Los meses anteriores al del refresco estaban completos al refrescar
+            meses, tramos = _tramos(desde, hasta, refrescada_en.date().replace(day=1), desactualizados)
+
+    ramas = [_rama_egresos(usuario_id, inicio, fin) for inicio, fin in tramos]
+    ramas += [_rama_vista(usuario_id, inicio, fin) for inicio, fin in meses]
+    partes = (union_all(*ramas) if len(ramas) > 1 else ramas[0]).alias('partes')
+
+    categorias = Categoria.__table__
+    total = db.func.sum(partes.c.total).label('total')
+    filas = db.session.execute(
+        select([categorias.c.id, categorias.c.nombre, categorias.c.icono,
+                total, db.func.sum(partes.c.cantidad).label('cantidad')])
+        .select_from(partes.join(categorias, categorias.c.id == partes.c.categoria_id))
+        .group_by(categorias.c.id, categorias.c.nombre, categorias.c.icono)
+        .order_by(total.desc(), categorias.c.id)
+    ).fetchall()
+
+    suma = sum(f.total or 0.0 for f in filas)
+    return [{
+        'categoria_id': f.id,
+        'nombre': f.nombre,
+        'icono': f.icono,
+        'total': f.total or 0.0,
+        'cantidad': int(f.cantidad or 0),
+        'porcentaje': round(100.0 * (f.total or 0.0) / suma, 2) if suma else 0.0,
+    } for f in filas]
+
+
+def refrescar_gastos_por_categoria(concurrente=True):
+    """Recalcula la vista materializada y anota el instante en
+    refrescos_vistas, en la misma transacción. CONCURRENTLY no bloquea las
+    lecturas mientras se recalcula (requiere el índice único de la vista y
+    que ya tenga datos). No hace commit; en otros motores no hace nada.
+    """
+    if not _usar_vista():
+        return False
+    db.session.execute(db.text(f"REFRESH MATERIALIZED VIEW {'CONCURRENTLY ' if concurrente else ''}{VISTA}"))
+    # now() es el inicio de la transacción: anterior a la foto que tomó el REFRESH
+    db.session.execute(db.text(
+        "INSERT INTO refrescos_vistas (vista, refrescada_en) VALUES (:vista, now()) "
+        "ON CONFLICT (vista) DO UPDATE SET refrescada_en = excluded.refrescada_en"
+    ), {'vista': VISTA})
+    return True
@@ -0,0 +1,285 @@
+# api/importaciones.py
+import csv
+import io
+import json
+import re
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from api.models import db, Categoria, Ingreso, Egreso, Importacion, calcular_huella
+from api.movimientos import registrar_lote
+
+# Filas del CSV que se procesan (y se confirman) juntas
+FILAS_POR_BLOQUE = 500
+
+# Nombres de columna aceptados en los extractos, normalizados a minúsculas y sin acentos
+ALIAS_COLUMNAS = {
+    'fecha': ('fecha', 'date', 'fecha operacion', 'fecha valor'),
+    'descripcion': ('descripcion', 'concepto', 'detalle', 'description'),
+    'monto': ('monto', 'importe', 'cantidad', 'amount'),
+    'categoria': ('categoria', 'category'),
+    'tipo': ('tipo', 'type'),
+}
+
+# Categorías usadas cuando el extracto no trae una reconocible
+CATEGORIA_POR_DEFECTO = {'ingreso': 'Ingreso Extraordinario', 'egreso': 'Gastos Varios'}
+
+_executor = None
+
+
+def _normalizar(texto):
+    texto = unicodedata.normalize('NFKD', (texto or '').strip().lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def _leer_fecha(valor):
+    valor = (valor or '').strip()
+    for formato in ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%d/%m/%y'):
+        try:
+            return datetime.strptime(valor, formato).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Fecha no reconocida: '{valor}'")
+
+
+def _leer_monto(valor):
+    # Acepta "1234.56", "-1.234,56", "$ 1,234.56"...: el último separador es el decimal
+    limpio = re.sub(r'[^\d,.\-]', '', valor or '')
+    if ',' in limpio and '.' in limpio:
+        decimal = ',' if limpio.rfind(',') > limpio.rfind('.') else '.'
+        miles = '.' if decimal == ',' else ','
+        limpio = limpio.replace(miles, '').replace(decimal, '.')
+    elif ',' in limpio:
+        limpio = limpio.replace(',', '.')
+    if not limpio:
+        raise ValueError(f"Monto no reconocido: '{valor}'")
+    return float(limpio)
+
+
+def _mapear_columnas(encabezados):
+    normalizados = {_normalizar(e): e for e in encabezados or []}
+    columnas = {}
+    for campo, alias in ALIAS_COLUMNAS.items():
+        for nombre in alias:
+            if nombre in normalizados:
+                columnas[campo] = normalizados[nombre]
+                break
+    return columnas
+
+
+def _categorias_del_usuario(usuario_id):
+    # Nombre normalizado -> id, para las categorías por defecto y las del usuario
+    categorias = db.session.query(Categoria.id, Categoria.nombre).filter(
+        (Categoria.is_default == True) | (Categoria.user_id == usuario_id)
+    )
+    return {_normalizar(nombre): id for id, nombre in categorias}
+
+
+def _interpretar_fila(fila, columnas, categorias):
+    fecha = _leer_fecha(fila.get(columnas['fecha']))
+    monto = _leer_monto(fila.get(columnas['monto']))
+    descripcion = (fila.get(columnas.get('descripcion')) or '').strip()[:255]
+
+    tipo = _normalizar(fila.get(columnas['tipo'])) if 'tipo' in columnas else ''
+    if tipo not in ('ingreso', 'egreso'):
+        tipo = 'egreso' if monto < 0 else 'ingreso'
+    monto = abs(monto)
+    if monto == 0:
+        raise ValueError('El monto debe ser distinto de cero')
+
+    categoria_id = None
+    if 'categoria' in columnas:
+        categoria_id = categorias.get(_normalizar(fila.get(columnas['categoria'])))
+    if categoria_id is None:
+        categoria_id = categorias.get(_normalizar(CATEGORIA_POR_DEFECTO[tipo]))
+    if categoria_id is None:
+        raise ValueError(f"No existe la categoría '{CATEGORIA_POR_DEFECTO[tipo]}'")
+
+    return tipo, {
+        'fecha': fecha.isoformat(),
+        'monto': monto,
+        'descripcion': descripcion,
+        'categoria_id': categoria_id,
+    }
+
+
+def _huellas_existentes(modelo, usuario_id, huellas, fechas):
+    # Una consulta por bloque sobre el índice (usuario_id, huella). La huella
+    # incluye la fecha: acotar por las fechas del bloque no pierde duplicados
+    # y en PostgreSQL sólo lee las particiones de esos meses.
+    if not huellas:
+        return set()
+    return {h for (h,) in db.session.query(modelo.huella).filter(
+        modelo.usuario_id == usuario_id, modelo.huella.in_(huellas),
+        modelo.fecha >= min(fechas), modelo.fecha <= max(fechas)
+    )}
+
+
+def _procesar_bloque(importacion, bloque, columnas, categorias, vistas, errores):
+    por_tipo = {'ingreso': [], 'egreso': []}
+    for linea, fila in bloque:
+        try:
+            tipo, valores = _interpretar_fila(fila, columnas, categorias)
+        except ValueError as e:
+            errores.append({'linea': linea, 'error': str(e)})
+            continue
+        huella = calcular_huella(importacion.usuario_id, valores['fecha'], valores['monto'], valores['descripcion'])
+        if huella in vistas:
+            # Repetida dentro del mismo archivo
+            importacion.duplicadas += 1
+            continue
+        vistas.add(huella)
+        por_tipo[tipo].append((linea, huella, valores))
+
+    for tipo, modelo in (('ingreso', Ingreso), ('egreso', Egreso)):
+        candidatas = por_tipo[tipo]
+        existentes = _huellas_existentes(modelo, importacion.usuario_id, [h for _, h, _ in candidatas],
+                                         [date.fromisoformat(v['fecha']) for _, _, v in candidatas])
+        nuevas = [(linea, valores) for linea, huella, valores in candidatas if huella not in existentes]
+        importacion.duplicadas += len(candidatas) - len(nuevas)
+        if nuevas:
+            insertadas, errores_lote = registrar_lote(tipo, importacion.usuario_id, [v for _, v in nuevas])
+            importacion.insertadas += insertadas
+            errores.extend({'linea': nuevas[e['indice']][0], 'error': e['error']} for e in errores_lote)
+
+    importacion.procesadas += len(bloque)
+
+
+def reclamar_importacion(importacion_id=None):
+    """Toma una importación pendiente (la indicada o la más antigua) y la
+    marca como 'procesando'. Devuelve su id, o None si no hay ninguna libre.
+
+    En PostgreSQL la fila se elige con FOR UPDATE SKIP LOCKED, así varios
+    workers no se esperan entre sí; el UPDATE condicionado al estado evita
+    que dos la tomen también en motores sin SKIP LOCKED (SQLite).
+    """
+    consulta = db.session.query(Importacion.id).filter(Importacion.estado == 'pendiente')
+    if importacion_id is not None:
+        consulta = consulta.filter(Importacion.id == importacion_id)
+    fila = consulta.order_by(Importacion.id).with_for_update(skip_locked=True).first()
+    if fila is None:
+        db.session.rollback()
+        return None
+
+    tomadas = Importacion.query.filter(
+        Importacion.id == fila.id, Importacion.estado == 'pendiente'
+    ).update({
+        'estado': 'procesando',
+        'intentos': db.func.coalesce(Importacion.intentos, 0) + 1,
+        'actualizada_en': datetime.now(timezone.utc),
+    }, synchronize_session=False)
+    db.session.commit()
+    return fila.id if tomadas else None
+
+
+def recuperar_importaciones(tiempo_muerto, max_intentos):
+    """Devuelve a la cola las importaciones 'procesando' sin avances desde
+    hace `tiempo_muerto` segundos (su worker murió o se reinició) y da por
+    fallidas las que ya se intentaron `max_intentos` veces. Al retomarse
+    continúan desde la última fila confirmada. Devuelve (reencoladas, fallidas).
+    """
+    ahora = datetime.now(timezone.utc)
+    estancadas = Importacion.query.filter(
+        Importacion.estado == 'procesando',
+        db.func.coalesce(Importacion.actualizada_en, Importacion.creada_en) < ahora - timedelta(seconds=tiempo_muerto)
+    ).with_for_update(skip_locked=True).all()
+
+    reencoladas = fallidas = 0
+    for importacion in estancadas:
+        if (importacion.intentos or 0) >= max_intentos:
+            errores = json.loads(importacion.errores) if importacion.errores else []
+            errores.append({'linea': None, 'error': f'Interrumpida {importacion.intentos} veces; se abandona'})
+            importacion.errores = json.dumps(errores)
+            importacion.estado = 'fallida'
+            importacion.contenido = None
+            importacion.finalizada_en = ahora
+            fallidas += 1
+        else:
+            importacion.estado = 'pendiente'
+            reencoladas += 1
+    db.session.commit()
+    return reencoladas, fallidas
+
+
+def procesar_importacion(importacion_id):
+    """Procesa el extracto CSV de una importación ya reclamada.
+
+    Cada bloque de FILAS_POR_BLOQUE filas se interpreta, se deduplica por
+    huella contra los movimientos existentes y se inserta en una
+    transacción propia, actualizando el progreso de la importación. Si se
+    retoma tras una interrupción, salta las filas ya procesadas.
+    """
+    importacion = Importacion.query.get(importacion_id)
+    errores = json.loads(importacion.errores) if importacion.errores else []
+    ya_procesadas = importacion.procesadas or 0
+
+    try:
+        lector = csv.DictReader(io.StringIO(importacion.contenido or '', newline=''))
+        columnas = _mapear_columnas(lector.fieldnames)
+        faltantes = [c for c in ('fecha', 'monto') if c not in columnas]
+        if faltantes:
+            raise ValueError(f"El CSV no tiene las columnas: {', '.join(faltantes)}")
+
+        categorias = _categorias_del_usuario(importacion.usuario_id)
+        vistas = set()
+        bloque = []
+        # La línea 1 es el encabezado
+        for linea, fila in enumerate(lector, start=2):
+            if linea - 2 < ya_procesadas:
+                continue
+            bloque.append((linea, fila))
+            if len(bloque) >= FILAS_POR_BLOQUE:
+                _procesar_bloque(importacion, bloque, columnas, categorias, vistas, errores)
+                importacion.errores = json.dumps(errores)
+                importacion.actualizada_en = datetime.now(timezone.utc)
+                db.session.commit()
+                bloque = []
+        if bloque:
+            _procesar_bloque(importacion, bloque, columnas, categorias, vistas, errores)
+
+        importacion.estado = 'completada'
+    except Exception as e:
+        db.session.rollback()
+        importacion = Importacion.query.get(importacion_id)
+        errores.append({'linea': None, 'error': str(e)})
+        importacion.estado = 'fallida'
+
+    importacion.errores = json.dumps(errores)
+    importacion.contenido = None
+    importacion.finalizada_en = datetime.now(timezone.utc)
+    db.session.commit()
+
+
+def procesar_siguiente(app):
+    """Recupera las importaciones estancadas y procesa la siguiente
+    pendiente. Devuelve su id, o None si la cola está vacía."""
+    recuperar_importaciones(app.config.get('IMPORTACION_TIEMPO_MUERTO', 300),
+                            app.config.get('IMPORTACION_MAX_INTENTOS', 3))
+    importacion_id = reclamar_importacion()
+    if importacion_id is not None:
+        procesar_importacion(importacion_id)
+    return importacion_id
+
+
+def _ejecutar_en_contexto(app, importacion_id):
+    # El hilo del worker necesita su propio contexto (y por tanto su propia sesión)
+    with app.app_context():
+        if reclamar_importacion(importacion_id) is not None:
+            procesar_importacion(importacion_id)
+
+
+def encolar_importacion(app, importacion_id):
+    """Avisa de una importación nueva (ya guardada como 'pendiente').
+
+    La procesa `flask procesar-importaciones`, un proceso aparte que
+    sobrevive a los reinicios de la web. Con IMPORTACION_WORKERS > 0 se
+    procesa además en hilos del propio proceso (desarrollo, un solo
+    dyno): si el proceso muere, el worker la retoma al caducar.
+    """
+    global _executor
+    workers = app.config.get('IMPORTACION_WORKERS', 0)
+    if workers <= 0:
+        return None
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='importaciones')
+    return _executor.submit(_ejecutar_en_contexto, app, importacion_id)
@@ -0,0 +1,121 @@
+# api/instrumentacion.py
+import logging
+import time
+from flask import g, has_request_context, request, current_app
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+class PresupuestoSQLExcedido(Exception):
+    """Una ruta ejecutó más sentencias SQL que su presupuesto (modo estricto)."""
+
+
+class PatronNMas1(Exception):
+    """Una ruta repitió la misma sentencia con distintos parámetros (modo estricto)."""
+
+
+def presupuesto_sql(maximo):
+    """Declara cuántas sentencias SQL puede ejecutar como máximo una ruta.
+
+    Se coloca debajo de @token_required. Al terminar la petición se compara
+    con lo ejecutado: con SQL_PRESUPUESTO_ESTRICTO se lanza
+    PresupuestoSQLExcedido (pensado para tests), si no sólo se registra un aviso.
+    """
+    def decorador(f):
+        # wraps() de los decoradores exteriores copia este atributo a la envoltura final
+        f.presupuesto_sql = maximo
+        return f
+    return decorador
+
+
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.sql_sentencias = g.get('sql_sentencias', 0) + 1
+        conn.info['sql_inicio'] = time.perf_counter()
+
+        # Misma sentencia con parámetros distintos: candidata a N+1
+        umbral = current_app.config.get('SQL_REPETICIONES_N_MAS_1', 5)
+        vistas = g.setdefault('sql_parametros', {}).setdefault(statement, set())
+        if len(vistas) < umbral:
+            vistas.add(repr(parameters))
+
+
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    inicio = conn.info.pop('sql_inicio', None)
+    if inicio is not None and has_request_context():
+        g.sql_tiempo = g.get('sql_tiempo', 0.0) + time.perf_counter() - inicio
+
+
+def sentencias_ejecutadas():
+    """Sentencias SQL ejecutadas hasta ahora en la petición en curso."""
+    return g.get('sql_sentencias', 0)
+
+
+def tiempo_sql():
+    """Segundos pasados en la base de datos en la petición en curso."""
+    return g.get('sql_tiempo', 0.0)
+
+
+def sentencias_repetidas():
+    """Sentencias ejecutadas con al menos SQL_REPETICIONES_N_MAS_1 parámetros distintos."""
+    umbral = current_app.config.get('SQL_REPETICIONES_N_MAS_1', 5)
+    return [sentencia for sentencia, vistas in g.get('sql_parametros', {}).items() if len(vistas) >= umbral]
+
+
+def _iniciar_medicion():
+    # g es del contexto de aplicación: dentro de un app_context() abierto
+    # (tests, benchmark) varias peticiones lo comparten
+    g.sql_sentencias = 0
+    g.sql_tiempo = 0.0
+    g.sql_parametros = {}
+    g.peticion_inicio = time.perf_counter()
+
+
+def _verificar_presupuesto(respuesta):
+    vista = current_app.view_functions.get(request.endpoint)
+    maximo = getattr(vista, 'presupuesto_sql', None)
+    usadas = sentencias_ejecutadas()
+    estricto = current_app.config.get('SQL_PRESUPUESTO_ESTRICTO')
+    if maximo is not None and usadas > maximo:
+        mensaje = f"{request.method} {request.path}: {usadas} sentencias SQL (presupuesto {maximo})"
+        if estricto:
+            raise PresupuestoSQLExcedido(mensaje)
+        logger.warning(mensaje)
+
+    repetidas = sentencias_repetidas()
+    if repetidas:
+        mensaje = f"{request.method} {request.path}: posible N+1 en {len(repetidas)} sentencia(s): " \
+                  + ' | '.join(' '.join(s.split())[:200] for s in repetidas)
+        if estricto:
+            raise PatronNMas1(mensaje)
+        logger.warning(mensaje)
+    return respuesta
+
+
+def _registrar_tiempos(respuesta):
+    total_ms = (time.perf_counter() - g.get('peticion_inicio', time.perf_counter())) * 1000
+    db_ms = tiempo_sql() * 1000
+    usadas = sentencias_ejecutadas()
+
+    if current_app.config.get('SERVER_TIMING', True):
+        respuesta.headers.add('Server-Timing', f'db;dur={db_ms:.1f};desc="{usadas} sentencias"')
+        respuesta.headers.add('Server-Timing', f'app;dur={total_ms:.1f}')
+
+    if db_ms > current_app.config.get('SQL_LENTA_MS', 500) \
+            or usadas > current_app.config.get('SQL_SENTENCIAS_AVISO', 50):
+        logger.warning("%s %s lenta: %d sentencias SQL, %.1f ms en base de datos, %.1f ms en total",
+                       request.method, request.path, usadas, db_ms, total_ms)
+    return respuesta
+
+
+def init_instrumentacion(app):
+    # Un único par de listeners para todos los engines (incluido el de los tests)
+    if not event.contains(Engine, 'before_cursor_execute', _antes_de_ejecutar):
+        event.listen(Engine, 'before_cursor_execute', _antes_de_ejecutar)
+        event.listen(Engine, 'after_cursor_execute', _despues_de_ejecutar)
+    app.before_request(_iniciar_medicion)
+    # after_request se ejecuta en orden inverso: primero el presupuesto, luego los tiempos
+    app.after_request(_registrar_tiempos)
+    app.after_request(_verificar_presupuesto)
@@ -0,0 +1,103 @@
+# api/json_rapido.py
+import json
+from datetime import date
+from decimal import Decimal
+from flask import current_app
+
+try:
+    import orjson
+except ImportError:  # Sin orjson se usa el json de la biblioteca estándar, más lento
+    orjson = None
+
+try:
+    from flask.json.provider import DefaultJSONProvider
+except ImportError:  # Flask < 2.2: jsonify() usa app.json_encoder (CodificadorJSON)
+    DefaultJSONProvider = None
+    from flask.json import JSONEncoder
+
+# Serialización de los listados: filas de columnas (no entidades del ORM)
+# convertidas directamente a bytes. orjson serializa date/datetime en ISO
+# 8601 de forma nativa, igual que los .isoformat() de los to_dict().
+
+
+def _por_defecto(valor):
+    if isinstance(valor, date):  # también datetime
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    raise TypeError(f"Tipo no serializable a JSON: {type(valor).__name__}")
+
+
+def dumps(datos):
+    """JSON compacto en bytes (UTF-8)."""
+    if orjson is not None:
+        return orjson.dumps(datos, default=_por_defecto)
+    return json.dumps(datos, default=_por_defecto, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def loads(datos):
+    if orjson is not None:
+        return orjson.loads(datos)
+    return json.loads(datos)
+
+
+def filas_a_dicts(filas):
+    """Lista de diccionarios a partir de filas de una consulta por columnas.
+
+    Las claves son las etiquetas de las columnas, en el orden del SELECT.
+    """
+    if not filas:
+        return []
+    claves = filas[0]._fields
+    return [dict(zip(claves, fila)) for fila in filas]
+
+
+def respuesta_json(datos, status=200, headers=None):
+    """Equivalente a jsonify() con el serializador rápido."""
+    return current_app.response_class(dumps(datos), status=status, headers=headers, mimetype='application/json')
+
+
+if DefaultJSONProvider is not None:
+    class ProveedorJSON(DefaultJSONProvider):
+        """Proveedor de Flask >= 2.2: jsonify() y request.get_json() con orjson."""
+
+        def dumps(self, obj, **kwargs):
+            kwargs.pop('separators', None)  # jsonify() pide salida compacta, que es la de orjson
+            if kwargs:  # otras opciones de json.dumps (indent en modo debug...): implementación estándar
+                return super().dumps(obj, **kwargs)
+            return dumps(obj).decode('utf-8')
+
+        def loads(self, s, **kwargs):
+            return loads(s)
+
+
+else:
+    class CodificadorJSON(JSONEncoder):
+        """app.json_encoder de Flask 1.x: jsonify() con orjson.
+
+        Las fechas siguen pasando por JSONEncoder.default (formato HTTP, como
+        hasta ahora) y las claves se ordenan si lo pide JSON_SORT_KEYS. Con
+        indent (JSONIFY_PRETTYPRINT_REGULAR) o cualquier valor que orjson no
+        admita (enteros de más de 64 bits...) se usa la implementación
+        estándar. La salida va en UTF-8 aunque JSON_AS_ASCII esté activo.
+        """
+
+        def encode(self, o):
+            if self.indent is not None:
+                return super().encode(o)
+            opciones = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+            if self.sort_keys:
+                opciones |= orjson.OPT_SORT_KEYS
+            try:
+                return orjson.dumps(o, default=self.default, option=opciones).decode('utf-8')
+            except TypeError:
+                return super().encode(o)
+
+
+def init_json(app):
+    if orjson is None:
+        return
+    if DefaultJSONProvider is not None:
+        app.json = ProveedorJSON(app)
+    else:
+        app.json_encoder = CodificadorJSON
@@ -1,10 +1,24 @@
-from flask_sqlalchemy import SQLAlchemy
+from api.replica import SQLAlchemyConReplica
 from datetime import datetime, timezone,date
 from sqlalchemy import Column, ForeignKey, String, Date, DateTime
 from sqlalchemy.orm import relationship,remote
 import hashlib
+import json
 
-db = SQLAlchemy()
+# Sesión que enruta las lecturas de las rutas de sólo lectura a DATABASE_REPLICA_URL
+db = SQLAlchemyConReplica()
+
+
+def calcular_huella(usuario_id, fecha, monto, descripcion):
+    # Huella de un movimiento para detectar duplicados al importar extractos
+    fecha = fecha.isoformat() if isinstance(fecha, date) else (fecha or '')
+    clave = f"{usuario_id}|{fecha}|{float(monto):.2f}|{(descripcion or '').strip().lower()}"
+    return hashlib.sha256(clave.encode('utf-8')).hexdigest()
+
+def _huella_por_defecto(context):
+    # Default de columna: se calcula también en inserts masivos (executemany / multi-VALUES)
+    params = context.get_current_parameters()
+    return calcular_huella(params['usuario_id'], params.get('fecha'), params['monto'], params.get('descripcion'))
 
 # Modelo de Usuario
 class Usuario(db.Model):
@@ -48,8 +62,12 @@ class Usuario(db.Model):
         }
     
     def calcular_totales(self):
-        total_ingresos = sum(ingreso.monto for ingreso in self.ingresos)
-        total_egresos = sum(egreso.monto for egreso in self.egresos)
+        # Suma en la base de datos sobre el resumen mensual (una fila por mes),
+        # sin cargar los ingresos/egresos del usuario en memoria
+        total_ingresos, total_egresos = db.session.query(
+            db.func.coalesce(db.func.sum(ResumenMensual.ingresos), 0.0),
+            db.func.coalesce(db.func.sum(ResumenMensual.egresos), 0.0)
+        ).filter(ResumenMensual.usuario_id == self.id).one()
         return {
             "capital_inicial": self.capital_inicial,
             "total_ingresos": total_ingresos,
@@ -66,6 +84,10 @@ class Categoria(db.Model):
     icono =  Column(db.String(10), nullable=False, unique=True)
     is_default = db.Column(db.Boolean, default=False)  # Categoría predeterminada
     user_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=True)  # Null si es predeterminada
+    # Movimientos que usan la categoría, mantenidos al escribir (sólo categorías de usuario);
+    # usos_egresos cuenta también los egresos archivados
+    usos_ingresos = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    usos_egresos = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     egresos = relationship('Egreso', backref='categoria', lazy=True)
     ingresos = relationship('Ingreso', backref='categoria', lazy=True)
 
@@ -82,13 +104,23 @@ class Categoria(db.Model):
 # Modelo de Ingreso  UV J
 class Ingreso(db.Model):
     __tablename__ = 'ingresos'
+    __table_args__ = (
+        # Listados keyset por usuario ordenados por (fecha, id)
+        db.Index('ix_ingresos_usuario_fecha_id', 'usuario_id', 'fecha', 'id'),
+        # Búsqueda de duplicados por huella al importar extractos
+        db.Index('ix_ingresos_usuario_huella', 'usuario_id', 'huella'),
+        # Anti-join al purgar categorías sin uso
+        db.Index('ix_ingresos_categoria_id', 'categoria_id'),
+    )
     id = Column(db.Integer, primary_key=True)
     monto = Column(db.Float, nullable=False)
     descripcion = Column(db.String(255))
-    fecha = Column(db.Date, default=date.today)
+    # En PostgreSQL la tabla está particionada por mes de fecha (api/particiones.py)
+    # y su clave primaria es (id, fecha); para el ORM basta con el id
+    fecha = Column(db.Date, nullable=False, default=date.today)
     usuario_id = Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
     categoria_id = Column(db.Integer, db.ForeignKey('categorias.id'), nullable=False)
-    
+    huella = Column(db.String(64), default=_huella_por_defecto)
 
     def to_dict(self):
         return {
@@ -136,13 +168,25 @@ class PlanAhorro(db.Model):
 # Modelo de Egresoclass Egreso(db.Model):
 class Egreso(db.Model):
     __tablename__ = 'egresos'
+    __table_args__ = (
+        # Listados keyset por usuario ordenados por (fecha, id)
+        db.Index('ix_egresos_usuario_fecha_id', 'usuario_id', 'fecha', 'id'),
+        # Búsqueda de duplicados por huella al importar extractos
+        db.Index('ix_egresos_usuario_huella', 'usuario_id', 'huella'),
+        # Depósitos de un plan de ahorro (cancelación en bloque)
+        db.Index('ix_egresos_plan_ahorro_id', 'plan_ahorro_id'),
+        # Anti-join al purgar categorías sin uso
+        db.Index('ix_egresos_categoria_id', 'categoria_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     monto = db.Column(db.Float, nullable=False)
     descripcion = db.Column(db.String(255))
-    fecha = db.Column(db.Date, default=date.today)
+    # Particionada por mes de fecha en PostgreSQL, como ingresos
+    fecha = db.Column(db.Date, nullable=False, default=date.today)
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
     categoria_id = db.Column(db.Integer, db.ForeignKey('categorias.id'), nullable=False)
     plan_ahorro_id = db.Column(db.Integer, db.ForeignKey('planes_ahorro.id'), nullable=True)
+    huella = db.Column(db.String(64), default=_huella_por_defecto)
 
     # Cambiar backref a back_populates
     plan_ahorro = db.relationship(
@@ -164,6 +208,34 @@ class Egreso(db.Model):
 
 
 
+# Modelo de Egreso Archivado (depósitos de planes de ahorro cancelados)
+class EgresoArchivado(db.Model):
+    __tablename__ = 'egresos_archivados'
+    id = db.Column(db.Integer, primary_key=True)  # Mismo id que tenía en egresos
+    monto = db.Column(db.Float, nullable=False)
+    descripcion = db.Column(db.String(255))
+    fecha = db.Column(db.Date)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False, index=True)
+    categoria_id = db.Column(db.Integer, db.ForeignKey('categorias.id'), nullable=False, index=True)
+    plan_ahorro_id = db.Column(db.Integer)  # El plan ya no existe: sin clave foránea
+    nombre_plan = db.Column(db.String(255))
+    archivado_en = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'monto': self.monto,
+            'descripcion': self.descripcion,
+            'fecha': self.fecha.isoformat() if self.fecha else None,
+            'usuario_id': self.usuario_id,
+            'categoria_id': self.categoria_id,
+            'plan_ahorro_id': self.plan_ahorro_id,
+            'nombre_plan': self.nombre_plan,
+            'archivado_en': self.archivado_en.isoformat() if self.archivado_en else None,
+        }
+
+
+
 # Modelo de Suscripción
 class Suscripcion(db.Model):
     __tablename__ = 'suscripciones'
@@ -173,6 +245,13 @@ class Suscripcion(db.Model):
     frecuencia = Column(db.String(50), nullable=False)
     fecha_inicio = Column(db.Date, nullable=False, default=date.today)
     usuario_id = Column(db.Integer, ForeignKey('usuarios.id'), nullable=False)
+    # Fecha del siguiente periodo a cobrar (None si la frecuencia no se cobra automáticamente)
+    proximo_cobro = Column(db.Date, nullable=True)
+
+    __table_args__ = (
+        # Búsqueda de suscripciones vencidas en `flask facturar-suscripciones`
+        db.Index('ix_suscripciones_proximo_cobro_usuario', 'proximo_cobro', 'usuario_id'),
+    )
 
     def to_dict(self):
         return {
@@ -181,6 +260,7 @@ class Suscripcion(db.Model):
             'costo': self.costo,
             'frecuencia': self.frecuencia,
             'fecha_inicio': self.fecha_inicio.isoformat(),
+            'proximo_cobro': self.proximo_cobro.isoformat() if self.proximo_cobro else None,
             'usuario_id': self.usuario_id
         }
 
@@ -197,11 +277,85 @@ class FondoEmergencia(db.Model):
 
 
 
+# Modelo de Resumen Mensual (totales de ingresos y egresos por usuario y mes)
+class ResumenMensual(db.Model):
+    __tablename__ = 'resumenes_mensuales'
+    usuario_id = Column(db.Integer, db.ForeignKey('usuarios.id'), primary_key=True)
+    anio = Column(db.Integer, primary_key=True)
+    mes = Column(db.Integer, primary_key=True)
+    ingresos = Column(db.Float, nullable=False, default=0.0)
+    egresos = Column(db.Float, nullable=False, default=0.0)
+    # Último movimiento contabilizado en el mes: si es posterior al último
+    # refresco de la vista de gasto por categoría, el mes se agrupa al vuelo
+    modificado_en = Column(db.DateTime(timezone=True), default=db.func.now())
+
+    def to_dict(self):
+        return {
+            'anio': self.anio,
+            'mes': self.mes,
+            'ingresos': self.ingresos,
+            'egresos': self.egresos,
+        }
+
+
+
+# Modelo de Importación (trabajo en segundo plano de un extracto bancario CSV)
+class Importacion(db.Model):
+    __tablename__ = 'importaciones'
+    id = Column(db.Integer, primary_key=True)
+    usuario_id = Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+    nombre_archivo = Column(db.String(255))
+    estado = Column(db.String(20), nullable=False, default='pendiente')  # pendiente, procesando, completada, fallida
+    total_filas = Column(db.Integer, default=0)
+    procesadas = Column(db.Integer, default=0)
+    insertadas = Column(db.Integer, default=0)
+    duplicadas = Column(db.Integer, default=0)
+    errores = Column(db.Text)  # JSON con los errores por línea
+    contenido = Column(db.Text)  # CSV pendiente de procesar; se vacía al terminar
+    intentos = Column(db.Integer, default=0)  # Veces que un worker la ha tomado
+    creada_en = Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    actualizada_en = Column(db.DateTime)  # Último avance del worker que la procesa
+    finalizada_en = Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'nombre_archivo': self.nombre_archivo,
+            'estado': self.estado,
+            'total_filas': self.total_filas,
+            'procesadas': self.procesadas,
+            'insertadas': self.insertadas,
+            'duplicadas': self.duplicadas,
+            'errores': json.loads(self.errores) if self.errores else [],
+            'creada_en': self.creada_en.isoformat() if self.creada_en else None,
+            'finalizada_en': self.finalizada_en.isoformat() if self.finalizada_en else None,
+        }
+
+
+
 # Modelo de Alerta
 class Alerta(db.Model):
     __tablename__ = 'alertas'
     id = Column(db.Integer, primary_key=True)
     mensaje = Column(db.String(255), nullable=False)
     leida = Column(db.Boolean, default=False)
-    creada_en = Column(db.DateTime, default=datetime.now(timezone.utc))
-    usuario_id = Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False) 
+    creada_en = Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    usuario_id = Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+
+    __table_args__ = (
+        # Feed del usuario con paginación keyset (creada_en desc, id desc)
+        db.Index('ix_alertas_usuario_creada_id', 'usuario_id', 'creada_en', 'id'),
+        # Índice parcial: sólo las no leídas, para el contador (proporcional a
+        # las no leídas del usuario) y "marcar todas"
+        db.Index('ix_alertas_usuario_no_leidas', 'usuario_id',
+                 postgresql_where=db.text('NOT leida'), sqlite_where=db.text('NOT leida')),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'mensaje': self.mensaje,
+            'leida': self.leida,
+            'creada_en': self.creada_en.isoformat() if self.creada_en else None,
+            'usuario_id': self.usuario_id
+        }
@@ -0,0 +1,612 @@
+# api/movimientos.py
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from flask import current_app
+from sqlalchemy import and_, or_, select, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
+from api.models import db, Ingreso, Egreso, EgresoArchivado, ResumenMensual, Categoria, Usuario, PlanAhorro, calcular_huella
+from api.cache_categorias import id_categoria, ids_predeterminadas
+from api.cache_respuestas import marcar_modificados
+from api.eventos import registrar_evento, registrar_eventos
+from api.utils import APIException, codificar_cursor, decodificar_cursor, leer_fecha, leer_limite
+
+# Columna del resumen mensual que acumula cada tipo de movimiento
+COLUMNAS_RESUMEN = {'ingreso': 'ingresos', 'egreso': 'egresos'}
+
+# Contador de uso en categorias para cada tipo de movimiento
+COLUMNAS_USOS = {'ingreso': 'usos_ingresos', 'egreso': 'usos_egresos'}
+
+
+def ajustar_capital(usuario_id, delta):
+    """Suma `delta` al capital_actual del usuario con un único UPDATE atómico.
+
+    UPDATE usuarios SET capital_actual = capital_actual + :delta ... RETURNING,
+    sin leer el valor en Python, así dos peticiones concurrentes no pisan
+    sus cambios. Devuelve el nuevo capital o None si el usuario no existe.
+    No hace commit: conviene llamarla justo antes para retener el bloqueo
+    de la fila el menor tiempo posible.
+    """
+    tabla = Usuario.__table__
+    stmt = tabla.update().where(tabla.c.id == usuario_id).values(
+        capital_actual=db.func.coalesce(tabla.c.capital_actual, 0.0) + float(delta)
+    )
+
+    if db.session.get_bind().dialect.name == 'postgresql':
+        nuevo_capital = db.session.execute(stmt.returning(tabla.c.capital_actual)).scalar()
+    else:
+        # Motores sin RETURNING (SQLite en desarrollo): la fila ya quedó bloqueada por el UPDATE
+        if not db.session.execute(stmt).rowcount:
+            return None
+        nuevo_capital = db.session.execute(
+            db.select([tabla.c.capital_actual]).where(tabla.c.id == usuario_id)
+        ).scalar()
+
+    # Mantener coherente la instancia ya cargada en la sesión (p. ej. usuario_actual())
+    usuario = db.session.identity_map.get(identity_key(Usuario, usuario_id))
+    if usuario is not None and nuevo_capital is not None:
+        set_committed_value(usuario, 'capital_actual', nuevo_capital)
+    if nuevo_capital is not None:
+        registrar_evento(usuario_id, 'capital', {'capital_actual': nuevo_capital})
+        marcar_modificados([usuario_id])
+    return nuevo_capital
+
+
+def ajustar_capitales(deltas):
+    """Versión en bloque de ajustar_capital para procesos por lotes.
+
+    `deltas` es un diccionario {usuario_id: delta}; se aplica con un único
+    UPDATE ... CASE. Devuelve el número de usuarios actualizados. No hace
+    commit ni sincroniza instancias ya cargadas en la sesión.
+    """
+    deltas = {uid: float(delta) for uid, delta in deltas.items() if delta}
+    if not deltas:
+        return 0
+    tabla = Usuario.__table__
+    stmt = tabla.update().where(tabla.c.id.in_(list(deltas))).values(
+        capital_actual=db.func.coalesce(tabla.c.capital_actual, 0.0)
+        + db.case(deltas, value=tabla.c.id, else_=0.0)
+    )
+
+    if db.session.get_bind().dialect.name == 'postgresql':
+        capitales = db.session.execute(stmt.returning(tabla.c.id, tabla.c.capital_actual)).fetchall()
+    else:
+        db.session.execute(stmt)
+        capitales = db.session.execute(
+            db.select([tabla.c.id, tabla.c.capital_actual]).where(tabla.c.id.in_(list(deltas)))
+        ).fetchall()
+
+    registrar_eventos([(uid, 'capital', {'capital_actual': capital}) for uid, capital in capitales])
+    marcar_modificados(uid for uid, _ in capitales)
+    return len(capitales)
+
+
+def acumular_en_plan(plan_id, usuario_id, monto):
+    """Suma `monto` a monto_acumulado de un plan del usuario con un único UPDATE.
+
+    La condición por usuario_id hace a la vez de verificación de
+    pertenencia. Devuelve la fila actualizada del plan o None si no existe
+    o no pertenece al usuario. No hace commit.
+    """
+    tabla = PlanAhorro.__table__
+    stmt = tabla.update().where(
+        (tabla.c.id == plan_id) & (tabla.c.usuario_id == usuario_id)
+    ).values(monto_acumulado=db.func.coalesce(tabla.c.monto_acumulado, 0.0) + float(monto))
+
+    marcar_modificados([usuario_id])
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return db.session.execute(stmt.returning(*tabla.c)).first()
+
+    if not db.session.execute(stmt).rowcount:
+        return None
+    return db.session.execute(db.select([tabla]).where(tabla.c.id == plan_id)).first()
+
+
+def cancelar_plan(plan, archivar=False):
+    """Elimina un plan de ahorro y sus depósitos con sentencias en bloque.
+
+    Una consulta agrupada por mes obtiene el total a reintegrar y el ajuste
+    de los resúmenes; luego un DELETE (o INSERT ... SELECT + DELETE si se
+    archiva el historial) quita todos los depósitos de una vez y un UPDATE
+    atómico devuelve lo acumulado al capital. El número de sentencias no
+    depende de cuántos depósitos tenga el plan. Devuelve (total_depositos,
+    capital_actual); no hace commit.
+    """
+    egresos = Egreso.__table__
+    del_plan = egresos.c.plan_ahorro_id == plan.id
+
+    anio = db.extract('year', egresos.c.fecha)
+    mes = db.extract('month', egresos.c.fecha)
+    por_mes = db.session.execute(
+        db.select([anio, mes, egresos.c.categoria_id, db.func.sum(egresos.c.monto), db.func.count()])
+        .where(del_plan).group_by(anio, mes, egresos.c.categoria_id)
+    ).fetchall()
+    total_depositos = sum(total or 0.0 for _, _, _, total, _ in por_mes)
+
+    if archivar:
+        columnas = ['id', 'monto', 'descripcion', 'fecha', 'usuario_id', 'categoria_id', 'plan_ahorro_id']
+        db.session.execute(EgresoArchivado.__table__.insert().from_select(
+            columnas + ['nombre_plan', 'archivado_en'],
+            db.select([egresos.c[c] for c in columnas] + [
+                db.literal(plan.nombre_plan), db.literal(datetime.now(timezone.utc))
+            ]).where(del_plan)
+        ))
+    db.session.execute(egresos.delete().where(del_plan))
+
+    # Los archivados siguen referenciando su categoría: dejan de sumar en
+    # los resúmenes pero conservan su uso en usos_egresos
+    contabilizar(plan.usuario_id, 'egreso', [
+        {'fecha': date(int(a), int(m), 1), 'monto': total, 'categoria_id': categoria_id, 'cantidad': cantidad}
+        for a, m, categoria_id, total, cantidad in por_mes
+    ], signo=-1, usos=not archivar)
+
+    reintegro = plan.monto_acumulado or 0.0
+    PlanAhorro.query.filter_by(id=plan.id).delete(synchronize_session=False)
+    db.session.expunge(plan)
+    return total_depositos, ajustar_capital(plan.usuario_id, reintegro)
+
+
+def contabilizar(usuario_id, tipo, filas, signo=1, usos=True):
+    """Refleja en los resúmenes mensuales (con su modificado_en) y en los
+    contadores de uso de categorías los movimientos recién escritos.
+
+    `tipo` es 'ingreso' o 'egreso' y `filas` un iterable de diccionarios con
+    'fecha', 'monto', 'categoria_id' y opcionalmente 'cantidad' (cuántos
+    movimientos resume la fila, 1 por defecto). Una fila puede traer su
+    propio 'usuario_id' para contabilizar de una vez movimientos de varios
+    usuarios (procesos por lotes). Usar signo=-1 cuando los movimientos se
+    eliminan, y usos=False si siguen referenciando su categoría (archivados).
+    No hace commit: debe ir en la misma transacción que el movimiento.
+    """
+    columna = COLUMNAS_RESUMEN[tipo]
+
+    # Agrupar por (usuario, año, mes) para tocar una sola fila del resumen por mes
+    por_mes = defaultdict(float)
+    por_categoria = defaultdict(int)
+    for fila in filas:
+        fecha = fila['fecha']
+        por_mes[(fila.get('usuario_id', usuario_id), fecha.year, fecha.month)] += signo * float(fila['monto'])
+        if usos and fila.get('categoria_id') is not None:
+            por_categoria[int(fila['categoria_id'])] += signo * fila.get('cantidad', 1)
+
+    if not por_mes:
+        return
+
+    marcar_modificados({uid for uid, _, _ in por_mes})
+    _actualizar_usos(tipo, por_categoria)
+
+    tabla = ResumenMensual.__table__
+    valores = [{
+        'usuario_id': uid,
+        'anio': anio,
+        'mes': mes,
+        'ingresos': monto if columna == 'ingresos' else 0.0,
+        'egresos': monto if columna == 'egresos' else 0.0,
+    } for (uid, anio, mes), monto in por_mes.items()]
+    dialecto = db.session.get_bind().dialect.name
+
+    if dialecto == 'postgresql':
+        # Un solo INSERT ... ON CONFLICT para todos los meses afectados
+        stmt = pg_insert(tabla).values(valores)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[tabla.c.usuario_id, tabla.c.anio, tabla.c.mes],
+            set_={columna: tabla.c[columna] + stmt.excluded[columna], 'modificado_en': db.func.now()}
+        )
+        db.session.execute(stmt)
+    elif dialecto == 'sqlite':
+        # SQLite (>= 3.24) admite la misma sintaxis; SQLAlchemy 1.3 no tiene el constructor
+        filas_sql, parametros = [], {}
+        for i, v in enumerate(valores):
+            filas_sql.append(f'(:usuario_id{i}, :anio{i}, :mes{i}, :ingresos{i}, :egresos{i}, CURRENT_TIMESTAMP)')
+            parametros.update({f'{clave}{i}': valor for clave, valor in v.items()})
+        db.session.execute(db.text(
+            'INSERT INTO resumenes_mensuales (usuario_id, anio, mes, ingresos, egresos, modificado_en) '
+            f'VALUES {", ".join(filas_sql)} '
+            f'ON CONFLICT (usuario_id, anio, mes) DO UPDATE SET {columna} = {columna} + excluded.{columna}, '
+            'modificado_en = excluded.modificado_en'
+        ), parametros)
+    else:
+        # Otros motores: UPDATE y, si no existe la fila, INSERT
+        for v in valores:
+            actualizadas = db.session.execute(tabla.update().where(
+                (tabla.c.usuario_id == v['usuario_id']) & (tabla.c.anio == v['anio']) & (tabla.c.mes == v['mes'])
+            ).values({columna: tabla.c[columna] + v[columna], 'modificado_en': db.func.now()})).rowcount
+            if not actualizadas:
+                db.session.execute(tabla.insert().values(v))
+
+
+def _actualizar_usos(tipo, usos):
+    # Las categorías predeterminadas las comparten todos los usuarios: contar
+    # sobre su fila serializaría las escrituras de todos, así que sólo se
+    # mantienen contadores de las categorías propias.
+    predeterminadas = ids_predeterminadas()
+    usos = {categoria_id: delta for categoria_id, delta in usos.items()
+            if delta and categoria_id not in predeterminadas}
+    if not usos:
+        return
+
+    tabla = Categoria.__table__
+    columna = tabla.c[COLUMNAS_USOS[tipo]]
+    db.session.execute(tabla.update().where(tabla.c.id.in_(list(usos))).values({
+        columna: columna + db.case(usos, value=tabla.c.id, else_=0)
+    }))
+
+
+def reconstruir_resumenes(usuario_id=None):
+    """Recalcula los resúmenes mensuales desde ingresos y egresos (backfill).
+
+    Si se indica `usuario_id` sólo se reconstruye ese usuario. Devuelve el
+    número de filas de resumen escritas. No hace commit.
+    """
+    resumenes = defaultdict(lambda: {'ingresos': 0.0, 'egresos': 0.0})
+
+    for modelo, columna in ((Ingreso, 'ingresos'), (Egreso, 'egresos')):
+        anio = db.extract('year', modelo.fecha)
+        mes = db.extract('month', modelo.fecha)
+        consulta = db.session.query(
+            modelo.usuario_id, anio, mes, db.func.sum(modelo.monto)
+        ).group_by(modelo.usuario_id, anio, mes)
+        if usuario_id is not None:
+            consulta = consulta.filter(modelo.usuario_id == usuario_id)
+
+        for uid, a, m, total in consulta:
+            resumenes[(uid, int(a), int(m))][columna] = total or 0.0
+
+    marcar_modificados({uid for uid, _, _ in resumenes} | {usuario_id})
+    borrar = ResumenMensual.query
+    if usuario_id is not None:
+        borrar = borrar.filter_by(usuario_id=usuario_id)
+    borrar.delete(synchronize_session=False)
+
+    filas = [{
+        'usuario_id': uid,
+        'anio': anio,
+        'mes': mes,
+        'ingresos': totales['ingresos'],
+        'egresos': totales['egresos'],
+    } for (uid, anio, mes), totales in resumenes.items()]
+    if filas:
+        db.session.execute(ResumenMensual.__table__.insert(), filas)
+    return len(filas)
+
+
+def paginar_movimientos(modelo, usuario_id, args):
+    """Página de ingresos o egresos del usuario, del más reciente al más antiguo.
+
+    Paginación keyset sobre (fecha, id), apoyada en el índice
+    (usuario_id, fecha, id), con filtros opcionales ?desde=, ?hasta= y
+    ?categoria_id=. Devuelve (filas, siguiente_cursor); el cursor es None
+    en la última página. Las filas son tuplas de columnas (id, monto,
+    descripcion, fecha, categoria_id, usuario_id), no entidades del ORM.
+    """
+    limite = leer_limite(args)
+    consulta = db.session.query(
+        modelo.id, modelo.monto, modelo.descripcion, modelo.fecha, modelo.categoria_id, modelo.usuario_id
+    ).filter(modelo.usuario_id == usuario_id)
+
+    desde = leer_fecha(args, 'desde')
+    if desde:
+        consulta = consulta.filter(modelo.fecha >= desde)
+    hasta = leer_fecha(args, 'hasta')
+    if hasta:
+        consulta = consulta.filter(modelo.fecha <= hasta)
+    categoria_id = args.get('categoria_id', type=int)
+    if categoria_id:
+        consulta = consulta.filter(modelo.categoria_id == categoria_id)
+
+    cursor = args.get('cursor')
+    if cursor:
+        try:
+            fecha, ultimo_id = decodificar_cursor(cursor)
+            fecha, ultimo_id = date.fromisoformat(fecha), int(ultimo_id)
+        except (TypeError, ValueError):
+            raise APIException('Cursor inválido', status_code=400)
+        consulta = consulta.filter(or_(
+            modelo.fecha < fecha,
+            and_(modelo.fecha == fecha, modelo.id < ultimo_id)
+        ))
+
+    # Pedimos una fila de más para saber si hay otra página
+    filas = consulta.order_by(modelo.fecha.desc(), modelo.id.desc()).limit(limite + 1).all()
+    siguiente_cursor = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        siguiente_cursor = codificar_cursor(filas[-1].fecha, filas[-1].id)
+    return filas, siguiente_cursor
+
+
+def _rama_linea_de_tiempo(modelo, tipo, usuario_id, limite, desde, hasta, cursor):
+    # Cada rama se ordena y limita por su cuenta para usar el índice (usuario_id, fecha, id)
+    consulta = db.session.query(
+        modelo.id.label('id'),
+        modelo.monto.label('monto'),
+        modelo.descripcion.label('descripcion'),
+        modelo.fecha.label('fecha'),
+        db.literal(tipo).label('tipo')
+    ).filter(modelo.usuario_id == usuario_id)
+    if desde:
+        consulta = consulta.filter(modelo.fecha >= desde)
+    if hasta:
+        consulta = consulta.filter(modelo.fecha <= hasta)
+
+    if cursor:
+        # Orden global: fecha desc, tipo asc, id desc. Con el tipo de la rama
+        # fijo, la condición del cursor se reduce a un filtro por índice.
+        fecha, tipo_cursor, ultimo_id = cursor
+        if tipo > tipo_cursor:
+            consulta = consulta.filter(modelo.fecha <= fecha)
+        elif tipo == tipo_cursor:
+            consulta = consulta.filter(or_(
+                modelo.fecha < fecha,
+                and_(modelo.fecha == fecha, modelo.id < ultimo_id)
+            ))
+        else:
+            consulta = consulta.filter(modelo.fecha < fecha)
+
+    if limite is None:
+        return consulta
+    subconsulta = consulta.order_by(modelo.fecha.desc(), modelo.id.desc()).limit(limite + 1).subquery()
+    return select([subconsulta])
+
+
+def linea_de_tiempo(usuario_id, args, paginar=True):
+    """Ingresos y egresos del usuario en una sola línea de tiempo, del más reciente al más antiguo.
+
+    Un UNION ALL ordenado y limitado en la base de datos con paginación
+    keyset sobre (fecha, tipo, id). Devuelve (filas, siguiente_cursor).
+    Con paginar=False devuelve todas las filas (y cursor None).
+    """
+    limite = leer_limite(args) if paginar else None
+    desde = leer_fecha(args, 'desde')
+    hasta = leer_fecha(args, 'hasta')
+
+    cursor = args.get('cursor') if paginar else None
+    if cursor:
+        try:
+            fecha, tipo, ultimo_id = decodificar_cursor(cursor)
+            cursor = (date.fromisoformat(fecha), str(tipo), int(ultimo_id))
+        except (TypeError, ValueError):
+            raise APIException('Cursor inválido', status_code=400)
+
+    timeline = union_all(
+        _rama_linea_de_tiempo(Ingreso, 'ingreso', usuario_id, limite, desde, hasta, cursor),
+        _rama_linea_de_tiempo(Egreso, 'egreso', usuario_id, limite, desde, hasta, cursor)
+    ).alias('timeline')
+
+    consulta = db.session.query(timeline).order_by(timeline.c.fecha.desc(), timeline.c.tipo, timeline.c.id.desc())
+    if limite is None:
+        return consulta.all(), None
+    filas = consulta.limit(limite + 1).all()
+
+    siguiente_cursor = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        ultima = filas[-1]
+        siguiente_cursor = codificar_cursor(ultima.fecha, ultima.tipo, ultima.id)
+    return filas, siguiente_cursor
+
+
+# Columnas de cada registro exportado, en el orden del CSV
+COLUMNAS_EXPORTACION = ['tipo', 'id', 'fecha', 'monto', 'descripcion', 'categoria_id', 'plan_ahorro_id']
+
+
+def exportar_movimientos(usuario_id, tamano_lote=1000):
+    """Generador con todos los movimientos del usuario, uno por registro.
+
+    Lee con un cursor del lado del servidor (stream_results + yield_per),
+    así la memoria del worker no depende del tamaño del historial. Los
+    egresos se etiquetan como 'deposito_plan' si pertenecen a un plan de
+    ahorro y como 'pago_suscripcion' si son de la categoría Suscripciones.
+    """
+    categoria_suscripciones = id_categoria("Suscripciones")
+
+    ingresos = db.session.query(
+        Ingreso.id, Ingreso.fecha, Ingreso.monto, Ingreso.descripcion, Ingreso.categoria_id
+    ).filter(Ingreso.usuario_id == usuario_id).order_by(Ingreso.fecha, Ingreso.id)
+    for fila in ingresos.execution_options(stream_results=True).yield_per(tamano_lote):
+        yield {
+            'tipo': 'ingreso',
+            'id': fila.id,
+            'fecha': fila.fecha.isoformat() if fila.fecha else None,
+            'monto': fila.monto,
+            'descripcion': fila.descripcion,
+            'categoria_id': fila.categoria_id,
+            'plan_ahorro_id': None,
+        }
+
+    egresos = db.session.query(
+        Egreso.id, Egreso.fecha, Egreso.monto, Egreso.descripcion, Egreso.categoria_id, Egreso.plan_ahorro_id
+    ).filter(Egreso.usuario_id == usuario_id).order_by(Egreso.fecha, Egreso.id)
+    for fila in egresos.execution_options(stream_results=True).yield_per(tamano_lote):
+        if fila.plan_ahorro_id is not None:
+            tipo = 'deposito_plan'
+        elif fila.categoria_id == categoria_suscripciones:
+            tipo = 'pago_suscripcion'
+        else:
+            tipo = 'egreso'
+        yield {
+            'tipo': tipo,
+            'id': fila.id,
+            'fecha': fila.fecha.isoformat() if fila.fecha else None,
+            'monto': fila.monto,
+            'descripcion': fila.descripcion,
+            'categoria_id': fila.categoria_id,
+            'plan_ahorro_id': fila.plan_ahorro_id,
+        }
+
+
+# Filas por sentencia INSERT multi-VALUES en las cargas por lote
+FILAS_POR_INSERT = 500
+
+
+def _validar_fila_lote(indice, fila, categorias_validas):
+    # Devuelve (valores, None) si la fila es válida o (None, error)
+    if not isinstance(fila, dict):
+        return None, {'indice': indice, 'error': 'La fila debe ser un objeto'}
+    faltantes = [k for k in ('monto', 'descripcion', 'fecha', 'categoria_id') if k not in fila]
+    if faltantes:
+        return None, {'indice': indice, 'error': f"Faltan los siguientes campos: {', '.join(faltantes)}"}
+    try:
+        monto = float(fila['monto'])
+    except (TypeError, ValueError):
+        return None, {'indice': indice, 'error': 'El monto debe ser un número válido'}
+    if monto <= 0:
+        return None, {'indice': indice, 'error': 'El monto debe ser mayor a cero'}
+    try:
+        fecha = date.fromisoformat(fila['fecha'])
+    except (TypeError, ValueError):
+        return None, {'indice': indice, 'error': 'Formato de fecha inválido. Debe ser YYYY-MM-DD.'}
+    if fila['categoria_id'] not in categorias_validas:
+        return None, {'indice': indice, 'error': 'Categoría no encontrada'}
+    return {
+        'monto': monto,
+        'descripcion': fila['descripcion'],
+        'fecha': fecha,
+        'categoria_id': fila['categoria_id'],
+    }, None
+
+
+def registrar_lote(tipo, usuario_id, filas):
+    """Valida e inserta en bloque ingresos o egresos de un usuario.
+
+    Las filas válidas se insertan con INSERT multi-VALUES y se aplica un
+    único ajuste neto a capital_actual y a los resúmenes mensuales. Las
+    inválidas se reportan con su índice. Devuelve (insertadas, errores);
+    no hace commit.
+    """
+    modelo = Ingreso if tipo == 'ingreso' else Egreso
+    maximo = current_app.config.get('TAMANO_LOTE_MAX', 5000)
+    if len(filas) > maximo:
+        raise APIException(f'El lote no puede superar {maximo} filas', status_code=413)
+
+    categorias_validas = {id for (id,) in db.session.query(Categoria.id).filter(
+        or_(Categoria.is_default == True, Categoria.user_id == usuario_id)
+    )}
+
+    validas, errores = [], []
+    for indice, fila in enumerate(filas):
+        valores, error = _validar_fila_lote(indice, fila, categorias_validas)
+        if error:
+            errores.append(error)
+        else:
+            valores['usuario_id'] = usuario_id
+            validas.append(valores)
+
+    if not validas:
+        return 0, errores
+
+    for inicio in range(0, len(validas), FILAS_POR_INSERT):
+        db.session.execute(modelo.__table__.insert().values(validas[inicio:inicio + FILAS_POR_INSERT]))
+
+    contabilizar(usuario_id, tipo, validas)
+
+    # Un solo ajuste neto y atómico del capital para todo el lote
+    total = sum(fila['monto'] for fila in validas)
+    ajustar_capital(usuario_id, total if tipo == 'ingreso' else -total)
+    return len(validas), errores
+
+
+def rellenar_huellas(tamano_lote=1000):
+    """Calcula la huella de los ingresos y egresos que aún no la tienen.
+
+    Procesa por lotes y confirma cada uno. Devuelve el número de filas
+    actualizadas.
+    """
+    actualizadas = 0
+    for modelo in (Ingreso, Egreso):
+        tabla = modelo.__table__
+        while True:
+            lote = db.session.query(
+                modelo.id, modelo.usuario_id, modelo.fecha, modelo.monto, modelo.descripcion
+            ).filter(modelo.huella == None).limit(tamano_lote).all()
+            if not lote:
+                break
+            # Con la fecha, cada UPDATE va directo a su partición (PostgreSQL)
+            db.session.execute(
+                tabla.update().where(
+                    (tabla.c.id == db.bindparam('_id')) & (tabla.c.fecha == db.bindparam('_fecha'))
+                ).values(huella=db.bindparam('_huella')),
+                [{'_id': f.id, '_fecha': f.fecha, '_huella': calcular_huella(f.usuario_id, f.fecha, f.monto, f.descripcion)}
+                 for f in lote]
+            )
+            db.session.commit()
+            actualizadas += len(lote)
+    return actualizadas
+
+
+def reconstruir_usos_categorias():
+    """Recalcula los contadores de uso de las categorías propias (backfill).
+
+    usos_egresos incluye los egresos archivados, que también impiden
+    eliminar la categoría. Devuelve el número de categorías actualizadas.
+    No hace commit.
+    """
+    categorias = Categoria.__table__
+
+    def contar(modelo):
+        return db.select([db.func.count()]).where(modelo.categoria_id == categorias.c.id).as_scalar()
+
+    valores = {
+        COLUMNAS_USOS['ingreso']: contar(Ingreso),
+        COLUMNAS_USOS['egreso']: contar(Egreso) + contar(EgresoArchivado),
+    }
+    return db.session.execute(
+        categorias.update().where(categorias.c.is_default == False).values(valores)
+    ).rowcount
+
+
+def _sin_uso(categorias):
+    # Anti-join: la categoría no aparece en ningún movimiento (ni archivado)
+    return and_(*[
+        ~db.exists().where(tabla.c.categoria_id == categorias.c.id)
+        for tabla in (Ingreso.__table__, Egreso.__table__, EgresoArchivado.__table__)
+    ])
+
+
+def purgar_categorias_sin_uso():
+    """Elimina las categorías no predeterminadas que ningún movimiento usa.
+
+    Devuelve (eliminadas, comprometidas), donde comprometidas lista las
+    categorías que se conservaron con sus contadores de uso. En PostgreSQL
+    es una única sentencia (DELETE ... RETURNING dentro de un CTE); en los
+    demás motores, una consulta y un DELETE. No hace commit.
+    """
+    categorias = Categoria.__table__
+    propias = categorias.c.is_default == False
+
+    if db.session.get_bind().dialect.name == 'postgresql':
+        borradas = categorias.delete().where(and_(propias, _sin_uso(categorias))) \
+            .returning(categorias.c.id).cte('borradas')
+        eliminadas = select([db.func.count()]).select_from(borradas).as_scalar()
+        # La consulta externa ve la tabla antes del DELETE: se excluyen las borradas.
+        # El LEFT JOIN garantiza una fila aunque no quede ninguna comprometida.
+        conservadas = categorias.select().where(and_(
+            propias, categorias.c.id.notin_(select([borradas.c.id]))
+        )).alias('conservadas')
+        filas = db.session.execute(
+            select([eliminadas.label('eliminadas'), conservadas.c.id, conservadas.c.nombre,
+                    conservadas.c.usos_ingresos, conservadas.c.usos_egresos])
+            .select_from(select([db.literal(1).label('uno')]).alias('uno')
+                         .outerjoin(conservadas, db.true()))
+            .order_by(conservadas.c.id)
+        ).fetchall()
+        total = filas[0].eliminadas if filas else 0
+        filas = [f for f in filas if f.id is not None]
+    else:
+        filas = db.session.execute(
+            select([categorias.c.id, categorias.c.nombre, categorias.c.usos_ingresos,
+                    categorias.c.usos_egresos])
+            .where(and_(propias, ~_sin_uso(categorias))).order_by(categorias.c.id)
+        ).fetchall()
+        total = db.session.execute(
+            categorias.delete().where(and_(propias, _sin_uso(categorias)))
+        ).rowcount
+
+    comprometidas = [{
+        "id": f.id,
+        "nombre": f.nombre,
+        "ingresos_relacionados": f.usos_ingresos,
+        "egresos_relacionados": f.usos_egresos,
+    } for f in filas]
+    return total, comprometidas
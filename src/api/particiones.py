@@ -0,0 +1,113 @@
+# api/particiones.py
+import re
+from datetime import date
+from api.models import db
+
+# Particiones mensuales por fecha de ingresos y egresos (sólo PostgreSQL,
+# las crea la migración d7a3f5b1e2c8). Cada mes es la tabla
+# <tabla>_pAAAA_MM, FOR VALUES FROM (día 1) TO (día 1 del mes siguiente), y
+# <tabla>_default recoge las fechas que todavía no tienen partición. Las
+# consultas con condiciones sobre fecha (?desde=, ?hasta=, el cursor de los
+# listados) sólo leen las particiones de ese rango.
+TABLAS_PARTICIONADAS = ('ingresos', 'egresos')
+
+_PATRON_PARTICION = re.compile(r'^(ingresos|egresos)_(?:p(\d{4})_(\d{2})|default)$')
+
+
+def es_particion(nombre):
+    """True si `nombre` es una partición (adjunta o ya desacoplada) de ingresos o egresos."""
+    return _PATRON_PARTICION.match(nombre) is not None
+
+
+def nombre_particion(tabla, mes):
+    return f'{tabla}_p{mes:%Y_%m}'
+
+
+def sumar_meses(mes, n):
+    """Día 1 del mes que está `n` meses después (antes si n < 0) del de `mes`."""
+    indice = mes.year * 12 + mes.month - 1 + n
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def particionadas():
+    """True si ingresos y egresos ya son tablas particionadas."""
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return False
+    return all(db.session.execute(
+        db.text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:tabla)"), {'tabla': tabla}
+    ).scalar() == 'p' for tabla in TABLAS_PARTICIONADAS)
+
+
+def particiones(tabla):
+    """Meses (día 1) que tienen partición adjunta en `tabla`, en orden."""
+    filas = db.session.execute(db.text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:tabla)"
+    ), {'tabla': tabla}).fetchall()
+    meses = []
+    for (nombre,) in filas:
+        coincidencia = _PATRON_PARTICION.match(nombre)
+        if coincidencia and coincidencia.group(2):
+            meses.append(date(int(coincidencia.group(2)), int(coincidencia.group(3)), 1))
+    return sorted(meses)
+
+
+def _meses_en_default(tabla):
+    return {mes for (mes,) in db.session.execute(db.text(
+        f"SELECT DISTINCT date_trunc('month', fecha)::date FROM {tabla}_default"
+    ))}
+
+
+def crear_particion(tabla, mes):
+    """Crea la partición del mes de `mes` en `tabla`. No hace commit.
+
+    PostgreSQL no deja crear una partición si la partición por defecto
+    tiene filas de su rango: se crea como tabla suelta, se le pasan esas
+    filas y después se adjunta (ATTACH crea los índices y claves foráneas
+    de la tabla padre).
+    """
+    nombre = nombre_particion(tabla, mes)
+    desde, hasta = mes, sumar_meses(mes, 1)
+    db.session.execute(db.text(f'CREATE TABLE {nombre} (LIKE {tabla} INCLUDING DEFAULTS)'))
+    db.session.execute(db.text(
+        f'WITH movidas AS (DELETE FROM {tabla}_default WHERE fecha >= :desde AND fecha < :hasta RETURNING *) '
+        f'INSERT INTO {nombre} SELECT * FROM movidas'
+    ), {'desde': desde, 'hasta': hasta})
+    db.session.execute(db.text(
+        f"ALTER TABLE {tabla} ATTACH PARTITION {nombre} FOR VALUES FROM ('{desde}') TO ('{hasta}')"
+    ))
+    return nombre
+
+
+def desacoplar_particion(tabla, mes):
+    """Saca de `tabla` la partición del mes; queda como tabla suelta. No hace commit."""
+    nombre = nombre_particion(tabla, mes)
+    db.session.execute(db.text(f'ALTER TABLE {tabla} DETACH PARTITION {nombre}'))
+    return nombre
+
+
+def mantener_particiones(meses_futuros=3, retener_meses=None, hoy=None):
+    """Crea las particiones que faltan y desacopla las viejas.
+
+    Se crean las del mes en curso y los `meses_futuros` siguientes, más las
+    de los meses que tengan filas en la partición por defecto (movimientos
+    con fechas antiguas importadas, por ejemplo). Con `retener_meses` se
+    desacoplan las de meses anteriores a esa antigüedad: siguen existiendo
+    como tablas <tabla>_pAAAA_MM para archivarlas o borrarlas, pero sus
+    filas dejan de verse (los resúmenes mensuales ya calculados se
+    conservan; reconstruir-resumenes ya no las contaría). Devuelve
+    {'creadas': [...], 'desacopladas': [...]}; no hace commit.
+    """
+    actual = (hoy or date.today()).replace(day=1)
+    creadas, desacopladas = [], []
+    for tabla in TABLAS_PARTICIONADAS:
+        deseadas = {sumar_meses(actual, n) for n in range(meses_futuros + 1)} | _meses_en_default(tabla)
+        for mes in sorted(deseadas - set(particiones(tabla))):
+            creadas.append(crear_particion(tabla, mes))
+
+        if retener_meses is not None:
+            limite = sumar_meses(actual, -retener_meses)
+            for mes in particiones(tabla):
+                if mes < limite:
+                    desacopladas.append(desacoplar_particion(tabla, mes))
+    return {'creadas': creadas, 'desacopladas': desacopladas}
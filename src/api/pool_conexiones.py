@@ -0,0 +1,148 @@
+# api/pool_conexiones.py
+import os
+import threading
+import time
+import weakref
+from flask import current_app, has_request_context
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+from api.models import db
+
+# Pools heredados tras un fork: se conservan referenciados para que el
+# recolector no cierre sus conexiones, que comparten socket con el padre.
+_heredados = []
+_apps = weakref.WeakSet()
+_fork_registrado = False
+
+
+class PoolMedido(QueuePool):
+    """QueuePool que mide cuánto esperan las peticiones por una conexión."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock_metricas = threading.Lock()
+        self.reiniciar_metricas()
+
+    def reiniciar_metricas(self):
+        with self._lock_metricas:
+            self._obtenidas = 0
+            self._espera_total = 0.0
+            self._espera_maxima = 0.0
+            self._agotado = 0
+            self._en_uso_maximo = 0
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            registro = super()._do_get()
+        except exc.TimeoutError:
+            with self._lock_metricas:
+                self._agotado += 1
+            raise
+        espera = time.perf_counter() - inicio
+        with self._lock_metricas:
+            self._obtenidas += 1
+            self._espera_total += espera
+            self._espera_maxima = max(self._espera_maxima, espera)
+            self._en_uso_maximo = max(self._en_uso_maximo, self.checkedout())
+        return registro
+
+    def metricas(self):
+        with self._lock_metricas:
+            return {
+                'tamano': self.size(),
+                'en_uso': self.checkedout(),
+                'libres': self.checkedin(),
+                'overflow': max(self.overflow(), 0),
+                'max_overflow': self._max_overflow,
+                'en_uso_maximo': self._en_uso_maximo,
+                'obtenidas': self._obtenidas,
+                'espera_media_ms': round(self._espera_total / self._obtenidas * 1000, 3) if self._obtenidas else 0.0,
+                'espera_maxima_ms': round(self._espera_maxima * 1000, 3),
+                'agotado': self._agotado,  # veces que se superó pool_timeout
+            }
+
+
+def _entero(nombre, por_defecto=None):
+    valor = os.getenv(nombre)
+    return int(valor) if valor not in (None, '') else por_defecto
+
+
+def opciones_engine(uri):
+    """SQLALCHEMY_ENGINE_OPTIONS a partir del entorno.
+
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT (segundos de espera por
+    una conexión), DB_POOL_RECYCLE (segundos de vida de una conexión) y
+    DB_POOL_PRE_PING=1. Sólo aplican a PostgreSQL; con SQLite se usan los
+    valores por defecto. El límite por sentencia (DB_STATEMENT_TIMEOUT_MS)
+    se aplica al tomar la conexión: ver _ajustar_statement_timeout.
+    """
+    if not uri or not uri.startswith('postgresql'):
+        return {}
+
+    return {
+        'poolclass': PoolMedido,
+        'pool_size': _entero('DB_POOL_SIZE', 5),
+        'max_overflow': _entero('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': _entero('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': _entero('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', '1') == '1',
+    }
+
+
+def _ajustar_statement_timeout(conexion, registro, proxy):
+    # Sólo las peticiones web tienen límite por sentencia (DB_STATEMENT_TIMEOUT_MS).
+    # Los comandos de la CLI (backfills, particiones, refresco de la vista) y
+    # los hilos en segundo plano pueden tardar lo que necesiten. El valor
+    # aplicado se recuerda en la conexión: sólo se envía SET cuando cambia.
+    limite = (current_app.config.get('DB_STATEMENT_TIMEOUT_MS') or 0) if has_request_context() else 0
+    if registro.info.get('statement_timeout') == limite:
+        return
+    cursor = conexion.cursor()
+    try:
+        cursor.execute(f'SET statement_timeout = {int(limite)}')
+    finally:
+        cursor.close()
+    # SET es transaccional: se confirma para que un ROLLBACK posterior no lo deshaga
+    conexion.commit()
+    registro.info['statement_timeout'] = limite
+
+
+def _engines(app):
+    # {nombre: engine} de la base principal y de cada SQLALCHEMY_BINDS
+    with app.app_context():
+        binds = [None] + list(app.config.get('SQLALCHEMY_BINDS') or {})
+        return {bind or 'principal': db.get_engine(app, bind) for bind in binds}
+
+
+def _tras_fork():
+    # En el hijo (workers de gunicorn con --preload) se empieza con un pool
+    # vacío. No se llama a dispose(): cerraría conexiones que siguen siendo
+    # del proceso padre.
+    for app in list(_apps):
+        for engine in _engines(app).values():
+            _heredados.append(engine.pool)
+            engine.pool = engine.pool.recreate()
+
+
+def metricas_pool(app):
+    """Métricas de los pools de la app ({bind: métricas}; 'principal' sin bind)."""
+    metricas = {}
+    for nombre, engine in _engines(app).items():
+        pool = engine.pool
+        if isinstance(pool, PoolMedido):
+            metricas[nombre] = pool.metricas()
+        else:
+            # Pools sin métricas (SQLite en desarrollo)
+            metricas[nombre] = {'pool': type(pool).__name__, 'estado': pool.status()}
+    return metricas
+
+
+def init_pool(app):
+    global _fork_registrado
+    if not event.contains(PoolMedido, 'checkout', _ajustar_statement_timeout):
+        event.listen(PoolMedido, 'checkout', _ajustar_statement_timeout)
+    if not _fork_registrado and hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_tras_fork)
+        _fork_registrado = True
+    _apps.add(app)
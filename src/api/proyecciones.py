@@ -0,0 +1,149 @@
+# api/proyecciones.py
+from datetime import date
+import numpy as np
+from api.models import db, PlanAhorro, Egreso
+from api.particiones import sumar_meses
+
+# Proyección de los planes de ahorro a partir de sus depósitos (egresos con
+# plan_ahorro_id). Todos los planes de un lote se calculan a la vez con
+# arrays de NumPy: la serie mensual de depósitos es una matriz planes x
+# meses y cada métrica una operación sobre columnas, sin bucles por plan.
+
+# Meses de historial (incluido el actual) con los que se estima el aporte
+VENTANA_MESES = 12
+
+# Más allá de este plazo la meta se considera inalcanzable al ritmo actual
+HORIZONTE_MAXIMO_MESES = 1200
+
+DIAS_POR_MES = 365.2425 / 12
+
+
+def proyectar(planes, depositos, hoy=None, ventana_meses=VENTANA_MESES):
+    """Proyecta un lote de planes.
+
+    `planes` son filas (id, nombre_plan, monto_objetivo, monto_acumulado,
+    monto_inicial, fecha_inicio, fecha_objetivo) ordenadas por id, y
+    `depositos` filas (plan_ahorro_id, fecha, monto) de esos planes; los
+    depósitos fuera de la ventana se ignoran. Por plan devuelve:
+
+    - aporte_mensual: depósitos de la ventana / meses de la ventana en que
+      el plan ya existía. El depósito inicial (el egreso que agregarplan
+      crea en fecha_inicio) no es un aporte: ya está en monto_acumulado.
+    - fecha_proyectada: cuándo se alcanza la meta a ese ritmo (None si no
+      hay aporte o tardaría más que HORIZONTE_MAXIMO_MESES).
+    - deposito_mensual_requerido: lo que falta repartido en los meses que
+      quedan hasta fecha_objetivo (todo, si ya venció).
+    - en_camino: si la fecha proyectada no pasa de fecha_objetivo.
+    """
+    if not planes:
+        return []
+    hoy = hoy or date.today()
+    hoy_dia = np.datetime64(hoy, 'D')
+    mes_actual = np.datetime64(hoy, 'M')
+    primer_mes = mes_actual - (ventana_meses - 1)
+
+    ids, nombres, objetivo, acumulado, inicial, inicio, fecha_objetivo = zip(*planes)
+    ids = np.array(ids, dtype=np.int64)
+    objetivo = np.array(objetivo, dtype=float)
+    acumulado = np.array([a or 0.0 for a in acumulado], dtype=float)
+    inicial = np.array([m or 0.0 for m in inicial], dtype=float)
+    inicio = np.array([f or hoy for f in inicio], dtype='datetime64[D]')
+    fecha_objetivo = np.array([f or hoy for f in fecha_objetivo], dtype='datetime64[D]')
+
+    # Serie mensual: cada depósito suma en la celda (plan, mes) de la matriz
+    serie = np.zeros(len(ids) * ventana_meses)
+    if depositos:
+        plan_ids, fechas, montos = zip(*depositos)
+        fila = np.searchsorted(ids, np.array(plan_ids, dtype=np.int64))
+        columna = (np.array(fechas, dtype='datetime64[D]').astype('datetime64[M]') - primer_mes).astype(np.int64)
+        validos = (columna >= 0) & (columna < ventana_meses)
+        serie = np.bincount(fila[validos] * ventana_meses + columna[validos],
+                            weights=np.array(montos, dtype=float)[validos], minlength=serie.size)
+    serie = serie.reshape(len(ids), ventana_meses)
+
+    # Sin el depósito inicial, en la celda del mes de inicio si cae en la ventana
+    columna_inicio = (inicio.astype('datetime64[M]') - primer_mes).astype(np.int64)
+    en_ventana = np.flatnonzero((columna_inicio >= 0) & (columna_inicio < ventana_meses))
+    celdas = (en_ventana, columna_inicio[en_ventana])
+    serie[celdas] = np.maximum(serie[celdas] - inicial[en_ventana], 0.0)
+
+    meses_activo = np.clip((mes_actual - inicio.astype('datetime64[M]')).astype(np.int64) + 1, 1, ventana_meses)
+    aporte_mensual = serie.sum(axis=1) / meses_activo
+
+    restante = np.maximum(objetivo - acumulado, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        meses_para_meta = np.where(restante > 0, restante / aporte_mensual, 0.0)
+    alcanzable = meses_para_meta <= HORIZONTE_MAXIMO_MESES  # False para inf (sin aporte)
+    dias_para_meta = np.ceil(np.where(alcanzable, meses_para_meta, 0.0) * DIAS_POR_MES).astype(np.int64)
+    fecha_proyectada = np.where(alcanzable, hoy_dia + dias_para_meta, np.datetime64('NaT', 'D'))
+
+    meses_hasta_objetivo = (fecha_objetivo - hoy_dia).astype(np.int64) / DIAS_POR_MES
+    deposito_requerido = restante / np.maximum(meses_hasta_objetivo, 1.0)
+    en_camino = (restante == 0) | (alcanzable & (fecha_proyectada <= fecha_objetivo))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        porcentaje = np.where(objetivo > 0, np.minimum(acumulado / objetivo, 1.0) * 100, 100.0)
+
+    columnas = zip(
+        ids.tolist(), nombres, objetivo.tolist(), acumulado.tolist(), np.round(restante, 2).tolist(),
+        np.round(porcentaje, 2).tolist(), np.round(aporte_mensual, 2).tolist(),
+        np.round(deposito_requerido, 2).tolist(), fecha_objetivo.astype(object).tolist(),
+        fecha_proyectada.astype(object).tolist(), en_camino.tolist()
+    )
+    return [{
+        'plan_id': plan_id,
+        'nombre_plan': nombre,
+        'monto_objetivo': monto_objetivo,
+        'monto_acumulado': monto_acumulado,
+        'restante': falta,
+        'porcentaje': avance,
+        'aporte_mensual': aporte,
+        'deposito_mensual_requerido': requerido,
+        'fecha_objetivo': objetivo_fecha,
+        'fecha_proyectada': proyectada,
+        'en_camino': camino,
+    } for (plan_id, nombre, monto_objetivo, monto_acumulado, falta, avance, aporte, requerido,
+           objetivo_fecha, proyectada, camino) in columnas]
+
+
+def _consulta_planes():
+    return db.session.query(
+        PlanAhorro.id, PlanAhorro.nombre_plan, PlanAhorro.monto_objetivo, PlanAhorro.monto_acumulado,
+        PlanAhorro.monto_inicial, PlanAhorro.fecha_inicio, PlanAhorro.fecha_objetivo
+    ).order_by(PlanAhorro.id)
+
+
+def _consulta_depositos(hoy, ventana_meses):
+    # Sólo la ventana: con egresos particionados por fecha no se lee el resto
+    desde = sumar_meses(hoy, -(ventana_meses - 1))
+    return db.session.query(Egreso.plan_ahorro_id, Egreso.fecha, Egreso.monto).filter(
+        Egreso.plan_ahorro_id != None, Egreso.fecha >= desde
+    )
+
+
+def proyectar_planes_usuario(usuario_id, hoy=None, ventana_meses=VENTANA_MESES):
+    """Proyección de todos los planes del usuario: dos consultas en total."""
+    hoy = hoy or date.today()
+    planes = _consulta_planes().filter(PlanAhorro.usuario_id == usuario_id).all()
+    if not planes:
+        return []
+    depositos = _consulta_depositos(hoy, ventana_meses).filter(Egreso.usuario_id == usuario_id).all()
+    return proyectar(planes, depositos, hoy, ventana_meses)
+
+
+def proyectar_todos(tamano_bloque=1000, hoy=None, ventana_meses=VENTANA_MESES):
+    """Generador con las proyecciones de todos los planes, un bloque por vez.
+
+    Recorre los planes por id (keyset) y cada bloque cuesta dos consultas,
+    así la memoria no depende del número de planes.
+    """
+    hoy = hoy or date.today()
+    ultimo_id = 0
+    while True:
+        planes = _consulta_planes().filter(PlanAhorro.id > ultimo_id).limit(tamano_bloque).all()
+        if not planes:
+            break
+        ultimo_id = planes[-1].id
+        depositos = _consulta_depositos(hoy, ventana_meses).filter(
+            Egreso.plan_ahorro_id.in_([p.id for p in planes])
+        ).all()
+        yield proyectar(planes, depositos, hoy, ventana_meses)
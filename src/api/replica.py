@@ -0,0 +1,178 @@
+# api/replica.py
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, g, has_app_context, has_request_context
+from flask_sqlalchemy import SQLAlchemy, SignallingSession, get_state
+from sqlalchemy import orm
+from sqlalchemy.sql.dml import UpdateBase
+
+# Lecturas en una réplica de la base de datos. Con DATABASE_REPLICA_URL la
+# réplica es el bind 'replica' (SQLALCHEMY_BINDS) y las rutas marcadas con
+# @lectura_en_replica consultan ahí; todo lo demás, y cualquier escritura o
+# SELECT ... FOR UPDATE, sigue yendo a la primaria.
+BIND_REPLICA = 'replica'
+
+try:
+    import redis
+except ImportError:  # Dependencia opcional: sólo para REPLICA_ESCRITURAS_BACKEND=redis
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class SesionEnrutada(SignallingSession):
+    """Sesión que envía a la réplica las lecturas de las rutas de sólo lectura."""
+
+    def get_bind(self, mapper=None, clause=None):
+        if self._leer_de_replica(clause):
+            return get_state(self.app).db.get_engine(self.app, bind=BIND_REPLICA)
+        return super().get_bind(mapper, clause)
+
+    def _leer_de_replica(self, clause):
+        if self._flushing or not has_request_context() or not g.get('leer_de_replica'):
+            return False
+        # Una ruta de lectura que igual escribe o bloquea filas: a la primaria
+        if isinstance(clause, UpdateBase) or getattr(clause, '_for_update_arg', None) is not None:
+            return False
+        return True
+
+
+class SQLAlchemyConReplica(SQLAlchemy):
+    def create_session(self, options):
+        return orm.sessionmaker(class_=SesionEnrutada, db=self, **options)
+
+
+class EscriturasMemoria:
+    """Escrituras recientes en el proceso.
+
+    Sólo para un único proceso (desarrollo, tests): otro worker de gunicorn
+    no vería las escrituras hechas aquí y leería de la réplica.
+    """
+
+    def __init__(self, ventana, max_entradas=10000):
+        self._lock = threading.Lock()
+        self._ventana = ventana
+        self._max_entradas = max_entradas
+        self._instantes = OrderedDict()
+
+    def registrar(self, usuario_ids):
+        ahora = time.monotonic()
+        with self._lock:
+            for usuario_id in usuario_ids:
+                self._instantes[usuario_id] = ahora
+                self._instantes.move_to_end(usuario_id)
+            while len(self._instantes) > self._max_entradas:
+                self._instantes.popitem(last=False)
+
+    def reciente(self, usuario_id):
+        with self._lock:
+            instante = self._instantes.get(usuario_id)
+        return instante is not None and time.monotonic() - instante < self._ventana
+
+
+class EscriturasRedis:
+    """Escrituras recientes compartidas por todos los workers y comandos.
+
+    Cada escritura deja una clave que caduca al terminar la ventana: no
+    depende de que los relojes de los servidores coincidan.
+    """
+
+    PREFIJO = 'escrituras:'
+
+    def __init__(self, url, ventana):
+        if redis is None:
+            raise RuntimeError("REPLICA_ESCRITURAS_BACKEND=redis requiere el paquete 'redis'")
+        self._cliente = redis.Redis.from_url(url)
+        self._ventana_ms = int(ventana * 1000)
+
+    def registrar(self, usuario_ids):
+        tuberia = self._cliente.pipeline(transaction=False)
+        for usuario_id in usuario_ids:
+            tuberia.set(f'{self.PREFIJO}{usuario_id}', 1, px=self._ventana_ms)
+        tuberia.execute()
+
+    def reciente(self, usuario_id):
+        return bool(self._cliente.exists(f'{self.PREFIJO}{usuario_id}'))
+
+
+def replica_configurada():
+    return BIND_REPLICA in (current_app.config.get('SQLALCHEMY_BINDS') or {})
+
+
+def escrituras_recientes():
+    """Registro de escrituras recientes de la aplicación en curso (None si no hay)."""
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('escrituras_recientes')
+
+
+def registrar_escrituras(usuario_ids):
+    """Anota que los usuarios acaban de modificar datos (transacción ya confirmada)."""
+    registro = escrituras_recientes()
+    if registro is None or not usuario_ids:
+        return
+    try:
+        registro.registrar(usuario_ids)
+    except Exception:
+        # La transacción ya se confirmó: no se puede fallar aquí
+        logger.exception('No se pudieron registrar las escrituras de %s', usuario_ids)
+
+
+def escritura_reciente(usuario_id):
+    """True si el usuario modificó datos hace menos de REPLICA_VENTANA_SEGUNDOS.
+
+    Dentro de esa ventana sus lecturas van a la primaria para que vea sus
+    propios cambios aunque la réplica vaya atrasada; conviene que supere el
+    retraso habitual de la réplica, o @respuesta_en_cache podría guardar
+    una lectura atrasada hasta que caduque. Sin registro de escrituras
+    (o si no responde) no se puede saber y se responde True.
+    """
+    registro = escrituras_recientes()
+    if registro is None:
+        return True
+    try:
+        return registro.reciente(usuario_id)
+    except Exception:
+        logger.exception('Registro de escrituras recientes no disponible')
+        return True
+
+
+def lectura_en_replica(f):
+    """Ejecuta una ruta de sólo lectura contra la réplica, si hay una.
+
+    Se coloca debajo de @token_required. No aplica a respuestas en
+    streaming: la marca se retira al volver de la ruta.
+    """
+    @wraps(f)
+    def decorada(payload, *args, **kwargs):
+        if not replica_configurada() or escritura_reciente(payload.get('id')):
+            return f(payload, *args, **kwargs)
+
+        anterior = g.get('leer_de_replica', False)
+        g.leer_de_replica = True
+        try:
+            return f(payload, *args, **kwargs)
+        finally:
+            g.leer_de_replica = anterior
+
+    return decorada
+
+
+def init_replica(app):
+    # REPLICA_ESCRITURAS_BACKEND: 'redis' o 'memoria'. Por defecto 'redis' si
+    # hay REPLICA_REDIS_URL; sin registro las rutas leen siempre de la primaria
+    if BIND_REPLICA not in (app.config.get('SQLALCHEMY_BINDS') or {}):
+        app.extensions['escrituras_recientes'] = None
+        return
+    ventana = app.config.get('REPLICA_VENTANA_SEGUNDOS', 5)
+    backend = app.config.get('REPLICA_ESCRITURAS_BACKEND') or (
+        'redis' if app.config.get('REPLICA_REDIS_URL') else None)
+    if backend == 'redis':
+        app.extensions['escrituras_recientes'] = EscriturasRedis(app.config['REPLICA_REDIS_URL'], ventana)
+    elif backend == 'memoria':
+        app.extensions['escrituras_recientes'] = EscriturasMemoria(ventana)
+    else:
+        app.extensions['escrituras_recientes'] = None
@@ -12,6 +12,9 @@ from .plandeahorro import plandeahorro_bp
 from .fondos_emergencia import fondos_emergencia_bp
 from .suscripciones import suscripciones_bp
 from .alertas import alertas_bp
+from .importaciones import importaciones_bp
+from .eventos import eventos_bp
+from . import metricas  # rutas de operación sobre api_bp
 
 # Función que inicializa la aplicación con todos los blueprints registrados
 def init_app(app):
@@ -24,6 +27,8 @@ def init_app(app):
     app.register_blueprint(fondos_emergencia_bp, url_prefix='/fondos_emergencia')
     app.register_blueprint(suscripciones_bp, url_prefix='/suscripciones')
     app.register_blueprint(alertas_bp, url_prefix='/alertas')
+    app.register_blueprint(importaciones_bp, url_prefix='/importaciones')
+    app.register_blueprint(eventos_bp, url_prefix='/eventos')
 
     # Ahora registramos el blueprint principal api_bp en la app
     app.register_blueprint(api_bp, url_prefix='/api')
@@ -1,20 +1,115 @@
+from datetime import datetime
 from flask import Blueprint, request, jsonify
+from werkzeug.http import http_date
+from sqlalchemy import and_, or_
 from api.models import db, Alerta
 from api.token_required import token_required
+from api.instrumentacion import presupuesto_sql
+from api.utils import APIException, codificar_cursor, decodificar_cursor, leer_limite
+from api.json_rapido import filas_a_dicts, respuesta_json
 
 #-----------------------------------------
 alertas_bp = Blueprint('alertas', __name__)
 #-----------------------------------------
 
-# CRUD para Alerta
+# Feed de alertas del usuario autenticado, de la más reciente a la más antigua.
+# ?no_leidas=1 devuelve sólo las pendientes. Sin ?limite= ni ?cursor= se
+# mantiene la respuesta de siempre: todas las alertas y creada_en en el formato
+# de jsonify (RFC 1123). Paginada (keyset sobre (creada_en, id)): fechas ISO y
+# el cursor de la página siguiente en X-Siguiente-Cursor.
 @alertas_bp.route('/alertas', methods=['GET'])
 @token_required
+@presupuesto_sql(1)
 def obtener_alertas(payload):
-    alertas = Alerta.query.all()
-    return jsonify([{
-        'id': a.id,
-        'mensaje': a.mensaje,
-        'leida': a.leida,
-        'creada_en': a.creada_en,
-        'usuario_id': a.usuario_id
-    } for a in alertas]), 200
+    usuario_id = payload.get('id')
+    if not usuario_id:
+        return jsonify({"error": "Usuario no autenticado"}), 401
+
+    paginar = 'limite' in request.args or 'cursor' in request.args
+    try:
+        limite = leer_limite(request.args)
+        # Columnas de Alerta.to_dict(), sin cargar entidades
+        consulta = db.session.query(
+            Alerta.id, Alerta.mensaje, Alerta.leida, Alerta.creada_en, Alerta.usuario_id
+        ).filter(Alerta.usuario_id == usuario_id)
+        if request.args.get('no_leidas') in ('1', 'true'):
+            consulta = consulta.filter(Alerta.leida == False)
+
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                creada_en, ultimo_id = decodificar_cursor(cursor)
+                creada_en, ultimo_id = datetime.fromisoformat(creada_en), int(ultimo_id)
+            except (TypeError, ValueError):
+                raise APIException('Cursor inválido', status_code=400)
+            consulta = consulta.filter(or_(
+                Alerta.creada_en < creada_en,
+                and_(Alerta.creada_en == creada_en, Alerta.id < ultimo_id)
+            ))
+    except APIException as e:
+        return jsonify(e.to_dict()), e.status_code
+
+    consulta = consulta.order_by(Alerta.creada_en.desc(), Alerta.id.desc())
+    siguiente_cursor = None
+    if paginar:
+        # Una fila de más para saber si hay otra página
+        alertas = consulta.limit(limite + 1).all()
+        if len(alertas) > limite:
+            alertas = alertas[:limite]
+            siguiente_cursor = codificar_cursor(alertas[-1].creada_en, alertas[-1].id)
+    else:
+        alertas = consulta.all()
+
+    alertas = filas_a_dicts(alertas)
+    if not paginar:
+        for alerta in alertas:
+            if alerta['creada_en']:
+                alerta['creada_en'] = http_date(alerta['creada_en'].timetuple())
+    respuesta = respuesta_json(alertas)
+    if siguiente_cursor:
+        respuesta.headers['X-Siguiente-Cursor'] = siguiente_cursor
+    return respuesta, 200
+
+#-----------------------------------------
+# Cantidad de alertas sin leer. No es de coste constante: recorre las
+# entradas del usuario en el índice parcial de no leídas, así que crece con
+# sus alertas sin leer (no con las leídas ni con las de otros usuarios)
+@alertas_bp.route('/no_leidas', methods=['GET'])
+@token_required
+@presupuesto_sql(1)
+def contar_no_leidas(payload):
+    usuario_id = payload.get('id')
+    if not usuario_id:
+        return jsonify({"error": "Usuario no autenticado"}), 401
+
+    no_leidas = db.session.query(db.func.count(Alerta.id)).filter(
+        Alerta.usuario_id == usuario_id, Alerta.leida == False
+    ).scalar()
+    return jsonify({"no_leidas": no_leidas}), 200
+
+#-----------------------------------------
+# Marca como leídas varias alertas con un solo UPDATE.
+# Cuerpo: {"ids": [1, 2, 3]} o {"todas": true}
+@alertas_bp.route('/leidas', methods=['PUT'])
+@token_required
+@presupuesto_sql(1)
+def marcar_leidas(payload):
+    usuario_id = payload.get('id')
+    if not usuario_id:
+        return jsonify({"error": "Usuario no autenticado"}), 401
+
+    data = request.get_json() or {}
+    # El filtro por usuario impide marcar alertas ajenas aunque se envíen sus ids
+    consulta = Alerta.query.filter(Alerta.usuario_id == usuario_id, Alerta.leida == False)
+    if data.get('todas') is True:
+        pass
+    elif isinstance(data.get('ids'), list) and data['ids']:
+        if not all(isinstance(id, int) for id in data['ids']):
+            return jsonify({"error": "Los ids deben ser números enteros"}), 400
+        consulta = consulta.filter(Alerta.id.in_(data['ids']))
+    else:
+        return jsonify({"error": "Se requiere 'ids' (lista) o 'todas': true"}), 400
+
+    marcadas = consulta.update({'leida': True}, synchronize_session=False)
+    db.session.commit()
+    return jsonify({"msg": "Alertas marcadas como leídas", "marcadas": marcadas}), 200
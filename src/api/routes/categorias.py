@@ -1,7 +1,9 @@
 # api/routes/categorias.py
 from flask import Blueprint, request, jsonify
-from api.models import db, Categoria, Ingreso, Egreso
+from api.models import db, Categoria, Ingreso, Egreso, EgresoArchivado
 from api.token_required import token_required
+from api.cache_categorias import categorias_de_usuario, invalidar_categorias
+from api.movimientos import purgar_categorias_sin_uso
 from .default_categories import default_categories
 from sqlalchemy import exists
 
@@ -14,19 +16,13 @@ categorias_bp = Blueprint('categorias', __name__)
 @token_required
 def listar_categorias(payload):
     current_user_id = payload.get('id')  # Acceder al 'id' del usuario
-    # Ordeno categorías por 'nombre' de forma ascendente
-    default_categories = Categoria.query.filter_by(is_default=True).all()
-    user_categories = Categoria.query.filter_by(user_id=current_user_id).all()
-    all_categories = default_categories + user_categories
-     # Ordenar por el atributo 'nombre' (de forma ascendente)
-    sorted_categories = sorted(all_categories, key=lambda c: c.nombre)
+    # Predeterminadas desde la caché del proceso + las del usuario, ordenadas por 'nombre'
+    sorted_categories = categorias_de_usuario(current_user_id)
 
-    return jsonify([{
-        'id': e.id,
-        'nombre': e.nombre,
-        'icono':e.icono,
-        'is_default': e.is_default,
-    } for e in sorted_categories]), 200
+    # ETag sobre el contenido: si el cliente ya tiene esta lista respondemos 304 sin cuerpo
+    respuesta = jsonify(sorted_categories)
+    respuesta.add_etag()
+    return respuesta.make_conditional(request)
 
 
 
@@ -64,6 +60,7 @@ def crear_categoria(payload):
     # Agregarla a la base de datos
     db.session.add(nueva_categoria)
     db.session.commit()
+    invalidar_categorias()
 
     # Retornar el ID de la nueva categoría
     return jsonify({'msg': 'Categoría creada exitosamente', 'id': nueva_categoria.id,"nombre":nueva_categoria.nombre,"icono":nueva_categoria.icono}), 201
@@ -82,8 +79,16 @@ def eliminar_categoria(payload):
         return jsonify({"error": "Categoría no encontrada"}), 404
 
     # Verificar si la categoría está relacionada con algún ingreso o egreso
-    ingresos_relacionados = Ingreso.query.filter_by(categoria_id=id).count()
-    egresos_relacionados = Egreso.query.filter_by(categoria_id=id).count()
+    # (también archivado: conserva la clave foránea). Las propias llevan
+    # contadores de uso; las predeterminadas (compartidas) se comprueban
+    # contra los índices por categoria_id
+    if categoria.is_default:
+        ingresos_relacionados = Ingreso.query.filter_by(categoria_id=id).count()
+        egresos_relacionados = Egreso.query.filter_by(categoria_id=id).count() \
+            + EgresoArchivado.query.filter_by(categoria_id=id).count()
+    else:
+        ingresos_relacionados = categoria.usos_ingresos
+        egresos_relacionados = categoria.usos_egresos
 
     if ingresos_relacionados > 0 or egresos_relacionados > 0:
             return jsonify({
@@ -97,6 +102,7 @@ def eliminar_categoria(payload):
     # Eliminar la categoría si no está relacionada
     db.session.delete(categoria)
     db.session.commit()
+    invalidar_categorias()
 
     return jsonify({"message": "Categoría eliminada correctamente"}), 200
 
@@ -105,39 +111,13 @@ def eliminar_categoria(payload):
 @token_required
 def eliminar_todas_las_categorias(payload):
     try:
-        # Obtener todas las categorías no predeterminadas (is_default=False)
-        categorias = Categoria.query.filter_by(is_default=False).all()
-
-        if not categorias:
-            return jsonify({"message": "No hay categorías para eliminar."}), 200
-
-        print("aqaui")
-        # Filtrar las categorías no comprometidas
-        categorias_no_comprometidas = []
-        categorias_comprometidas = []
-
-        for categoria in categorias:
-            # Verificar si la categoría tiene ingresos o egresos relacionados
-            ingresos_relacionados = Ingreso.query.filter_by(categoria_id=categoria.id).count()
-            egresos_relacionados = Egreso.query.filter_by(categoria_id=categoria.id).count()
-
-            # Si no tiene ingresos ni egresos, se agrega a las categorías no comprometidas
-            if ingresos_relacionados == 0 and egresos_relacionados == 0:
-                categorias_no_comprometidas.append(categoria)
-            else:
-                categorias_comprometidas.append({
-                    "id": categoria.id,
-                    "nombre": categoria.nombre,
-                    "ingresos_relacionados": ingresos_relacionados,
-                    "egresos_relacionados": egresos_relacionados
-                })
-
-        # Solo eliminar las categorías que no son predeterminadas y que no tienen ingresos ni egresos relacionados
-        if categorias_no_comprometidas:
-            for categoria in categorias_no_comprometidas:
-                db.session.delete(categoria)
+        # Un anti-join elimina de una vez las no predeterminadas sin movimientos
+        # y devuelve las que se conservan (con sus contadores de uso)
+        eliminadas, categorias_comprometidas = purgar_categorias_sin_uso()
 
+        if eliminadas:
             db.session.commit()
+            invalidar_categorias()
 
             # Verificar si la tabla está vacía
             categorias_count = db.session.execute('SELECT COUNT(*) FROM categorias').scalar()
@@ -145,15 +125,17 @@ def eliminar_todas_las_categorias(payload):
                 db.session.execute('ALTER SEQUENCE categorias_id_seq RESTART WITH 1;')
                 db.session.commit()
 
-            print("llegue aqui")
             return jsonify({
-                "message": f"{len(categorias_no_comprometidas)} categorías eliminadas correctamente.",
+                "message": f"{eliminadas} categorías eliminadas correctamente.",
                 "comprometidas": categorias_comprometidas
             }), 200
+        elif not categorias_comprometidas:
+            return jsonify({"message": "No hay categorías para eliminar."}), 200
         else:
             return jsonify({"message": "No hay categorías no comprometidas para eliminar."}), 200
 
     except Exception as e:
+        db.session.rollback()
         return jsonify({"error": "Error interno del servidor", "details": str(e)}), 500
 
 #---------------------------------------------------
@@ -175,6 +157,7 @@ def insertar_categorias_por_defecto():
                     db.session.add(default_categoria)
             
             db.session.commit()
+            invalidar_categorias()
 
             return jsonify({"msg": "Categorías insertadas exitosamente"}), 201
 
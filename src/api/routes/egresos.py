@@ -1,6 +1,10 @@
 from flask import Blueprint, request, jsonify
-from api.models import db, Egreso,Usuario
+from api.models import db, Egreso
 from api.token_required import token_required
+from api.movimientos import ajustar_capital, contabilizar, paginar_movimientos, registrar_lote
+from api.utils import APIException
+from api.json_rapido import filas_a_dicts, respuesta_json
+from api.replica import lectura_en_replica
 from datetime import date
 #------------------------------------------
 egresos_bp = Blueprint('egresos', __name__)
@@ -10,28 +14,22 @@ egresos_bp = Blueprint('egresos', __name__)
 # CRUD para Egreso
 @egresos_bp.route('/egresos', methods=['GET'])
 @token_required
+@lectura_en_replica
 def obtener_egresos(payload):
     try:
         # Obtener el id del usuario desde el token
         usuario_id = payload['id']
         
-        # Filtrar los egresos por el id del usuario autenticado
-        egresos = Egreso.query.filter_by(usuario_id=usuario_id).all()
-        
-        # Formatear los egresos como una lista de diccionarios
-        egresos_serializados = [
-            {
-                "id": egreso.id,
-                "monto": egreso.monto,
-                "descripcion": egreso.descripcion,
-                "fecha": egreso.fecha.isoformat(),
-                "categoria_id": egreso.categoria_id,
-                "usuario_id": egreso.usuario_id
-            }
-            for egreso in egresos
-        ]
-
-        return jsonify(egresos_serializados), 200
+        # Página de egresos del usuario autenticado (keyset por fecha e id)
+        egresos, siguiente_cursor = paginar_movimientos(Egreso, usuario_id, request.args)
+
+        # Las filas ya traen sólo las columnas de la respuesta: se serializan tal cual
+        respuesta = respuesta_json(filas_a_dicts(egresos))
+        if siguiente_cursor:
+            respuesta.headers['X-Siguiente-Cursor'] = siguiente_cursor
+        return respuesta, 200
+    except APIException:
+        raise
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -54,22 +52,58 @@ def crear_egreso(payload):
     except ValueError:
         return jsonify({'msg': 'Formato de fecha inválido. Debe ser YYYY-MM-DD.'}), 400
 
+    # Sólo se registran movimientos del usuario del token
+    usuario_id = payload.get('id')
+    if str(data['usuario_id']) != str(usuario_id):
+        return jsonify({"error": "No tienes permiso para registrar movimientos de otro usuario"}), 403
+
     nuevo_egreso = Egreso(
         monto=data['monto'],
         descripcion=data['descripcion'],
         fecha=fecha,
-        usuario_id=data['usuario_id'],
+        usuario_id=usuario_id,
         categoria_id=data['categoria_id']
     )
     db.session.add(nuevo_egreso)
 
-    # Obtener el usuario para actualizar su capital_actual
-    usuario = Usuario.query.get(data['usuario_id'])
-    if not usuario:
-        return jsonify({"error": "Usuario no encontrado"}), 404
+    # Mantener el resumen mensual del usuario en la misma transacción
+    contabilizar(usuario_id, 'egreso', [{'fecha': fecha, 'monto': data['monto'],
+                                          'categoria_id': data['categoria_id']}])
 
-    # Actualizar el capital_actual RESTANDO el monto del depósito
-    usuario.capital_actual -=  float(data['monto'])
+    # Actualizar el capital_actual RESTANDO el monto con un UPDATE atómico (al final, para bloquear la fila lo mínimo)
+    if ajustar_capital(usuario_id, -float(data['monto'])) is None:
+        db.session.rollback()
+        return jsonify({"error": "Usuario no encontrado"}), 404
 
     db.session.commit()
     return jsonify({'msg': 'Egreso creado exitosamente'}), 201
+
+
+#----------------------------------------------------------------------------------------
+# Ruta para crear EGRESOS en lote (sincronización de datos offline)
+@egresos_bp.route('/lote', methods=['POST'])
+@token_required
+def crear_egresos_lote(payload):
+    usuario_id = payload.get('id')
+    if not usuario_id:
+        return jsonify({"error": "Usuario no autenticado"}), 401
+
+    data = request.get_json()
+    # Se acepta una lista de filas o {"egresos": [...]}
+    filas = data.get('egresos') if isinstance(data, dict) else data
+    if not filas or not isinstance(filas, list):
+        return jsonify({'msg': 'Envía un arreglo de egresos en "egresos"'}), 400
+
+    try:
+        insertados, errores = registrar_lote('egreso', usuario_id, filas)
+        db.session.commit()
+    except APIException:
+        db.session.rollback()
+        raise
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"Error al registrar el lote: {str(e)}"}), 500
+
+    codigo = 201 if insertados else 400
+    return jsonify({'insertados': insertados, 'errores': errores}), codigo
+
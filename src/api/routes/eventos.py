@@ -0,0 +1,68 @@
+# api/routes/eventos.py
+import json
+import queue
+import time
+from flask import Blueprint, Response, current_app, jsonify
+from api.models import db, Alerta
+from api.token_required import token_required, usuario_actual
+from api.eventos import broker
+
+#-----------------------------------------
+eventos_bp = Blueprint('eventos', __name__)
+#-----------------------------------------
+
+
+def _mensaje(tipo, datos):
+    return f"event: {tipo}\ndata: {json.dumps(datos, default=str)}\n\n"
+
+
+# Flujo Server-Sent Events del usuario: reemplaza el polling de
+# /alertas/alertas y /usuarios/totales. Al conectar envía el estado actual
+# ('capital' y 'no_leidas') y luego cada 'alerta' y 'capital' confirmados.
+# EventSource no admite encabezados: el token puede ir en ?token=
+@eventos_bp.route('/flujo', methods=['GET'])
+@token_required(token_en_query=True)
+def flujo_de_eventos(payload):
+    actual = broker()
+    usuario_id = payload.get('id')
+    if not usuario_id or actual is None:
+        return jsonify({"error": "Usuario no autenticado"}), 401
+
+    # Suscribirse antes de leer el estado para no perder cambios intermedios
+    cola = actual.suscribir(usuario_id)
+    usuario = usuario_actual()
+    if usuario is None:
+        actual.cancelar(usuario_id, cola)
+        return jsonify({"error": "Usuario no encontrado"}), 404
+    capital = usuario.capital_actual
+    no_leidas = db.session.query(db.func.count(Alerta.id)).filter(
+        Alerta.usuario_id == usuario_id, Alerta.leida == False
+    ).scalar()
+    # El flujo dura minutos: no debe retener una conexión del pool
+    db.session.remove()
+
+    latido = current_app.config.get('EVENTOS_LATIDO', 15)
+    duracion = current_app.config.get('EVENTOS_DURACION_MAX', 300)
+
+    def generar():
+        try:
+            # Pasada la duración máxima se cierra y el navegador reconecta solo
+            yield f"retry: {latido * 1000}\n\n"
+            yield _mensaje('capital', {'capital_actual': capital})
+            yield _mensaje('no_leidas', {'no_leidas': no_leidas})
+            fin = time.monotonic() + duracion
+            while time.monotonic() < fin:
+                try:
+                    evento = cola.get(timeout=latido)
+                except queue.Empty:
+                    # Comentario SSE: mantiene viva la conexión y detecta clientes caídos
+                    yield ': latido\n\n'
+                    continue
+                yield _mensaje(evento['tipo'], evento['datos'])
+        finally:
+            actual.cancelar(usuario_id, cola)
+
+    return Response(generar(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',  # sin buffer en proxies nginx
+    })
@@ -2,6 +2,7 @@
 from flask import Blueprint, request, jsonify
 from api.models import db, FondoEmergencia
 from api.token_required import token_required
+from api.cache_respuestas import respuesta_en_cache
 
 #--------------------------------------------------------------
 fondos_emergencia_bp = Blueprint('fondos_emergencia', __name__)
@@ -10,6 +11,7 @@ fondos_emergencia_bp = Blueprint('fondos_emergencia', __name__)
 # CRUD para FondoEmergencia
 @fondos_emergencia_bp.route('/fondos_emergencia/activo', methods=['GET'])
 @token_required
+@respuesta_en_cache
 def obtener_fondo_emergencia_activo(payload):
     usuario_id = payload.get('id')
 
@@ -0,0 +1,69 @@
+# api/routes/importaciones.py
+from flask import Blueprint, request, jsonify, current_app
+from api.models import db, Importacion
+from api.token_required import token_required
+from api.importaciones import encolar_importacion
+
+#-----------------------------------------------------------
+importaciones_bp = Blueprint('importaciones', __name__)
+#-----------------------------------------------------------
+
+# Ruta para subir un extracto bancario CSV; se procesa en segundo plano
+# (`flask procesar-importaciones`)
+@importaciones_bp.route('/csv', methods=['POST'])
+@token_required
+def importar_csv(payload):
+    usuario_id = payload.get('id')
+    if not usuario_id:
+        return jsonify({"error": "Usuario no autenticado"}), 401
+
+    # Archivo multipart en 'archivo' o el CSV directamente en el cuerpo
+    archivo = request.files.get('archivo')
+    if archivo:
+        nombre_archivo = archivo.filename
+        datos = archivo.read()
+    else:
+        nombre_archivo = None
+        datos = request.get_data()
+
+    if not datos:
+        return jsonify({"error": "No se recibió ningún archivo CSV"}), 400
+    if len(datos) > current_app.config.get('IMPORTACION_MAX_BYTES', 10 * 1024 * 1024):
+        return jsonify({"error": "El archivo es demasiado grande"}), 413
+
+    try:
+        # utf-8-sig descarta el BOM que agregan muchas hojas de cálculo
+        contenido = datos.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        contenido = datos.decode('latin-1')
+
+    importacion = Importacion(
+        usuario_id=usuario_id,
+        nombre_archivo=nombre_archivo,
+        estado='pendiente',
+        total_filas=max(contenido.count('\n') - 1, 0),
+        procesadas=0,
+        insertadas=0,
+        duplicadas=0,
+        intentos=0,
+        contenido=contenido
+    )
+    db.session.add(importacion)
+    db.session.commit()
+
+    encolar_importacion(current_app._get_current_object(), importacion.id)
+
+    return jsonify({"msg": "Importación en proceso", "importacion": importacion.to_dict()}), 202
+
+#-----------------------------------------------------------
+# Ruta para consultar el progreso y el resultado de una importación
+@importaciones_bp.route('/<int:importacion_id>', methods=['GET'])
+@token_required
+def estado_importacion(payload, importacion_id):
+    usuario_id = payload.get('id')
+
+    importacion = Importacion.query.get(importacion_id)
+    if not importacion or importacion.usuario_id != usuario_id:
+        return jsonify({"error": "Importación no encontrada"}), 404
+
+    return jsonify(importacion.to_dict()), 200
@@ -1,7 +1,11 @@
 # api/routes/ingresos.py
 from flask import Blueprint, request, jsonify
-from api.models import db, Ingreso,Usuario
+from api.models import db, Ingreso
 from api.token_required import token_required
+from api.movimientos import ajustar_capital, contabilizar, paginar_movimientos, registrar_lote
+from api.utils import APIException
+from api.json_rapido import filas_a_dicts, respuesta_json
+from api.replica import lectura_en_replica
 from datetime import date
 
 
@@ -12,28 +16,22 @@ ingresos_bp = Blueprint('ingresos', __name__)
 # Ruta para obtener ingresos
 @ingresos_bp.route('/ingresos', methods=['GET'])
 @token_required
+@lectura_en_replica
 def obtener_ingresos(payload):
     try:
         # Obtener el id del usuario desde el token
         usuario_id = payload['id']
         
-        # Filtrar los ingresos por el id del usuario autenticado
-        ingresos = Ingreso.query.filter_by(usuario_id=usuario_id).all()
-        
-        # Formatear los ingresos como una lista de diccionarios
-        ingresos_serializados = [
-            {
-                "id": ingreso.id,
-                "monto": ingreso.monto,
-                "descripcion": ingreso.descripcion,
-                "fecha": ingreso.fecha.isoformat(),
-                "categoria_id": ingreso.categoria_id,
-                "usuario_id": ingreso.usuario_id
-            }
-            for ingreso in ingresos
-        ]
-
-        return jsonify(ingresos_serializados), 200
+        # Página de ingresos del usuario autenticado (keyset por fecha e id)
+        ingresos, siguiente_cursor = paginar_movimientos(Ingreso, usuario_id, request.args)
+
+        # Las filas ya traen sólo las columnas de la respuesta: se serializan tal cual
+        respuesta = respuesta_json(filas_a_dicts(ingresos))
+        if siguiente_cursor:
+            respuesta.headers['X-Siguiente-Cursor'] = siguiente_cursor
+        return respuesta, 200
+    except APIException:
+        raise
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -54,25 +52,58 @@ def crear_ingreso(payload):
     except ValueError:
         return jsonify({'msg': 'Formato de fecha inválido. Debe ser YYYY-MM-DD.'}), 400
 
+    # Sólo se registran movimientos del usuario del token
+    usuario_id = payload.get('id')
+    if str(data['usuario_id']) != str(usuario_id):
+        return jsonify({"error": "No tienes permiso para registrar movimientos de otro usuario"}), 403
+
     nuevo_ingreso = Ingreso(
         monto=data['monto'],
         descripcion=data['descripcion'],
         fecha=fecha,
-        usuario_id=data['usuario_id'],
+        usuario_id=usuario_id,
         categoria_id=data['categoria_id']
     )
     db.session.add(nuevo_ingreso)
 
-    # Obtener el usuario para actualizar su capital_actual
-    usuario = Usuario.query.get(data['usuario_id'])
-    if not usuario:
-        return jsonify({"error": "Usuario no encontrado"}), 404
-    
-    # Actualizar el capital_actual sumando el monto del depósito
-    usuario.capital_actual += float(data['monto'])
+    # Mantener el resumen mensual del usuario en la misma transacción
+    contabilizar(usuario_id, 'ingreso', [{'fecha': fecha, 'monto': data['monto'],
+                                           'categoria_id': data['categoria_id']}])
 
+    # Actualizar el capital_actual sumando el monto con un UPDATE atómico (al final, para bloquear la fila lo mínimo)
+    if ajustar_capital(usuario_id, float(data['monto'])) is None:
+        db.session.rollback()
+        return jsonify({"error": "Usuario no encontrado"}), 404
 
     db.session.commit()
     return jsonify({'msg': 'Ingreso creado exitosamente'}), 201
 
 
+#----------------------------------------------------------------------------------------
+# Ruta para crear INGRESOS en lote (sincronización de datos offline)
+@ingresos_bp.route('/lote', methods=['POST'])
+@token_required
+def crear_ingresos_lote(payload):
+    usuario_id = payload.get('id')
+    if not usuario_id:
+        return jsonify({"error": "Usuario no autenticado"}), 401
+
+    data = request.get_json()
+    # Se acepta una lista de filas o {"ingresos": [...]}
+    filas = data.get('ingresos') if isinstance(data, dict) else data
+    if not filas or not isinstance(filas, list):
+        return jsonify({'msg': 'Envía un arreglo de ingresos en "ingresos"'}), 400
+
+    try:
+        insertados, errores = registrar_lote('ingreso', usuario_id, filas)
+        db.session.commit()
+    except APIException:
+        db.session.rollback()
+        raise
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"Error al registrar el lote: {str(e)}"}), 500
+
+    codigo = 201 if insertados else 400
+    return jsonify({'insertados': insertados, 'errores': errores}), codigo
+
@@ -0,0 +1,18 @@
+# api/routes/metricas.py
+import hmac
+from flask import request, jsonify, current_app
+from api.pool_conexiones import metricas_pool
+from . import api_bp
+
+
+# Estado de los pools de conexiones de este proceso (cada worker de gunicorn
+# tiene el suyo). Exige METRICAS_CLAVE en X-Metricas-Clave; si la clave no
+# está configurada la ruta responde 404, como si no existiera.
+@api_bp.route('/metricas/pool', methods=['GET'])
+def obtener_metricas_pool():
+    clave = current_app.config.get('METRICAS_CLAVE')
+    if not clave:
+        return jsonify({"error": "No encontrado"}), 404
+    if not hmac.compare_digest(request.headers.get('X-Metricas-Clave', ''), clave):
+        return jsonify({"error": "No autorizado"}), 401
+    return jsonify(metricas_pool(current_app)), 200
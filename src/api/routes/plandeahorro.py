@@ -1,6 +1,13 @@
 from flask import Blueprint, request, jsonify
-from api.models import db, PlanAhorro, Categoria,Egreso,Ingreso,Usuario
-from api.token_required import token_required
+from api.models import db, PlanAhorro, Egreso
+from api.token_required import token_required, usuario_actual
+from api.movimientos import ajustar_capital, acumular_en_plan, cancelar_plan, contabilizar
+from api.cache_categorias import id_categoria
+from api.instrumentacion import presupuesto_sql
+from api.cache_respuestas import respuesta_en_cache
+from api.json_rapido import filas_a_dicts, respuesta_json
+from api.replica import lectura_en_replica
+from api.proyecciones import proyectar_planes_usuario, VENTANA_MESES
 from datetime import date
 from sqlalchemy.exc import SQLAlchemyError
 
@@ -12,6 +19,7 @@ plandeahorro_bp = Blueprint('plandeahorro', __name__)
 #---------------------------------------------------------
 @plandeahorro_bp.route('/agregarplan', methods=['POST'])
 @token_required
+@presupuesto_sql(6)  # 5 en PostgreSQL: INSERT plan, INSERT egreso, upsert resumen, UPDATE capital y categorías si su caché está fría
 def agregar_plan_ahorro(payload):
     # El 'id' del usuario ya está disponible a través de 'payload'
     usuario_id = payload.get('id')  # Acceder al 'id' del usuario
@@ -48,62 +56,58 @@ def agregar_plan_ahorro(payload):
     if monto_inicial < 0 or monto_objetivo <= 0:
         return jsonify({"error": "El monto inicial no puede ser negativo y el monto objetivo debe ser mayor que cero"}), 400
 
-    # Buscar la categoría "Plan de Ahorro"  
-    categoria_plan_ahorro = Categoria.query.filter_by(nombre="Plan de ahorro").first()
-    # Crear el nuevo plan de ahorroñl
+    # Buscar la categoría "Plan de Ahorro" (caché del proceso)
+    categoria_plan_ahorro_id = id_categoria("Plan de ahorro")
+    if not categoria_plan_ahorro_id:
+        return jsonify({"error": "La categoría 'Plan de Ahorro' no está definida"}), 500
+    # Plan y depósito inicial en una sola transacción: el plan ya nace con su monto
+    # acumulado y el egreso se enlaza por la relación, así un único flush inserta
+    # ambos (INSERT ... RETURNING id) sin commits intermedios
     nuevo_plan = PlanAhorro(
         nombre_plan=data['nombre_plan'],
         fecha_inicio=fecha_inicio,
         monto_inicial=monto_inicial,
         monto_objetivo=monto_objetivo,
         fecha_objetivo=fecha_objetivo,
+        monto_acumulado=monto_inicial,
         usuario_id=usuario_id
     )
-
-    # Guardar en la base de datos
-    db.session.add(nuevo_plan)
-    db.session.commit()
-
-    # Ahora creamos el nuevo Egreso (registro de la primera transacción de ahorro)
-
-    
     nuevo_egreso = Egreso(
         usuario_id=usuario_id,
         monto=monto_inicial,  # El monto inicial es el primer egreso
         descripcion="Depósito inicial al plan de ahorro",
         fecha=fecha_inicio,  # Usamos la fecha de inicio del plan
-        categoria_id=categoria_plan_ahorro.id,  
-        plan_ahorro_id=nuevo_plan.id  # Asociamos el egreso con el plan de ahorro recién creado
+        categoria_id=categoria_plan_ahorro_id,
+        plan_ahorro=nuevo_plan  # Asociamos el egreso con el plan de ahorro recién creado
     )
-    # Guardamos el egreso
+    db.session.add(nuevo_plan)
     db.session.add(nuevo_egreso)
-    # Actualizamos el monto acumulado en el plan de ahorro
-    nuevo_plan.monto_acumulado += monto_inicial
-
-    db.session.commit()
+    db.session.flush()
 
+    contabilizar(usuario_id, 'egreso', [{'fecha': fecha_inicio, 'monto': monto_inicial,
+                                         'categoria_id': categoria_plan_ahorro_id}])
 
-    # Obtener el usuario para actualizar su capital_actual
-    usuario = Usuario.query.get(usuario_id)
-    if not usuario:
+    # Actualizar el capital_actual restando el monto del depósito (UPDATE atómico, al final)
+    if ajustar_capital(usuario_id, -monto_inicial) is None:
+        db.session.rollback()
         return jsonify({"error": "Usuario no encontrado"}), 404
-    
-    # Actualizar el capital_actual restando el monto del depósito
-    usuario.capital_actual -= monto_inicial
+
+    # Armamos la respuesta antes del commit para no volver a leer el plan
+    plan_creado = {
+        "id": nuevo_plan.id,
+        "nombre_plan": nuevo_plan.nombre_plan,
+        "fecha_inicio": nuevo_plan.fecha_inicio.isoformat(),
+        "monto_inicial": nuevo_plan.monto_inicial,
+        "monto_objetivo": nuevo_plan.monto_objetivo,
+        "fecha_objetivo": nuevo_plan.fecha_objetivo.isoformat(),
+        "usuario_id": nuevo_plan.usuario_id
+    }
     db.session.commit()
-    
+
       # Devolver toda la información del nuevo plan para actualizar la UI
     return jsonify({
         "msg": "Plan de ahorro agregado exitosamente",
-        "nuevo_plan": {
-            "id": nuevo_plan.id,
-            "nombre_plan": nuevo_plan.nombre_plan,
-            "fecha_inicio": nuevo_plan.fecha_inicio.isoformat(),
-            "monto_inicial": nuevo_plan.monto_inicial,
-            "monto_objetivo": nuevo_plan.monto_objetivo,
-            "fecha_objetivo": nuevo_plan.fecha_objetivo.isoformat(),
-            "usuario_id": nuevo_plan.usuario_id
-        }
+        "nuevo_plan": plan_creado
     }), 201
 
 #------------------------------------------------------
@@ -150,6 +154,7 @@ def editar_plan_ahorro(payload):
 
 @plandeahorro_bp.route('/eliminar_plan_ahorro', methods=['DELETE'])
 @token_required
+@presupuesto_sql(9)  # 8 en PostgreSQL con la caché de categorías fría, sin importar cuántos depósitos tenga el plan
 def eliminar_plan_ahorro(payload):
     data = request.get_json()
     usuario_id = payload.get('id')
@@ -159,58 +164,28 @@ def eliminar_plan_ahorro(payload):
         return jsonify({'error': 'Falta el campo "plan_ahorro_id".'}), 400
 
     plan_ahorro_id = data['plan_ahorro_id']
+    # Con "archivar": true los depósitos se guardan en egresos_archivados en vez de borrarse
+    archivar = bool(data.get('archivar', False))
 
     try:
-        # Buscar el plan de ahorro por ID
-        plan_ahorro = PlanAhorro.query.get(plan_ahorro_id)
-        
+        # Buscar el plan de ahorro del usuario por ID
+        plan_ahorro = PlanAhorro.query.filter_by(id=plan_ahorro_id, usuario_id=usuario_id).first()
+
         if not plan_ahorro:
             return jsonify({'error': 'Plan de ahorro no encontrado.'}), 404
 
-        # Si el plan de ahorro tiene egresos asociados, procesamos la reversión
-        egresos = plan_ahorro.egresos  # Asegúrate de usar el nombre correcto del backref
-        # Tomar la categoría del primer egreso (todas las categorías son las mismas)
-        #categoria_id = egresos[0].categoria_id
-
-        # Generar un ingreso por la cancelación del plan de ahorro
-        ingresos_por_cancelacion = 0
-        for egreso in egresos:
-            ingresos_por_cancelacion += egreso.monto  # Acumulamos el monto de los egresos
-
-            # Crear el ingreso que "restituye" el monto del egreso
-            # ingreso_cancelacion = Ingreso(
-            #     monto=egreso.monto,
-            #     descripcion=f'Reversión por cancelación de plan de ahorro: {plan_ahorro.nombre_plan}',
-            #     usuario_id=plan_ahorro.usuario_id,  # Asociamos al mismo usuario
-            #     fecha = date.today(),
-            #     categoria_id= egreso.categoria_id
-            # )
-
-            # db.session.add(ingreso_cancelacion)
-
-            # Eliminar el egreso asociado
-            db.session.delete(egreso)
-        
-         # Obtener el usuario para actualizar su capital_actual
-        usuario = Usuario.query.get(usuario_id)
-        if not usuario:
+        # Depósitos, resúmenes, plan y capital en sentencias en bloque y una sola transacción
+        ingresos_por_cancelacion, capital_actual = cancelar_plan(plan_ahorro, archivar=archivar)
+        if capital_actual is None:
+            db.session.rollback()
             return jsonify({"error": "Usuario no encontrado"}), 404
 
-        # Actualizar el capital_actual restando el monto del depósito
-        usuario.capital_actual += plan_ahorro.monto_acumulado
-
-        # Actualizar el capital acumulado del plan de ahorro a cero
-        plan_ahorro.monto_acumulado = 0.0
-
-        # Eliminar el plan de ahorro
-        db.session.delete(plan_ahorro)
-    
         # Hacer commit de todas las operaciones en la base de datos
         db.session.commit()
-        print("170")
         return jsonify({
             'message': 'Plan de ahorro eliminado correctamente y egresos revertidos.',
-            'ingreso_generado': ingresos_por_cancelacion
+            'ingreso_generado': ingresos_por_cancelacion,
+            'archivado': archivar
         }), 200
 
     except SQLAlchemyError as e:
@@ -220,6 +195,8 @@ def eliminar_plan_ahorro(payload):
 
 @plandeahorro_bp.route('/traerplan', methods=['GET'])
 @token_required
+@respuesta_en_cache
+@lectura_en_replica
 def obtener_planes_ahorro(payload):
     # El 'id' del usuario ya está disponible a través de 'payload'
     usuario_id = payload.get('id')  # Acceder al 'id' del usuario
@@ -228,23 +205,49 @@ def obtener_planes_ahorro(payload):
     if not usuario_id:
         return jsonify({"error": "Usuario no autenticado"}), 401
     
-    planes = PlanAhorro.query.filter_by(usuario_id=usuario_id).all()
-    # Serializar los planes de ahorro filtrados por usuario según token
-    planes_serializados = [p.to_dict() for p in planes]
-
-    usuario = Usuario.query.get(usuario_id)
+    # Planes del usuario como columnas (mismas claves que PlanAhorro.to_dict())
+    planes = db.session.query(
+        PlanAhorro.id, PlanAhorro.nombre_plan, PlanAhorro.monto_inicial, PlanAhorro.monto_objetivo,
+        PlanAhorro.fecha_inicio, PlanAhorro.fecha_objetivo, PlanAhorro.monto_acumulado, PlanAhorro.usuario_id
+    ).filter(PlanAhorro.usuario_id == usuario_id).all()
+    planes_serializados = filas_a_dicts(planes)
+
+    usuario = usuario_actual()
     if not usuario:
         return jsonify({"error": "Usuario no encontrado"}), 404
 
     # Añadir el capital actual del usuario a la respuesta
-    return jsonify({
+    return respuesta_json({
         "capital_actual": usuario.capital_actual,
         "planes": planes_serializados
+    })
+
+#---------------------------------------------------------
+# Proyección de todos los planes del usuario: aporte mensual, fecha en que
+# alcanzará la meta y depósito mensual necesario para llegar a tiempo
+@plandeahorro_bp.route('/proyeccion', methods=['GET'])
+@token_required
+@respuesta_en_cache
+@lectura_en_replica
+def obtener_proyeccion_planes(payload):
+    usuario_id = payload.get('id')
+
+    if not usuario_id:
+        return jsonify({"error": "Usuario no autenticado"}), 401
+
+    ventana = request.args.get('ventana', VENTANA_MESES, type=int)
+    if not 1 <= ventana <= 120:
+        return jsonify({"error": "La ventana debe estar entre 1 y 120 meses"}), 400
+
+    return respuesta_json({
+        "ventana_meses": ventana,
+        "planes": proyectar_planes_usuario(usuario_id, ventana_meses=ventana)
     }), 200
 
 #---------------------------------------------------------
 @plandeahorro_bp.route('/depositar', methods=['POST'])
 @token_required
+@presupuesto_sql(7)  # 5 en PostgreSQL: UPDATE plan, INSERT egreso, upsert resumen, UPDATE capital y categorías si su caché está fría
 def registrar_deposito_plan(payload):
     #Registra un monto hacia un plan de ahorro y crea un egreso asociado.
     data = request.json  # Datos enviados en el cuerpo de la solicitud aqui los recibo
@@ -254,71 +257,75 @@ def registrar_deposito_plan(payload):
 
     # Obtener los datos del cuerpo de la solicitud
     plan_id = data.get('plan_id')  # ID del plan de ahorro al que se deposita
-    nombre_plan = data.get('nombre_plan')  # ID del plan de ahorro al que se deposita
-    monto_ahorro = float(data.get('monto_ahorro'))  # Monto a depositar
     descripcion_deposito = data.get('descripcion', "Deposito al plan de ahorro")  # Descripción opcional
     fecha = data.get('fecha')
 
+    try:
+        monto_ahorro = float(data.get('monto_ahorro'))  # Monto a depositar
+    except (TypeError, ValueError):
+        monto_ahorro = None
+
     # Validar datos requeridos
     if not usuario_id or not plan_id or not monto_ahorro or not fecha:
         return jsonify({"error": "Faltan datos requeridos (usuario_id, plan_id, nombre_plan,monto_monto_ahorro,fecha)"}), 400
 
-    # Buscar la categoría "Plan de Ahorro"  
-    categoria_plan_ahorro = Categoria.query.filter_by(nombre="Plan de ahorro").first()
-     
-    try:
-
-        # Buscar el plan de ahorro
-        plan = PlanAhorro.query.get(plan_id)
-        
-        if not plan:
-            return jsonify({"error": "Plan de ahorro no encontrado"}), 404
-        
-        if plan.usuario_id != usuario_id:
-            return jsonify({"error": "El plan de ahorro no pertenece al usuario"}), 403
+    # Verificar que el monto sea válido
+    if monto_ahorro <= 0:
+        return jsonify({"error": "El monto debe ser mayor a cero"}), 400
 
-        # Verificar que el monto sea válido
-        if monto_ahorro <= 0:
-            return jsonify({"error": "El monto debe ser mayor a cero"}), 400
+    try:
+        # Convertir fecha desde el formato ISO 8601
+        fecha = date.fromisoformat(fecha)
+    except ValueError:
+        return jsonify({'msg': 'Formato de fecha inválido. Debe ser YYYY-MM-DD.'}), 400
 
-        if not categoria_plan_ahorro:
-            return jsonify({"error": "La categoría 'Plan de Ahorro' no está definida"}), 500
+    # Buscar la categoría "Plan de Ahorro" (caché del proceso)
+    categoria_plan_ahorro_id = id_categoria("Plan de ahorro")
+    if not categoria_plan_ahorro_id:
+        return jsonify({"error": "La categoría 'Plan de Ahorro' no está definida"}), 500
 
-        try:
-            # Convertir fecha desde el formato ISO 8601
-            fecha = date.fromisoformat(data['fecha'])
-        except ValueError:
-            return jsonify({'msg': 'Formato de fecha inválido. Debe ser YYYY-MM-DD.'}), 400
+    try:
+        # Sumar al plan y verificar que pertenece al usuario en la misma sentencia
+        plan = acumular_en_plan(plan_id, usuario_id, monto_ahorro)
+        if plan is None:
+            db.session.rollback()
+            # Sólo en el camino de error distinguimos "no existe" de "no es tuyo"
+            if PlanAhorro.query.get(plan_id):
+                return jsonify({"error": "El plan de ahorro no pertenece al usuario"}), 403
+            return jsonify({"error": "Plan de ahorro no encontrado"}), 404
 
-        # Registrar el egreso
+        # Registrar el egreso (INSERT ... RETURNING id)
         nuevo_egreso = Egreso(
             usuario_id=usuario_id,
             monto=monto_ahorro,
             descripcion=descripcion_deposito,
             fecha=fecha,
-            categoria_id=categoria_plan_ahorro.id,
-            plan_ahorro_id = plan.id,
+            categoria_id=categoria_plan_ahorro_id,
+            plan_ahorro_id=plan.id,
         )
-
         db.session.add(nuevo_egreso)
+        db.session.flush()
 
-        # Actualizar el monto acumulado en el plan de ahorro
-        plan.monto_acumulado += monto_ahorro
+        contabilizar(usuario_id, 'egreso', [{'fecha': fecha, 'monto': monto_ahorro,
+                                              'categoria_id': categoria_plan_ahorro_id}])
 
-        # Obtener el usuario para actualizar su capital_actual
-        usuario = Usuario.query.get(usuario_id)
-        if not usuario:
+        # Actualizar el capital_actual restando el monto del depósito (UPDATE atómico, al final)
+        if ajustar_capital(usuario_id, -monto_ahorro) is None:
+            db.session.rollback()
             return jsonify({"error": "Usuario no encontrado"}), 404
 
-        # Actualizar el capital_actual restando el monto del depósito
-        usuario.capital_actual -= monto_ahorro
-
-        # Guardar cambios
-        db.session.commit()
-
-        return jsonify({
+        respuesta = {
             "message": "Depósito registrado exitosamente",
-            "plan": plan.to_dict(),
+            "plan": {
+                'id': plan.id,
+                'nombre_plan': plan.nombre_plan,
+                'monto_inicial': plan.monto_inicial,
+                'monto_objetivo': plan.monto_objetivo,
+                'fecha_inicio': plan.fecha_inicio.isoformat(),
+                'fecha_objetivo': plan.fecha_objetivo.isoformat(),
+                'monto_acumulado': plan.monto_acumulado,
+                'usuario_id': plan.usuario_id,
+            },
             "egreso": {
                 "id": nuevo_egreso.id,
                 "monto": nuevo_egreso.monto,
@@ -326,9 +333,12 @@ def registrar_deposito_plan(payload):
                 "fecha": nuevo_egreso.fecha.isoformat(),
                 "categoria_id": nuevo_egreso.categoria_id
             }
-        }), 201
+        }
+
+        # Un único commit para todo el depósito
+        db.session.commit()
+        return jsonify(respuesta), 201
 
     except Exception as e:
         db.session.rollback()  # Revertir cambios en caso de error
         return jsonify({"error": f"Ocurrió un error al registrar el depósito: {str(e)}"}), 500
-
@@ -1,6 +1,12 @@
 from flask import Blueprint, request, jsonify
-from api.models import db, Suscripcion, Egreso, Usuario, Categoria
+from api.models import db, Suscripcion, Egreso
 from api.token_required import token_required
+from api.movimientos import ajustar_capital, contabilizar
+from api.cache_categorias import id_categoria
+from api.facturacion import primer_cobro, siguiente_cobro
+from api.cache_respuestas import respuesta_en_cache
+from api.json_rapido import filas_a_dicts, respuesta_json
+from api.replica import lectura_en_replica
 from datetime import date
 
 # Crear el Blueprint para las rutas de suscripciones
@@ -10,14 +16,19 @@ suscripciones_bp = Blueprint('suscripciones', __name__)
 # Ruta para obtener todas las suscripciones de un usuario
 @suscripciones_bp.route('/suscripcion', methods=['GET'])
 @token_required
+@respuesta_en_cache
+@lectura_en_replica
 def obtener_suscripciones(payload):
     usuario_id = payload.get('id')
     if not usuario_id:
         return jsonify({"error": "Usuario no autenticado"}), 401
 
-    suscripciones = Suscripcion.query.filter_by(usuario_id=usuario_id).all()
-    response = [suscripcion.to_dict() for suscripcion in suscripciones]
-    return jsonify(response), 200
+    # Mismas claves que Suscripcion.to_dict(), leídas como columnas
+    suscripciones = db.session.query(
+        Suscripcion.id, Suscripcion.nombre, Suscripcion.costo, Suscripcion.frecuencia,
+        Suscripcion.fecha_inicio, Suscripcion.proximo_cobro, Suscripcion.usuario_id
+    ).filter(Suscripcion.usuario_id == usuario_id).all()
+    return respuesta_json(filas_a_dicts(suscripciones))
 
 # ------------------------------------------------------
 # Ruta para crear una nueva suscripción
@@ -37,11 +48,14 @@ def crear_suscripcion(payload):
         return jsonify({"error": f"Faltan los siguientes campos: {', '.join(missing_fields)}"}), 400
 
     try:
+        fecha_inicio = date.fromisoformat(data['fecha_inicio'])
         nueva_suscripcion = Suscripcion(
             nombre=data['nombre'],
             costo=data['costo'],
             frecuencia=data['frecuencia'],
-            fecha_inicio=date.fromisoformat(data['fecha_inicio']),
+            fecha_inicio=fecha_inicio,
+            # Los periodos anteriores a hoy no se cobran automáticamente
+            proximo_cobro=primer_cobro(data['frecuencia'], fecha_inicio, date.today()),
             usuario_id=usuario_id
         )
 
@@ -96,8 +110,8 @@ def pagar_suscripcion(payload):
         return jsonify({"error": "Suscripción no encontrada o no autorizada"}), 404
 
     try:
-        categoria = Categoria.query.filter_by(nombre="Suscripciones").first()
-        if not categoria:
+        categoria_id = id_categoria("Suscripciones")
+        if not categoria_id:
             return jsonify({"error": "Categoría 'Suscripciones' no definida"}), 500
 
         nuevo_egreso = Egreso(
@@ -105,16 +119,37 @@ def pagar_suscripcion(payload):
             descripcion=f"Pago de suscripción: {suscripcion.nombre}",
             fecha=date.today(),
             usuario_id=usuario_id,
-            categoria_id=categoria.id
+            categoria_id=categoria_id
         )
 
-        usuario = Usuario.query.get(usuario_id)
-        if not usuario:
-            return jsonify({"error": "Usuario no encontrado"}), 404
-
-        usuario.capital_actual -= suscripcion.costo
+        # El pago manual cubre el periodo vencido: se avanza proximo_cobro sólo
+        # si ya venció y no lo movió antes la facturación automática (evita
+        # cobrar dos veces). No se adelantan pagos de periodos futuros.
+        if suscripcion.proximo_cobro is not None:
+            if suscripcion.proximo_cobro > nuevo_egreso.fecha:
+                return jsonify({
+                    "error": "La suscripción no tiene pagos vencidos",
+                    "proximo_cobro": suscripcion.proximo_cobro.isoformat()
+                }), 409
+            siguiente = siguiente_cobro(suscripcion.frecuencia, suscripcion.fecha_inicio, suscripcion.proximo_cobro)
+            avanzadas = Suscripcion.query.filter(
+                Suscripcion.id == suscripcion.id,
+                Suscripcion.proximo_cobro == suscripcion.proximo_cobro,
+                Suscripcion.proximo_cobro <= nuevo_egreso.fecha
+            ).update({'proximo_cobro': siguiente}, synchronize_session=False)
+            if not avanzadas:
+                db.session.rollback()
+                return jsonify({"error": "El pago de este periodo ya fue registrado"}), 409
 
         db.session.add(nuevo_egreso)
+        contabilizar(usuario_id, 'egreso', [{'fecha': nuevo_egreso.fecha, 'monto': suscripcion.costo,
+                                                  'categoria_id': categoria_id}])
+
+        # Descontar el pago del capital_actual (UPDATE atómico)
+        if ajustar_capital(usuario_id, -suscripcion.costo) is None:
+            db.session.rollback()
+            return jsonify({"error": "Usuario no encontrado"}), 404
+
         db.session.commit()
 
         return jsonify({
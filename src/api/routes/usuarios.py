@@ -1,8 +1,19 @@
 # api/routes/usuarios.py
-from flask import Blueprint, request, jsonify, current_app
-from api.models import db, Usuario,Ingreso,Egreso
-from api.token_required import token_required
-from datetime import datetime, timedelta, timezone
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from api.models import db, Usuario, ResumenMensual
+from api.token_required import token_required, usuario_actual
+from api.movimientos import linea_de_tiempo, exportar_movimientos, COLUMNAS_EXPORTACION
+from api.eventos import registrar_evento
+from api.cache_respuestas import respuesta_en_cache
+from api.json_rapido import dumps, filas_a_dicts, respuesta_json
+from api.replica import lectura_en_replica
+from api.gastos_categorias import gastos_por_categoria
+from api.utils import leer_fecha
+from datetime import date, datetime, timedelta, timezone
+import csv
+import io
+from sqlalchemy import tuple_
+from werkzeug.http import http_date
 
 import jwt
 
@@ -79,6 +90,7 @@ def actualizar_usuario():
     if 'capital_inicial' in data:
         usuario.capital_inicial = data['capital_inicial']
         usuario.capital_actual  = data['capital_inicial']
+        registrar_evento(usuario.id, 'capital', {'capital_actual': usuario.capital_actual})
 
     if 'moneda' in data:
         usuario.moneda = data['moneda']
@@ -112,6 +124,8 @@ def eliminar_usuario(payload):
 # Ruta para obtener los totales de un usuario por ID
 @usuarios_bp.route('/totales', methods=['GET'])
 @token_required
+@respuesta_en_cache
+@lectura_en_replica
 def obtener_totales_usuario(payload):
     # El 'id' del usuario ya está disponible a través de 'payload'
     usuario_id = payload.get('id')  # Acceder al 'id' del usuario
@@ -120,9 +134,11 @@ def obtener_totales_usuario(payload):
     if not usuario_id:
         return jsonify({"error": "Usuario no autenticado"}), 401
     try:
-        usuario = Usuario.query.get_or_404(usuario_id)
+        usuario = usuario_actual()
     except Exception as e:
         return jsonify({"error": f"Error al acceder a la base de datos: {str(e)}"}), 500
+    if not usuario:
+        return jsonify({"error": "Usuario no encontrado"}), 404
     
     # Calcula los totales usando la función del modelo
     totales = usuario.calcular_totales()
@@ -140,6 +156,7 @@ def obtener_totales_usuario(payload):
 # CRUP para Reportes
 @usuarios_bp.route('/reportes', methods=['GET'])
 @token_required
+@lectura_en_replica
 def obtener_reportes(payload):
     # El 'id' del usuario ya está disponible a través de 'payload'
     usuario_id = payload.get('id')  # Acceder al 'id' del usuario
@@ -148,34 +165,127 @@ def obtener_reportes(payload):
     if not usuario_id:
         return jsonify({"error": "Usuario no autenticado"}), 401
     
-    ingresos = Ingreso.query.filter_by(usuario_id=usuario_id).all()
-    egresos = Egreso.query.filter_by(usuario_id=usuario_id).all()
-
-    reportes = [
-        {
-            "id": ingreso.id,
-            "monto": ingreso.monto,
-            "descripcion": ingreso.descripcion,
-            "fecha": ingreso.fecha,
-            "tipo": "ingreso"
-        } for ingreso in ingresos
-    ] + [
-        {
-            "id": egreso.id,
-            "monto": egreso.monto,
-            "descripcion": egreso.descripcion,
-            "fecha": egreso.fecha,
-            "tipo": "egreso"
-        } for egreso in egresos
-    ]
-
-    reportes_ordenados = sorted(reportes, key=lambda x: x['fecha'], reverse=True)
-    return jsonify(reportes_ordenados), 200
+    # Línea de tiempo ordenada en la base de datos (UNION ALL). Sin ?limite= ni
+    # ?cursor= se mantiene la respuesta de siempre: todas las filas y fechas
+    # en el formato de jsonify (RFC 1123). Paginada: fechas ISO, como los
+    # demás listados, y la página siguiente en X-Siguiente-Cursor.
+    paginar = 'limite' in request.args or 'cursor' in request.args
+    filas, siguiente_cursor = linea_de_tiempo(usuario_id, request.args, paginar=paginar)
+
+    reportes = filas_a_dicts(filas)
+    if not paginar:
+        for reporte in reportes:
+            reporte['fecha'] = http_date(reporte['fecha'].timetuple())
+    respuesta = respuesta_json(reportes)
+    if siguiente_cursor:
+        respuesta.headers['X-Siguiente-Cursor'] = siguiente_cursor
+    return respuesta, 200
+
+
+#-----------------------------------------------
+# Gasto por categoría entre ?desde= y ?hasta= (por defecto, el mes en curso)
+@usuarios_bp.route('/por_categoria', methods=['GET'])
+@token_required
+@respuesta_en_cache
+@lectura_en_replica
+def obtener_gastos_por_categoria(payload):
+    usuario_id = payload.get('id')
+
+    if not usuario_id:
+        return jsonify({"error": "Usuario no autenticado"}), 401
+
+    hoy = date.today()
+    desde = leer_fecha(request.args, 'desde') or hoy.replace(day=1)
+    hasta = leer_fecha(request.args, 'hasta') or hoy
+    if desde > hasta:
+        return jsonify({"error": "'desde' no puede ser posterior a 'hasta'"}), 400
+
+    categorias = gastos_por_categoria(usuario_id, desde, hasta)
+    return respuesta_json({
+        'desde': desde,
+        'hasta': hasta,
+        'total': sum(c['total'] for c in categorias),
+        'categorias': categorias
+    }), 200
+
+
+#-----------------------------------------------
+# Exportación completa del historial en NDJSON (por defecto) o CSV, en streaming
+@usuarios_bp.route('/exportar', methods=['GET'])
+@token_required
+def exportar_historial(payload):
+    usuario_id = payload.get('id')
+
+    if not usuario_id:
+        return jsonify({"error": "Usuario no autenticado"}), 401
+
+    formato = request.args.get('formato', 'ndjson').lower()
+    if formato not in ('ndjson', 'csv'):
+        return jsonify({"error": "Formato no soportado. Usa 'ndjson' o 'csv'."}), 400
+
+    def generar_ndjson():
+        for registro in exportar_movimientos(usuario_id):
+            yield dumps(registro) + b"\n"
+
+    def generar_csv():
+        # Cada línea se escribe y se envía por separado; nada se acumula en memoria
+        buffer = io.StringIO()
+        escritor = csv.DictWriter(buffer, fieldnames=COLUMNAS_EXPORTACION)
+        escritor.writeheader()
+        for registro in exportar_movimientos(usuario_id):
+            escritor.writerow(registro)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+        yield buffer.getvalue()
+
+    if formato == 'csv':
+        generador, mimetype = generar_csv(), 'text/csv'
+    else:
+        generador, mimetype = generar_ndjson(), 'application/x-ndjson'
+
+    respuesta = Response(stream_with_context(generador), mimetype=mimetype)
+    respuesta.headers['Content-Disposition'] = f'attachment; filename=movimientos.{formato}'
+    return respuesta
 
 
 #---------------------------------------------------
-@usuarios_bp.route('/datosmensuales', methods=['POST'])
+# Diccionario para convertir nombres de meses a números
+MESES_A_NUMEROS = {
+    "Enero": 1, "Febrero": 2, "Marzo": 3, "Abril": 4,
+    "Mayo": 5, "Junio": 6, "Julio": 7, "Agosto": 8,
+    "Septiembre": 9, "Octubre": 10, "Noviembre": 11, "Diciembre": 12
+}
+
+def _interpretar_mes(mes, anio_por_defecto):
+    # Acepta "Marzo" (año por defecto), "2024-03" o {"mes": "Marzo"|3, "anio": 2024}
+    if isinstance(mes, dict):
+        anio = mes.get("anio", anio_por_defecto)
+        numero = mes.get("mes")
+        if isinstance(numero, str):
+            numero = MESES_A_NUMEROS.get(numero.capitalize())
+    elif isinstance(mes, str) and "-" in mes:
+        try:
+            anio, numero = (int(parte) for parte in mes.split("-", 1))
+        except ValueError:
+            return None
+    elif isinstance(mes, str):
+        anio, numero = anio_por_defecto, MESES_A_NUMEROS.get(mes.capitalize())
+    else:
+        return None
+
+    try:
+        anio, numero = int(anio), int(numero)
+    except (TypeError, ValueError):
+        return None
+    if not 1 <= numero <= 12:
+        return None
+    return anio, numero
+
+
+@usuarios_bp.route('/datosmensuales', methods=['POST'])  # POST por el cuerpo, pero sólo lee
 @token_required
+@lectura_en_replica
 def obtener_datos_mensuales(payload):
      # El 'id' del usuario ya está disponible a través de 'payload'
     usuario_id = payload.get('id')  # Acceder al 'id' del usuario
@@ -187,46 +297,34 @@ def obtener_datos_mensuales(payload):
     try:
         data = request.get_json()  # Los datos ahora se esperan en el cuerpo de la solicitud
         meses = data.get("meses", [])
-        
+        anio_por_defecto = data.get("anio", datetime.now().year)
 
         if not meses or not isinstance(meses, list):
              return jsonify({"error": "Por favor, envía un arreglo válido de meses."}), 400
-        
-        # Diccionario para convertir nombres de meses a números
-        meses_a_numeros = {
-            "Enero": 1, "Febrero": 2, "Marzo": 3, "Abril": 4,
-            "Mayo": 5, "Junio": 6, "Julio": 7, "Agosto": 8,
-            "Septiembre": 9, "Octubre": 10, "Noviembre": 11, "Diciembre": 12
-        }
-
-        # Preparar respuesta
-        resultado = []
 
+        periodos = []
         for mes in meses:
-             mes_numero = meses_a_numeros.get(mes.capitalize())
-             if mes_numero is None:
-                 return jsonify({"error": f"El mes '{mes}' no es válido."}), 400
-
-            # Filtrar ingresos y egresos por usuario, mes y año actual
-             ingresos_mes = db.session.query(db.func.sum(Ingreso.monto)).filter(
-                 db.extract('month', Ingreso.fecha) == mes_numero,
-                 db.extract('year', Ingreso.fecha) == datetime.now().year,
-                 Ingreso.usuario_id == usuario_id
-             ).scalar() or 0
-
-             egresos_mes = db.session.query(db.func.sum(Egreso.monto)).filter(
-                 db.extract('month', Egreso.fecha) == mes_numero,
-                 db.extract('year', Egreso.fecha) == datetime.now().year,
-                 Egreso.usuario_id == usuario_id
-             ).scalar() or 0
-
-            # Añadir al resultado
-             resultado.append({
-                 "mes": mes,
-                 "ingresos": ingresos_mes,
-                 "egresos": egresos_mes
-             })
+            periodo = _interpretar_mes(mes, anio_por_defecto)
+            if periodo is None:
+                return jsonify({"error": f"El mes '{mes}' no es válido."}), 400
+            periodos.append(periodo)
+
+        # Una sola lectura indexada del resumen mensual, sólo de los pares (año, mes) pedidos
+        resumenes = ResumenMensual.query.filter(
+            ResumenMensual.usuario_id == usuario_id,
+            tuple_(ResumenMensual.anio, ResumenMensual.mes).in_(set(periodos))
+        ).all()
+        por_periodo = {(r.anio, r.mes): r for r in resumenes}
+
+        # Preparar respuesta en el mismo orden en que se pidieron los meses
+        resultado = []
+        for mes, periodo in zip(meses, periodos):
+            resumen = por_periodo.get(periodo)
+            resultado.append({
+                "mes": mes,
+                "ingresos": resumen.ingresos if resumen else 0,
+                "egresos": resumen.egresos if resumen else 0
+            })
         return jsonify(resultado), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-
@@ -2,18 +2,29 @@
 
 import jwt
 from functools import wraps
-from flask import request, jsonify, current_app
+from flask import request, jsonify, current_app, g
+from api.models import Usuario
+
+def token_required(f=None, bloquear_usuario=False, token_en_query=False):
+    # Se usa como @token_required o como @token_required(bloquear_usuario=True)
+    # cuando el handler va a modificar el capital_actual del usuario.
+    # token_en_query=True acepta además ?token= (EventSource no permite
+    # encabezados); usarlo sólo en rutas que lo necesiten, como /eventos
+    if f is None:
+        return lambda funcion: token_required(funcion, bloquear_usuario=bloquear_usuario,
+                                              token_en_query=token_en_query)
 
-def token_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         token = None
         # Verificar si el token está en los encabezados de la solicitud
         if 'Authorization' in request.headers:
             token = request.headers['Authorization'].split(" ")[1]  # 'Bearer token'
+        elif token_en_query:
+            token = request.args.get('token')
         if not token:
             return jsonify({'msg': 'Token no proporcionado'}), 401
-        
+
         try:
             # Decodificar el token usando el SECRET_KEY
             SECRET_KEY = current_app.config['SECRET_KEY']
@@ -22,8 +33,43 @@ def token_required(f):
             return jsonify({'msg': 'El token ha expirado'}), 401
         except jwt.InvalidTokenError:
             return jsonify({'msg': 'Token inválido'}), 401
-        
+
+        # Guardamos el payload para que usuario_actual() lo cargue bajo demanda.
+        # En Flask 1.x `g` es del contexto de aplicación, que varias peticiones
+        # pueden compartir (tests, CLI): se olvida el usuario de la anterior
+        g.token_payload = payload
+        g.pop('usuario_actual', None)
+        g.pop('usuario_bloqueado', None)
+        g.bloquear_usuario = bloquear_usuario
+
         # Si el token es válido, pasamos al siguiente handler
         return f(payload, *args, **kwargs)
 
     return decorated_function
+
+
+def usuario_actual(bloquear=None):
+    """Usuario autenticado de la petición en curso.
+
+    Se consulta la primera vez que se pide y queda memorizado en `g` hasta
+    el final de la petición (@token_required lo olvida al empezar otra). Con bloquear=True (o si la ruta usa
+    @token_required(bloquear_usuario=True)) se carga con SELECT ... FOR UPDATE.
+    Devuelve None si no hay token o el usuario ya no existe.
+    """
+    payload = g.get('token_payload')
+    if not payload or not payload.get('id'):
+        return None
+
+    if bloquear is None:
+        bloquear = g.get('bloquear_usuario', False)
+
+    if 'usuario_actual' in g and (g.usuario_bloqueado or not bloquear):
+        return g.usuario_actual
+
+    consulta = Usuario.query.filter_by(id=payload['id'])
+    if bloquear:
+        # populate_existing refresca la instancia si ya estaba en la sesión
+        consulta = consulta.with_for_update().populate_existing()
+    g.usuario_actual = consulta.first()
+    g.usuario_bloqueado = bloquear
+    return g.usuario_actual
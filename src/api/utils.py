@@ -1,4 +1,7 @@
-from flask import jsonify, url_for
+import base64
+import json
+from datetime import date
+from flask import jsonify, url_for, current_app
 
 class APIException(Exception):
     status_code = 400
@@ -15,6 +18,38 @@ class APIException(Exception):
         rv['message'] = self.message
         return rv
 
+def codificar_cursor(*valores):
+    # Cursor opaco para paginación keyset: base64 de la lista de valores de la última fila
+    valores = [v.isoformat() if isinstance(v, date) else v for v in valores]
+    return base64.urlsafe_b64encode(json.dumps(valores).encode('utf-8')).decode('ascii')
+
+def decodificar_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except (ValueError, UnicodeError):
+        raise APIException('Cursor inválido', status_code=400)
+
+def leer_limite(args):
+    # Tamaño de página pedido en ?limite=, acotado por la configuración de la app
+    por_defecto = current_app.config.get('TAMANO_PAGINA', 50)
+    maximo = current_app.config.get('TAMANO_PAGINA_MAX', 500)
+    try:
+        limite = int(args.get('limite', por_defecto))
+    except ValueError:
+        raise APIException('El límite debe ser un número entero', status_code=400)
+    if limite < 1:
+        raise APIException('El límite debe ser mayor que cero', status_code=400)
+    return min(limite, maximo)
+
+def leer_fecha(args, nombre):
+    valor = args.get(nombre)
+    if not valor:
+        return None
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise APIException(f"Formato de fecha inválido en '{nombre}'. Debe ser YYYY-MM-DD.", status_code=400)
+
 def has_no_empty_params(rule):
     defaults = rule.defaults if rule.defaults is not None else ()
     arguments = rule.arguments if rule.arguments is not None else ()
@@ -7,6 +7,13 @@ from api.utils import APIException, generate_sitemap
 from api.models import db
 from api.routes import init_app, api_bp  # Importar api_bp aquí
 from api.commands import setup_commands
+from api.instrumentacion import init_instrumentacion
+from api.eventos import init_eventos
+from api.cache_respuestas import init_cache_respuestas
+from api.replica import init_replica
+from api.json_rapido import init_json
+from api.pool_conexiones import init_pool
+from api.config import configurar
 from flask_cors import CORS
 
 ENV = "development" if os.getenv("FLASK_DEBUG") == "1" else "production"
@@ -19,18 +26,18 @@ app = Flask(__name__)
 app.url_map.strict_slashes = False
 print(os.getenv('FLASK_APP'))
 
-# Database configuration
-db_url = os.getenv("DATABASE_URL")
-if db_url is not None:
-    app.config['SQLALCHEMY_DATABASE_URI'] = db_url.replace(
-        "postgres://", "postgresql://")
-
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = os.getenv("FLASK_APP_KEY")  # Esto también funcionará para JWT
+# Configuración desde el entorno, la misma que usa create_app()
+configurar(app)
 
 MIGRATE = Migrate(app, db)
 db.init_app(app)
-CORS(app)
+init_instrumentacion(app)
+init_eventos(app)
+init_cache_respuestas(app)
+init_replica(app)
+init_json(app)
+init_pool(app)
+CORS(app, expose_headers=['X-Siguiente-Cursor', 'Server-Timing', 'ETag'])
 
 # Add the admin
 setup_commands(app)
@@ -0,0 +1,57 @@
+# tests/conftest.py
+import os
+import pytest
+from api import create_app
+from api.models import db, Usuario
+from api.cache_categorias import invalidar_categorias
+from api.datos_prueba import CONTRASENA_PRUEBA, asegurar_categorias
+
+# Configuración común: cada test usa su propia base SQLite en un archivo
+# (los hilos y las peticiones comparten así la misma base). Con
+# TEST_DATABASE_URL se usa esa base en su lugar (p. ej. un PostgreSQL vacío:
+# las tablas se crean y se borran en cada test)
+CONFIGURACION = {
+    'TESTING': True,
+    'SECRET_KEY': 'clave-de-pruebas-' + 'x' * 32,
+    'CACHE_RESPUESTAS_BACKEND': 'ninguno',
+}
+
+
+@pytest.fixture
+def configuracion(tmp_path):
+    """Configuración de la app; los tests pueden modificarla antes de pedir `app`."""
+    uri = os.getenv('TEST_DATABASE_URL') or f"sqlite:///{tmp_path / 'pruebas.db'}"
+    return dict(CONFIGURACION, SQLALCHEMY_DATABASE_URI=uri)
+
+
+@pytest.fixture
+def app(configuracion):
+    invalidar_categorias()
+    app = create_app(configuracion)
+    with app.app_context():
+        db.create_all()
+        asegurar_categorias()
+        yield app
+        db.session.remove()
+        db.drop_all()
+    invalidar_categorias()
+
+
+@pytest.fixture
+def cliente(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def crear_usuario(app, cliente):
+    """Crea un usuario con `capital` y devuelve (id, encabezados con su token)."""
+    def crear(nombre='prueba', capital=0.0):
+        usuario = Usuario(nombre_usuario=nombre, correo=f'{nombre}@ejemplo.com',
+                          capital_inicial=capital, capital_actual=capital, moneda='EUR')
+        usuario.establecer_contrasena(CONTRASENA_PRUEBA)
+        db.session.add(usuario)
+        db.session.commit()
+        respuesta = cliente.post('/usuarios/login', json={'correo': usuario.correo, 'contrasena': CONTRASENA_PRUEBA})
+        assert respuesta.status_code == 200
+        return usuario.id, {'Authorization': f"Bearer {respuesta.get_json()['token']}"}
+    return crear
@@ -0,0 +1,95 @@
+# tests/test_alertas.py
+from datetime import datetime
+import pytest
+from werkzeug.http import http_date
+from api.models import db, Alerta
+from api.utils import codificar_cursor
+
+
+@pytest.fixture
+def configuracion(configuracion):
+    # Página por defecto menor que el feed: la respuesta sin paginar no se trunca
+    return dict(configuracion, TAMANO_PAGINA=3)
+
+
+def _alertas(usuario_id):
+    # Varias alertas con el mismo creada_en (el desempate es el id); las pares, leídas
+    for n, (dia, hora) in enumerate(((1, 9), (1, 9), (2, 8), (2, 8), (2, 8), (3, 7), (4, 6))):
+        db.session.add(Alerta(usuario_id=usuario_id, mensaje=f'alerta {n}', leida=n % 2 == 0,
+                              creada_en=datetime(2024, 5, dia, hora, 30, 15, 250000)))
+    db.session.commit()
+
+
+def _recorrer(cliente, encabezados, url):
+    filas, separador = [], '&' if '?' in url else '?'
+    siguiente = url
+    while siguiente:
+        respuesta = cliente.get(siguiente, headers=encabezados)
+        assert respuesta.status_code == 200
+        filas.extend(respuesta.get_json())
+        cursor = respuesta.headers.get('X-Siguiente-Cursor')
+        siguiente = f'{url}{separador}cursor={cursor}' if cursor else None
+    return filas
+
+
+def test_feed_sin_paginar_mantiene_la_respuesta_de_siempre(cliente, crear_usuario):
+    usuario_id, encabezados = crear_usuario()
+    otro_id, _ = crear_usuario('otro')
+    _alertas(usuario_id)
+    _alertas(otro_id)
+
+    respuesta = cliente.get('/alertas/alertas', headers=encabezados)
+    assert respuesta.status_code == 200
+    assert 'X-Siguiente-Cursor' not in respuesta.headers
+    alertas = respuesta.get_json()
+    # Todas las del usuario, aunque superen TAMANO_PAGINA
+    assert len(alertas) == 7
+    assert {a['usuario_id'] for a in alertas} == {usuario_id}
+    assert alertas[0]['creada_en'] == http_date(datetime(2024, 5, 4, 6, 30, 15).timetuple())
+    assert alertas[0]['creada_en'] == 'Sat, 04 May 2024 06:30:15 GMT'
+    assert [a['mensaje'] for a in alertas] == [f'alerta {n}' for n in (6, 5, 4, 3, 2, 1, 0)]
+
+    no_leidas = cliente.get('/alertas/alertas?no_leidas=1', headers=encabezados).get_json()
+    assert [a['mensaje'] for a in no_leidas] == ['alerta 5', 'alerta 3', 'alerta 1']
+
+
+@pytest.mark.parametrize('filtro, mensajes', [
+    ('', [f'alerta {n}' for n in (6, 5, 4, 3, 2, 1, 0)]),
+    ('no_leidas=1&', ['alerta 5', 'alerta 3', 'alerta 1']),
+    ('no_leidas=true&', ['alerta 5', 'alerta 3', 'alerta 1']),
+])
+def test_feed_paginado_recorre_los_empates(cliente, crear_usuario, filtro, mensajes):
+    usuario_id, encabezados = crear_usuario()
+    otro_id, _ = crear_usuario('otro')
+    _alertas(usuario_id)
+    _alertas(otro_id)
+
+    # Páginas de 2: cortan dentro de los creada_en repetidos
+    alertas = _recorrer(cliente, encabezados, f'/alertas/alertas?{filtro}limite=2')
+    assert [a['mensaje'] for a in alertas] == mensajes
+    assert {a['usuario_id'] for a in alertas} == {usuario_id}
+    if filtro:
+        assert not any(a['leida'] for a in alertas)
+    # Paginado, las fechas van en ISO
+    assert alertas[-1]['creada_en'] == '2024-05-01T09:30:15.250000'
+
+    # Sin ?limite= la primera página usa TAMANO_PAGINA
+    respuesta = cliente.get(f"/alertas/alertas?{filtro}cursor={codificar_cursor('2024-06-01T00:00:00', 0)}",
+                            headers=encabezados)
+    assert [a['mensaje'] for a in respuesta.get_json()] == mensajes[:3]
+    assert ('X-Siguiente-Cursor' in respuesta.headers) == (len(mensajes) > 3)
+
+    contador = cliente.get('/alertas/no_leidas', headers=encabezados).get_json()
+    assert contador['no_leidas'] == 3
+
+
+@pytest.mark.parametrize('parametros', [
+    'cursor=no-es-base64!',
+    f"cursor={codificar_cursor('2024-05-01T09:30:15')}",  # falta el id
+    f"cursor={codificar_cursor('ayer', 3)}",
+    'limite=0',
+    'limite=muchas',
+])
+def test_feed_parametros_invalidos_responden_400(cliente, crear_usuario, parametros):
+    _, encabezados = crear_usuario()
+    assert cliente.get(f'/alertas/alertas?{parametros}', headers=encabezados).status_code == 400
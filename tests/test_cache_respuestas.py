@@ -0,0 +1,40 @@
+# tests/test_cache_respuestas.py
+import pytest
+from api import create_app
+from api.cache_categorias import id_categoria
+from conftest import CONFIGURACION
+
+
+@pytest.fixture
+def configuracion(configuracion):
+    # LRU del proceso: el test corre en un solo proceso
+    return dict(configuracion, CACHE_RESPUESTAS_BACKEND='memoria')
+
+
+def test_sin_redis_la_cache_esta_desactivada(tmp_path):
+    # 'memoria' no invalida entre workers: nunca se elige sola
+    base = dict(CONFIGURACION, SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'pruebas.db'}")
+    app = create_app(dict(base, CACHE_RESPUESTAS_BACKEND=None, CACHE_RESPUESTAS_REDIS_URL=None))
+    assert app.extensions['cache_respuestas'] is None
+
+
+def test_etag_se_invalida_al_escribir(cliente, crear_usuario):
+    usuario_id, encabezados = crear_usuario(capital=100.0)
+
+    primera = cliente.get('/usuarios/totales', headers=encabezados)
+    assert primera.status_code == 200
+    etag = primera.headers['ETag']
+
+    validada = cliente.get('/usuarios/totales', headers=dict(encabezados, **{'If-None-Match': etag}))
+    assert validada.status_code == 304
+
+    respuesta = cliente.post('/ingresos/ingreso', headers=encabezados, json={
+        'monto': 25.0, 'descripcion': 'sueldo', 'fecha': '2024-05-10',
+        'usuario_id': usuario_id, 'categoria_id': id_categoria('Gastos Varios'),
+    })
+    assert respuesta.status_code == 201
+
+    nueva = cliente.get('/usuarios/totales', headers=dict(encabezados, **{'If-None-Match': etag}))
+    assert nueva.status_code == 200
+    assert nueva.headers['ETag'] != etag
+    assert nueva.get_json()['capital_actual'] == 125.0
@@ -0,0 +1,97 @@
+# tests/test_cancelar_plan.py
+import pytest
+from api.models import db, Usuario, Egreso, EgresoArchivado, Categoria, PlanAhorro, ResumenMensual
+from api.cache_categorias import id_categoria
+
+
+def _resumen(usuario_id):
+    return {(r.anio, r.mes): r.egresos for r in ResumenMensual.query.filter_by(usuario_id=usuario_id)}
+
+
+def _plan(cliente, encabezados, usuario_id):
+    # Depósito inicial (abril), dos depósitos (abril y mayo) y un egreso de
+    # una categoría propia enlazado al plan (mayo); además un egreso suelto
+    categoria_id = cliente.post('/categorias/categoria', headers=encabezados,
+                                json={'nombre': 'Viajes', 'icono': '✈'}).get_json()['id']
+    plan_id = cliente.post('/plandeahorro/agregarplan', headers=encabezados, json={
+        'nombre_plan': 'Viaje', 'monto_objetivo': 500, 'monto_inicial': 50,
+        'fecha_inicio': '2024-04-01', 'fecha_objetivo': '2024-10-31',
+    }).get_json()['nuevo_plan']['id']
+    for monto, fecha in ((25, '2024-04-20'), (40, '2024-05-03')):
+        assert cliente.post('/plandeahorro/depositar', headers=encabezados, json={
+            'plan_id': plan_id, 'monto_ahorro': monto, 'fecha': fecha}).status_code == 201
+    movimiento = {'descripcion': 'x', 'usuario_id': usuario_id}
+    assert cliente.post('/egresos/agrega_egreso', headers=encabezados, json=dict(
+        movimiento, monto=30, fecha='2024-05-05', categoria_id=categoria_id)).status_code == 201
+    assert cliente.post('/egresos/agrega_egreso', headers=encabezados, json=dict(
+        movimiento, monto=12, fecha='2024-05-06', categoria_id=id_categoria('Gastos Varios'))).status_code == 201
+    Egreso.query.filter_by(usuario_id=usuario_id, categoria_id=categoria_id).update({'plan_ahorro_id': plan_id})
+    db.session.commit()
+    return plan_id, categoria_id
+
+
+def _eliminar(cliente, encabezados, plan_id, archivar):
+    return cliente.delete('/plandeahorro/eliminar_plan_ahorro', headers=encabezados,
+                          json={'plan_ahorro_id': plan_id, 'archivar': archivar})
+
+
+@pytest.mark.parametrize('archivar', [False, True])
+def test_cancelar_plan(cliente, crear_usuario, archivar):
+    usuario_id, encabezados = crear_usuario(capital=1000.0)
+    plan_id, categoria_id = _plan(cliente, encabezados, usuario_id)
+    db.session.expire_all()
+    assert _resumen(usuario_id) == {(2024, 4): 75.0, (2024, 5): 82.0}
+    assert Categoria.query.get(categoria_id).usos_egresos == 1
+    acumulado = PlanAhorro.query.get(plan_id).monto_acumulado
+    capital = Usuario.query.get(usuario_id).capital_actual
+
+    respuesta = _eliminar(cliente, encabezados, plan_id, archivar)
+    assert respuesta.status_code == 200
+    cuerpo = respuesta.get_json()
+    assert cuerpo['ingreso_generado'] == 145.0
+    assert cuerpo['archivado'] is archivar
+
+    db.session.expire_all()
+    assert PlanAhorro.query.get(plan_id) is None
+    assert Egreso.query.filter_by(plan_ahorro_id=plan_id).count() == 0
+    # Sólo queda el egreso suelto en los resúmenes y lo acumulado vuelve al capital
+    assert Egreso.query.filter_by(usuario_id=usuario_id).count() == 1
+    assert _resumen(usuario_id) == {(2024, 4): 0.0, (2024, 5): 12.0}
+    assert Usuario.query.get(usuario_id).capital_actual == capital + acumulado
+
+    archivados = EgresoArchivado.query.filter_by(plan_ahorro_id=plan_id).order_by(EgresoArchivado.fecha).all()
+    if archivar:
+        assert [(e.monto, e.nombre_plan) for e in archivados] == [
+            (50.0, 'Viaje'), (25.0, 'Viaje'), (40.0, 'Viaje'), (30.0, 'Viaje')]
+        assert all(e.usuario_id == usuario_id for e in archivados)
+        # El archivado sigue usando su categoría
+        assert Categoria.query.get(categoria_id).usos_egresos == 1
+    else:
+        assert archivados == []
+        assert Categoria.query.get(categoria_id).usos_egresos == 0
+
+
+def test_no_se_cancela_el_plan_de_otro_usuario(cliente, crear_usuario):
+    usuario_id, encabezados = crear_usuario(capital=1000.0)
+    _, encabezados_otro = crear_usuario('otro')
+    plan_id, categoria_id = _plan(cliente, encabezados, usuario_id)
+    db.session.expire_all()
+    capital = Usuario.query.get(usuario_id).capital_actual
+
+    for archivar in (False, True):
+        assert _eliminar(cliente, encabezados_otro, plan_id, archivar).status_code == 404
+
+    db.session.expire_all()
+    assert PlanAhorro.query.get(plan_id) is not None
+    assert Egreso.query.filter_by(plan_ahorro_id=plan_id).count() == 4
+    assert EgresoArchivado.query.count() == 0
+    assert _resumen(usuario_id) == {(2024, 4): 75.0, (2024, 5): 82.0}
+    assert Categoria.query.get(categoria_id).usos_egresos == 1
+    assert Usuario.query.get(usuario_id).capital_actual == capital
+
+
+def test_plan_inexistente_o_sin_id(cliente, crear_usuario):
+    _, encabezados = crear_usuario()
+    assert _eliminar(cliente, encabezados, 999, False).status_code == 404
+    respuesta = cliente.delete('/plandeahorro/eliminar_plan_ahorro', headers=encabezados, json={})
+    assert respuesta.status_code == 400
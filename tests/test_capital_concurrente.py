@@ -0,0 +1,46 @@
+# tests/test_capital_concurrente.py
+import threading
+from api.models import db, Usuario
+from api.cache_categorias import id_categoria
+
+HILOS = 8
+PETICIONES_POR_HILO = 10
+
+
+def test_capital_exacto_con_ingresos_y_egresos_concurrentes(app, crear_usuario):
+    # Cada hilo usa su propia conexión a la base del test. En SQLite el
+    # bloqueo de escritura serializa las transacciones desde su primera
+    # escritura, así que sólo se detectan lecturas del capital anteriores a
+    # ella; con TEST_DATABASE_URL apuntando a PostgreSQL la prueba es completa
+    usuario_id, encabezados = crear_usuario(capital=1000.0)
+    categoria = id_categoria('Gastos Varios')
+    errores = []
+
+    def registrar(hilo):
+        cliente = app.test_client()
+        for n in range(PETICIONES_POR_HILO):
+            # Montos exactos en binario: el capital final se compara sin tolerancia
+            if (hilo + n) % 2:
+                url, monto = '/ingresos/ingreso', 12.5
+            else:
+                url, monto = '/egresos/agrega_egreso', 4.25
+            respuesta = cliente.post(url, headers=encabezados, json={
+                'monto': monto, 'descripcion': f'hilo {hilo} #{n}', 'fecha': '2024-05-10',
+                'usuario_id': usuario_id, 'categoria_id': categoria,
+            })
+            if respuesta.status_code != 201:
+                errores.append((url, respuesta.status_code, respuesta.get_data(as_text=True)))
+
+    hilos = [threading.Thread(target=registrar, args=(h,)) for h in range(HILOS)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert errores == []
+    total = HILOS * PETICIONES_POR_HILO
+    ingresos = sum(1 for h in range(HILOS) for n in range(PETICIONES_POR_HILO) if (h + n) % 2)
+    esperado = 1000.0 + ingresos * 12.5 - (total - ingresos) * 4.25
+
+    db.session.remove()
+    assert Usuario.query.get(usuario_id).capital_actual == esperado
@@ -0,0 +1,76 @@
+# tests/test_categorias.py
+from api.models import db, Categoria, Egreso, PlanAhorro
+from api.cache_categorias import id_categoria
+from api.movimientos import reconstruir_usos_categorias
+
+
+def _plan_con_egreso(cliente, encabezados, usuario_id, categoria_id):
+    # Plan con un egreso propio de la categoría enlazado (además del depósito inicial)
+    respuesta = cliente.post('/plandeahorro/agregarplan', headers=encabezados, json={
+        'nombre_plan': 'Viaje', 'monto_objetivo': 500, 'monto_inicial': 50,
+        'fecha_inicio': '2024-04-01', 'fecha_objetivo': '2024-10-31',
+    })
+    plan_id = respuesta.get_json()['nuevo_plan']['id']
+    respuesta = cliente.post('/egresos/agrega_egreso', headers=encabezados, json={
+        'monto': 30, 'descripcion': 'Billetes', 'fecha': '2024-04-05',
+        'usuario_id': usuario_id, 'categoria_id': categoria_id,
+    })
+    assert respuesta.status_code == 201
+    Egreso.query.filter_by(usuario_id=usuario_id, categoria_id=categoria_id).update({'plan_ahorro_id': plan_id})
+    PlanAhorro.query.filter_by(id=plan_id).update({'monto_acumulado': 80})
+    db.session.commit()
+    return plan_id
+
+
+def test_no_se_elimina_una_categoria_con_egresos_archivados(cliente, crear_usuario):
+    usuario_id, encabezados = crear_usuario(capital=1000.0)
+    categoria_id = cliente.post('/categorias/categoria', headers=encabezados,
+                                json={'nombre': 'Viajes', 'icono': '✈'}).get_json()['id']
+    plan_id = _plan_con_egreso(cliente, encabezados, usuario_id, categoria_id)
+
+    respuesta = cliente.delete('/plandeahorro/eliminar_plan_ahorro', headers=encabezados,
+                               json={'plan_ahorro_id': plan_id, 'archivar': True})
+    assert respuesta.status_code == 200
+    assert Egreso.query.filter_by(categoria_id=categoria_id).count() == 0
+    assert Categoria.query.get(categoria_id).usos_egresos == 1
+
+    respuesta = cliente.delete('/categorias/categoria', headers=encabezados, json={'id': categoria_id})
+    assert respuesta.status_code == 400
+    assert respuesta.get_json()['details']['egresos_relacionados'] == 1
+
+    # El recálculo llega al mismo valor
+    Categoria.query.filter_by(id=categoria_id).update({'usos_egresos': 0})
+    reconstruir_usos_categorias()
+    db.session.commit()
+    assert Categoria.query.get(categoria_id).usos_egresos == 1
+
+
+def test_sin_archivar_la_categoria_queda_libre(cliente, crear_usuario):
+    usuario_id, encabezados = crear_usuario(capital=1000.0)
+    categoria_id = cliente.post('/categorias/categoria', headers=encabezados,
+                                json={'nombre': 'Viajes', 'icono': '✈'}).get_json()['id']
+    plan_id = _plan_con_egreso(cliente, encabezados, usuario_id, categoria_id)
+
+    respuesta = cliente.delete('/plandeahorro/eliminar_plan_ahorro', headers=encabezados,
+                               json={'plan_ahorro_id': plan_id, 'archivar': False})
+    assert respuesta.status_code == 200
+    assert Categoria.query.get(categoria_id).usos_egresos == 0
+
+    respuesta = cliente.delete('/categorias/categoria', headers=encabezados, json={'id': categoria_id})
+    assert respuesta.status_code == 200
+
+
+def test_predeterminada_con_egresos_archivados(cliente, crear_usuario):
+    usuario_id, encabezados = crear_usuario(capital=1000.0)
+    respuesta = cliente.post('/plandeahorro/agregarplan', headers=encabezados, json={
+        'nombre_plan': 'Coche', 'monto_objetivo': 900, 'monto_inicial': 100,
+        'fecha_inicio': '2024-04-01', 'fecha_objetivo': '2024-12-31',
+    })
+    plan_id = respuesta.get_json()['nuevo_plan']['id']
+    cliente.delete('/plandeahorro/eliminar_plan_ahorro', headers=encabezados,
+                   json={'plan_ahorro_id': plan_id, 'archivar': True})
+
+    respuesta = cliente.delete('/categorias/categoria', headers=encabezados,
+                               json={'id': id_categoria('Plan de ahorro')})
+    assert respuesta.status_code == 400
+    assert respuesta.get_json()['details']['egresos_relacionados'] == 1
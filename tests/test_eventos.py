@@ -0,0 +1,58 @@
+# tests/test_eventos.py
+import json
+from datetime import date
+import pytest
+from api.models import db, Alerta
+from api.cache_categorias import id_categoria
+from api.eventos import BrokerLocal
+
+
+@pytest.fixture
+def configuracion(configuracion):
+    # Broker en memoria del proceso y latidos cortos para no esperar en el test
+    return dict(configuracion, EVENTOS_BACKEND='local', EVENTOS_LATIDO=1, EVENTOS_DURACION_MAX=5)
+
+
+def _eventos(respuesta):
+    # Cada fragmento del flujo es un mensaje SSE; se omiten latidos y 'retry'
+    for fragmento in respuesta.response:
+        texto = fragmento.decode() if isinstance(fragmento, bytes) else fragmento
+        if texto.startswith('event: '):
+            tipo, datos = texto.strip().split('\n')
+            yield tipo[len('event: '):], json.loads(datos[len('data: '):])
+
+
+def test_el_flujo_recibe_lo_publicado_en_el_broker(app, cliente, crear_usuario):
+    assert isinstance(app.extensions['eventos'], BrokerLocal)
+    usuario_id, encabezados = crear_usuario(capital=100.0)
+    token = encabezados['Authorization'].split(' ')[1]
+
+    respuesta = cliente.get(f'/eventos/flujo?token={token}', buffered=False)
+    assert respuesta.status_code == 200
+    assert respuesta.mimetype == 'text/event-stream'
+    eventos = _eventos(respuesta)
+    try:
+        # Estado inicial
+        assert next(eventos) == ('capital', {'capital_actual': 100.0})
+        assert next(eventos) == ('no_leidas', {'no_leidas': 0})
+
+        # Una escritura confirmada por la API llega al flujo
+        cliente.post('/ingresos/ingreso', headers=encabezados, json={
+            'monto': 25, 'descripcion': 'Venta', 'fecha': date.today().isoformat(),
+            'usuario_id': usuario_id, 'categoria_id': id_categoria('Ingreso Extraordinario'),
+        })
+        assert next(eventos) == ('capital', {'capital_actual': 125.0})
+
+        # Y también una alerta nueva
+        db.session.add(Alerta(usuario_id=usuario_id, mensaje='Presupuesto superado'))
+        db.session.commit()
+        tipo, datos = next(eventos)
+        assert tipo == 'alerta' and datos['mensaje'] == 'Presupuesto superado'
+
+        # Publicado directamente en el broker
+        app.extensions['eventos'].repartir(usuario_id, {'tipo': 'capital', 'datos': {'capital_actual': 1.0}})
+        assert next(eventos) == ('capital', {'capital_actual': 1.0})
+    finally:
+        respuesta.close()
+    # Al cerrar el flujo se cancela la suscripción
+    assert usuario_id not in app.extensions['eventos']._colas
@@ -0,0 +1,75 @@
+# tests/test_exportacion.py
+import csv
+import io
+import json
+from datetime import date
+import pytest
+from api.models import db, Ingreso, Egreso
+from api.cache_categorias import id_categoria
+from api.movimientos import COLUMNAS_EXPORTACION
+
+
+def _historial(cliente, usuario_id, encabezados):
+    varios, suscripciones = id_categoria('Gastos Varios'), id_categoria('Suscripciones')
+    for dia in (3, 1, 2):
+        db.session.add(Ingreso(usuario_id=usuario_id, categoria_id=varios, monto=100 + dia,
+                               descripcion=f'sueldo {dia}', fecha=date(2024, 4, dia)))
+    db.session.add(Egreso(usuario_id=usuario_id, categoria_id=varios, monto=20.5,
+                          descripcion='cena', fecha=date(2024, 4, 5)))
+    db.session.add(Egreso(usuario_id=usuario_id, categoria_id=suscripciones, monto=9.99,
+                          descripcion='musica', fecha=date(2024, 4, 6)))
+    db.session.commit()
+    # El depósito inicial del plan es un egreso con plan_ahorro_id
+    assert cliente.post('/plandeahorro/agregarplan', headers=encabezados, json={
+        'nombre_plan': 'viaje', 'monto_objetivo': 500, 'monto_inicial': 50,
+        'fecha_inicio': '2024-04-07', 'fecha_objetivo': '2025-01-01'}).status_code == 201
+
+
+def test_exportacion_ndjson(cliente, crear_usuario):
+    usuario_id, encabezados = crear_usuario(capital=1000.0)
+    otro_id, encabezados_otro = crear_usuario('otro')
+    _historial(cliente, usuario_id, encabezados)
+    _historial(cliente, otro_id, encabezados_otro)
+
+    respuesta = cliente.get('/usuarios/exportar', headers=encabezados)
+    assert respuesta.status_code == 200
+    assert respuesta.is_streamed
+    assert respuesta.mimetype == 'application/x-ndjson'
+    assert respuesta.headers['Content-Disposition'] == 'attachment; filename=movimientos.ndjson'
+
+    lineas = respuesta.get_data(as_text=True).splitlines()
+    assert len(lineas) == 6
+    registros = [json.loads(linea) for linea in lineas]
+    assert all(list(r) == COLUMNAS_EXPORTACION for r in registros)
+    # Ingresos primero, cada bloque ordenado por fecha
+    assert [r['tipo'] for r in registros] == ['ingreso'] * 3 + ['egreso', 'pago_suscripcion', 'deposito_plan']
+    assert [r['fecha'] for r in registros[:3]] == ['2024-04-01', '2024-04-02', '2024-04-03']
+    assert registros[5]['plan_ahorro_id'] is not None
+    assert registros[5]['monto'] == 50
+    assert registros[3]['plan_ahorro_id'] is None
+
+
+def test_exportacion_csv(cliente, crear_usuario):
+    usuario_id, encabezados = crear_usuario(capital=1000.0)
+    _historial(cliente, usuario_id, encabezados)
+
+    respuesta = cliente.get('/usuarios/exportar?formato=CSV', headers=encabezados)
+    assert respuesta.status_code == 200
+    assert respuesta.is_streamed
+    assert respuesta.mimetype == 'text/csv'
+    assert respuesta.headers['Content-Disposition'] == 'attachment; filename=movimientos.csv'
+
+    filas = list(csv.reader(io.StringIO(respuesta.get_data(as_text=True))))
+    assert filas[0] == COLUMNAS_EXPORTACION
+    assert len(filas) == 7
+    registros = [dict(zip(filas[0], fila)) for fila in filas[1:]]
+    assert [r['tipo'] for r in registros] == ['ingreso'] * 3 + ['egreso', 'pago_suscripcion', 'deposito_plan']
+    assert registros[0]['plan_ahorro_id'] == ''
+    assert registros[3]['monto'] == '20.5'
+
+
+@pytest.mark.parametrize('formato', ['xml', 'json', ''])
+def test_formato_no_soportado_responde_400(cliente, crear_usuario, formato):
+    _, encabezados = crear_usuario()
+    respuesta = cliente.get(f'/usuarios/exportar?formato={formato}', headers=encabezados)
+    assert respuesta.status_code == 400
@@ -0,0 +1,47 @@
+# tests/test_gastos_categorias.py
+from datetime import date, datetime
+from api.models import db, ResumenMensual
+from api.cache_categorias import id_categoria
+from api.gastos_categorias import _tramos
+
+
+def test_tramos_excluye_de_la_vista_los_meses_desactualizados():
+    # Refresco en mayo: enero y junio incompletos, marzo modificado después
+    meses, tramos = _tramos(date(2024, 1, 15), date(2024, 6, 10), date(2024, 5, 1), {date(2024, 3, 1)})
+    assert meses == [(date(2024, 2, 1), date(2024, 3, 1)), (date(2024, 4, 1), date(2024, 5, 1))]
+    assert tramos == [(date(2024, 1, 15), date(2024, 2, 1)), (date(2024, 3, 1), date(2024, 4, 1)),
+                      (date(2024, 5, 1), date(2024, 6, 11))]
+
+
+def test_tramos_une_meses_contiguos():
+    meses, tramos = _tramos(date(2024, 1, 1), date(2024, 4, 30), date(2024, 5, 1), {date(2024, 3, 1), date(2024, 4, 1)})
+    assert meses == [(date(2024, 1, 1), date(2024, 3, 1))]
+    assert tramos == [(date(2024, 3, 1), date(2024, 5, 1))]
+
+
+def test_tramos_sin_meses_anteriores_al_refresco():
+    assert _tramos(date(2024, 5, 3), date(2024, 5, 20), date(2024, 5, 1)) == \
+        ([], [(date(2024, 5, 3), date(2024, 5, 21))])
+
+
+def test_egreso_con_fecha_pasada_marca_su_mes_y_se_ve(cliente, crear_usuario):
+    usuario_id, encabezados = crear_usuario(capital=500.0)
+    categoria = id_categoria('Comida')
+    # Resumen de mayo contabilizado mucho antes de cualquier refresco
+    db.session.add(ResumenMensual(usuario_id=usuario_id, anio=2024, mes=5, ingresos=0.0, egresos=0.0,
+                                  modificado_en=datetime(2000, 1, 1)))
+    db.session.commit()
+
+    respuesta = cliente.post('/egresos/lote', headers=encabezados, json={'egresos': [
+        {'monto': 40.0, 'descripcion': 'importado', 'fecha': '2024-05-05', 'categoria_id': categoria},
+    ]})
+    assert respuesta.status_code == 201
+
+    db.session.expire_all()
+    resumen = db.session.query(ResumenMensual).get((usuario_id, 2024, 5))
+    assert resumen.egresos == 40.0
+    assert resumen.modificado_en.year > 2000
+
+    datos = cliente.get('/usuarios/por_categoria?desde=2024-05-01&hasta=2024-05-31', headers=encabezados).get_json()
+    assert datos['total'] == 40.0
+    assert [(c['categoria_id'], c['cantidad']) for c in datos['categorias']] == [(categoria, 1)]
@@ -0,0 +1,88 @@
+# tests/test_importaciones.py
+from datetime import datetime, timedelta, timezone
+from api.models import db, Egreso, Ingreso, Importacion
+from api.importaciones import procesar_siguiente, reclamar_importacion
+
+CSV = (
+    "fecha,concepto,importe\n"
+    "2024-05-01,Nómina,1500.00\n"
+    "2024-05-02,Supermercado,-80.50\n"
+    "2024-05-03,Farmacia,-12.00\n"
+)
+
+
+def test_la_importacion_queda_en_cola_y_la_procesa_el_worker(app, cliente, crear_usuario):
+    usuario_id, encabezados = crear_usuario()
+    respuesta = cliente.post('/importaciones/csv', data=CSV.encode(), headers=encabezados)
+    assert respuesta.status_code == 202
+    importacion_id = respuesta.get_json()['importacion']['id']
+    assert Importacion.query.get(importacion_id).estado == 'pendiente'
+
+    resultado = app.test_cli_runner().invoke(args=['procesar-importaciones', '--una-vez'])
+    assert resultado.exit_code == 0, resultado.output
+
+    importacion = cliente.get(f'/importaciones/{importacion_id}', headers=encabezados).get_json()
+    assert importacion['estado'] == 'completada'
+    assert importacion['insertadas'] == 3
+    assert Importacion.query.get(importacion_id).contenido is None
+    assert Ingreso.query.filter_by(usuario_id=usuario_id).count() == 1
+    assert Egreso.query.filter_by(usuario_id=usuario_id).count() == 2
+
+
+def test_una_importacion_no_se_reclama_dos_veces(app, crear_usuario):
+    usuario_id, _ = crear_usuario()
+    importacion = Importacion(usuario_id=usuario_id, estado='pendiente', contenido=CSV, procesadas=0,
+                              insertadas=0, duplicadas=0, intentos=0)
+    db.session.add(importacion)
+    db.session.commit()
+
+    assert reclamar_importacion() == importacion.id
+    assert reclamar_importacion() is None
+    assert reclamar_importacion(importacion.id) is None
+
+
+def test_se_retoma_la_importacion_de_un_worker_caido(app, crear_usuario):
+    usuario_id, _ = crear_usuario()
+    # Un worker procesó la primera fila y murió hace diez minutos
+    hace_rato = datetime.now(timezone.utc) - timedelta(minutes=10)
+    importacion = Importacion(usuario_id=usuario_id, estado='procesando', contenido=CSV, procesadas=1,
+                              insertadas=1, duplicadas=0, intentos=1, actualizada_en=hace_rato)
+    db.session.add(importacion)
+    db.session.commit()
+
+    assert procesar_siguiente(app) == importacion.id
+    importacion = Importacion.query.get(importacion.id)
+    assert importacion.estado == 'completada'
+    assert importacion.intentos == 2
+    assert importacion.procesadas == 3
+    assert importacion.insertadas == 3
+    # La fila ya procesada no se vuelve a insertar
+    assert Ingreso.query.filter_by(usuario_id=usuario_id).count() == 0
+    assert Egreso.query.filter_by(usuario_id=usuario_id).count() == 2
+
+
+def test_se_abandona_tras_agotar_los_intentos(app, crear_usuario):
+    usuario_id, _ = crear_usuario()
+    hace_rato = datetime.now(timezone.utc) - timedelta(minutes=10)
+    importacion = Importacion(usuario_id=usuario_id, estado='procesando', contenido=CSV, procesadas=0,
+                              insertadas=0, duplicadas=0, intentos=3, actualizada_en=hace_rato)
+    db.session.add(importacion)
+    db.session.commit()
+
+    assert procesar_siguiente(app) is None
+    importacion = Importacion.query.get(importacion.id)
+    assert importacion.estado == 'fallida'
+    assert importacion.contenido is None
+    assert importacion.to_dict()['errores'][-1]['linea'] is None
+
+
+def test_una_importacion_en_curso_no_se_retoma(app, crear_usuario):
+    usuario_id, _ = crear_usuario()
+    importacion = Importacion(usuario_id=usuario_id, estado='procesando', contenido=CSV, procesadas=0,
+                              insertadas=0, duplicadas=0, intentos=1,
+                              actualizada_en=datetime.now(timezone.utc))
+    db.session.add(importacion)
+    db.session.commit()
+
+    assert procesar_siguiente(app) is None
+    assert Importacion.query.get(importacion.id).estado == 'procesando'
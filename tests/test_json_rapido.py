@@ -0,0 +1,28 @@
+# tests/test_json_rapido.py
+import json
+from datetime import date, datetime
+import pytest
+from flask import jsonify
+from api.json_rapido import DefaultJSONProvider, CodificadorJSON
+
+pytestmark = pytest.mark.skipif(DefaultJSONProvider is not None, reason='app.json_encoder sólo existe en Flask 1.x')
+
+
+def test_jsonify_con_orjson_equivale_al_estandar(app):
+    from flask.json import JSONEncoder
+    assert app.json_encoder is CodificadorJSON
+    datos = {
+        'zeta': 1, 'alfa': [1.5, None, True], 'fecha': date(2024, 5, 3),
+        'instante': datetime(2024, 5, 3, 10, 30), 'descripción': 'café',
+    }
+    cuerpo = jsonify(datos).get_data(as_text=True)
+
+    assert json.loads(cuerpo) == json.loads(json.dumps(datos, cls=JSONEncoder, sort_keys=True))
+    assert list(json.loads(cuerpo)) == ['alfa', 'descripción', 'fecha', 'instante', 'zeta']
+    assert json.loads(cuerpo)['fecha'] == 'Fri, 03 May 2024 00:00:00 GMT'
+
+
+def test_jsonify_con_indentacion_usa_el_estandar(app):
+    app.config['JSONIFY_PRETTYPRINT_REGULAR'] = True
+    cuerpo = jsonify({'b': 1, 'a': 2}).get_data(as_text=True)
+    assert cuerpo == json.dumps({'a': 2, 'b': 1}, indent=2, separators=(', ', ': ')) + '\n'
@@ -0,0 +1,103 @@
+# tests/test_lotes.py
+import pytest
+from sqlalchemy import event
+from api.models import db, Usuario, Ingreso, Egreso, Categoria, ResumenMensual
+from api.cache_categorias import id_categoria
+
+LOTES = [('ingreso', Ingreso, '/ingresos/lote', 'ingresos'), ('egreso', Egreso, '/egresos/lote', 'egresos')]
+
+
+@pytest.fixture
+def configuracion(configuracion):
+    return dict(configuracion, TAMANO_LOTE_MAX=5)
+
+
+@pytest.fixture
+def sentencias(app):
+    # Sentencias SQL ejecutadas mientras el test corre
+    ejecutadas = []
+
+    def registrar(conn, cursor, sentencia, parametros, contexto, executemany):
+        ejecutadas.append(sentencia)
+    event.listen(db.engine, 'before_cursor_execute', registrar)
+    yield ejecutadas
+    event.remove(db.engine, 'before_cursor_execute', registrar)
+
+
+def _resumen(usuario_id):
+    return {(r.anio, r.mes): (r.ingresos, r.egresos) for r in ResumenMensual.query.filter_by(usuario_id=usuario_id)}
+
+
+@pytest.mark.parametrize('tipo, modelo, url, clave', LOTES)
+def test_lote_con_filas_validas_e_invalidas(cliente, crear_usuario, sentencias, tipo, modelo, url, clave):
+    usuario_id, encabezados = crear_usuario(capital=1000.0)
+    _, encabezados_otro = crear_usuario('otro')
+    propia = cliente.post('/categorias/categoria', headers=encabezados,
+                          json={'nombre': 'Viajes', 'icono': '✈'}).get_json()['id']
+    ajena = cliente.post('/categorias/categoria', headers=encabezados_otro,
+                         json={'nombre': 'Ajena', 'icono': '☂'}).get_json()['id']
+    varios = id_categoria('Gastos Varios')
+
+    fila = {'descripcion': 'x', 'categoria_id': varios}
+    filas = [
+        dict(fila, monto=100, fecha='2024-01-10'),
+        dict(fila, monto=-5, fecha='2024-01-11'),                   # 1: monto no positivo
+        dict(fila, monto=20.5, fecha='2024-02-01', categoria_id=propia),
+        dict(fila, monto=10, fecha='2024-02-30'),                   # 3: fecha inválida
+        dict(fila, monto=7, fecha='2024-02-02', categoria_id=ajena),  # 4: categoría de otro usuario
+    ]
+    del sentencias[:]
+    respuesta = cliente.post(url, headers=encabezados, json={clave: filas})
+    assert respuesta.status_code == 201
+    cuerpo = respuesta.get_json()
+    assert cuerpo['insertados'] == 2
+    assert [e['indice'] for e in cuerpo['errores']] == [1, 3, 4]
+    assert cuerpo['errores'][2]['error'] == 'Categoría no encontrada'
+
+    # Un único ajuste de capital para todo el lote
+    actualizaciones = [s for s in sentencias if s.lstrip().upper().startswith('UPDATE USUARIOS')]
+    assert len(actualizaciones) == 1
+
+    db.session.expire_all()
+    assert modelo.query.filter_by(usuario_id=usuario_id).count() == 2
+    signo = 1 if tipo == 'ingreso' else -1
+    assert Usuario.query.get(usuario_id).capital_actual == 1000.0 + signo * 120.5
+    resumen = {(2024, 1): 100.0, (2024, 2): 20.5}
+    assert _resumen(usuario_id) == {
+        mes: (total, 0.0) if tipo == 'ingreso' else (0.0, total) for mes, total in resumen.items()
+    }
+    categoria = Categoria.query.get(propia)
+    assert (categoria.usos_ingresos, categoria.usos_egresos) == ((1, 0) if tipo == 'ingreso' else (0, 1))
+    assert Categoria.query.get(ajena).usos_ingresos + Categoria.query.get(ajena).usos_egresos == 0
+
+
+@pytest.mark.parametrize('tipo, modelo, url, clave', LOTES)
+def test_lote_sin_filas_validas_responde_400(cliente, crear_usuario, tipo, modelo, url, clave):
+    usuario_id, encabezados = crear_usuario(capital=1000.0)
+    respuesta = cliente.post(url, headers=encabezados, json=[
+        {'monto': 10, 'descripcion': 'x', 'fecha': '2024-01-10'},  # falta categoria_id
+        'no es un objeto',
+    ])
+    assert respuesta.status_code == 400
+    assert [e['indice'] for e in respuesta.get_json()['errores']] == [0, 1]
+
+    db.session.expire_all()
+    assert modelo.query.count() == 0
+    assert Usuario.query.get(usuario_id).capital_actual == 1000.0
+    assert _resumen(usuario_id) == {}
+
+
+@pytest.mark.parametrize('tipo, modelo, url, clave', LOTES)
+def test_lote_que_supera_el_maximo_responde_413(cliente, crear_usuario, tipo, modelo, url, clave):
+    usuario_id, encabezados = crear_usuario(capital=1000.0)
+    fila = {'monto': 1, 'descripcion': 'x', 'fecha': '2024-01-10', 'categoria_id': id_categoria('Gastos Varios')}
+
+    respuesta = cliente.post(url, headers=encabezados, json=[fila] * 6)
+    assert respuesta.status_code == 413
+
+    db.session.expire_all()
+    assert modelo.query.count() == 0
+    assert Usuario.query.get(usuario_id).capital_actual == 1000.0
+
+    # Justo en el máximo se acepta
+    assert cliente.post(url, headers=encabezados, json=[fila] * 5).status_code == 201
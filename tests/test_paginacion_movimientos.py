@@ -0,0 +1,75 @@
+# tests/test_paginacion_movimientos.py
+from datetime import date
+import pytest
+from api.models import db, Ingreso, Egreso
+from api.cache_categorias import id_categoria
+from api.utils import codificar_cursor
+
+LISTADOS = [(Ingreso, '/ingresos/ingresos'), (Egreso, '/egresos/egresos')]
+
+
+def _movimientos(modelo, usuario_id):
+    # Varias filas por fecha (el desempate es el id) y dos categorías
+    comida, varios = id_categoria('Comida'), id_categoria('Gastos Varios')
+    for dia, cantidad in ((1, 2), (2, 4), (3, 1), (4, 3)):
+        for n in range(cantidad):
+            db.session.add(modelo(usuario_id=usuario_id, categoria_id=comida if n % 2 else varios,
+                                  monto=dia * 10 + n, descripcion=f'{dia}.{n}', fecha=date(2024, 5, dia)))
+    db.session.commit()
+
+
+def _recorrer(cliente, encabezados, url):
+    filas, separador = [], '&' if '?' in url else '?'
+    siguiente = url
+    while siguiente:
+        respuesta = cliente.get(siguiente, headers=encabezados)
+        assert respuesta.status_code == 200
+        filas.extend(respuesta.get_json())
+        cursor = respuesta.headers.get('X-Siguiente-Cursor')
+        siguiente = f'{url}{separador}cursor={cursor}' if cursor else None
+    return filas
+
+
+@pytest.mark.parametrize('modelo, url', LISTADOS)
+def test_cursor_recorre_los_empates_de_fecha(cliente, crear_usuario, modelo, url):
+    usuario_id, encabezados = crear_usuario()
+    otro_id, _ = crear_usuario('otro')
+    _movimientos(modelo, usuario_id)
+    _movimientos(modelo, otro_id)
+
+    completo = cliente.get(f'{url}?limite=500', headers=encabezados).get_json()
+    assert len(completo) == 10
+    assert {f['usuario_id'] for f in completo} == {usuario_id}
+    assert [(f['fecha'], f['id']) for f in completo] == sorted(((f['fecha'], f['id']) for f in completo), reverse=True)
+
+    # Páginas de 3: cortan dentro de las fechas con varias filas
+    paginas = _recorrer(cliente, encabezados, f'{url}?limite=3')
+    assert [f['id'] for f in paginas] == [f['id'] for f in completo]
+
+
+@pytest.mark.parametrize('modelo, url', LISTADOS)
+def test_filtros_por_fecha_y_categoria_con_cursor(cliente, crear_usuario, modelo, url):
+    usuario_id, encabezados = crear_usuario()
+    _movimientos(modelo, usuario_id)
+    comida = id_categoria('Comida')
+
+    filas = _recorrer(cliente, encabezados, f'{url}?limite=1&desde=2024-05-02&hasta=2024-05-03')
+    assert sorted(f['descripcion'] for f in filas) == ['2.0', '2.1', '2.2', '2.3', '3.0']
+
+    filas = _recorrer(cliente, encabezados, f'{url}?limite=2&categoria_id={comida}')
+    assert [f['descripcion'] for f in filas] == ['4.1', '2.3', '2.1', '1.1']
+
+
+@pytest.mark.parametrize('modelo, url', LISTADOS)
+@pytest.mark.parametrize('parametros', [
+    'cursor=no-es-base64!',
+    f"cursor={codificar_cursor('2024-05-01')}",  # falta el id
+    f"cursor={codificar_cursor('ayer', 3)}",
+    'limite=0',
+    'limite=muchos',
+    'desde=05/01/2024',
+])
+def test_parametros_invalidos_responden_400(cliente, crear_usuario, modelo, url, parametros):
+    _, encabezados = crear_usuario()
+    respuesta = cliente.get(f'{url}?{parametros}', headers=encabezados)
+    assert respuesta.status_code == 400
@@ -0,0 +1,50 @@
+# tests/test_particiones.py
+from datetime import date
+import pytest
+from api.particiones import es_particion, nombre_particion, sumar_meses, particionadas, _PATRON_PARTICION
+
+
+@pytest.mark.parametrize('mes, n, esperado', [
+    (date(2024, 5, 17), 0, date(2024, 5, 1)),
+    (date(2024, 5, 1), 1, date(2024, 6, 1)),
+    (date(2024, 11, 30), 2, date(2025, 1, 1)),
+    (date(2024, 12, 31), 1, date(2025, 1, 1)),
+    (date(2024, 1, 31), -1, date(2023, 12, 1)),
+    (date(2024, 3, 15), -15, date(2022, 12, 1)),
+    (date(2024, 3, 1), 24, date(2026, 3, 1)),
+])
+def test_sumar_meses(mes, n, esperado):
+    assert sumar_meses(mes, n) == esperado
+
+
+def test_nombre_particion():
+    assert nombre_particion('ingresos', date(2024, 3, 1)) == 'ingresos_p2024_03'
+    assert nombre_particion('egresos', date(2025, 12, 20)) == 'egresos_p2025_12'
+
+
+@pytest.mark.parametrize('nombre', [
+    'ingresos_p2024_03', 'egresos_p1999_12', 'ingresos_default', 'egresos_default',
+])
+def test_es_particion(nombre):
+    # Adjuntas y desacopladas tienen el mismo nombre
+    assert es_particion(nombre)
+
+
+@pytest.mark.parametrize('nombre', [
+    'ingresos', 'egresos', 'egresos_archivados', 'resumenes_mensuales', 'planes_ahorro',
+    'ingresos_p2024_3', 'ingresos_p24_03', 'ingresos_2024_03', 'egresos_p2024_03_viejo',
+    'otros_p2024_03', 'ingresos_default2', 'x_ingresos_p2024_03',
+])
+def test_no_es_particion(nombre):
+    assert not es_particion(nombre)
+
+
+def test_patron_extrae_el_mes():
+    # particiones() lee el año y el mes de los grupos; la default no tiene mes
+    coincidencia = _PATRON_PARTICION.match(nombre_particion('egresos', date(2024, 7, 1)))
+    assert coincidencia.groups() == ('egresos', '2024', '07')
+    assert _PATRON_PARTICION.match('ingresos_default').groups() == ('ingresos', None, None)
+
+
+def test_sin_postgresql_no_hay_particiones(app):
+    assert particionadas() is False
@@ -0,0 +1,68 @@
+# tests/test_pool_conexiones.py
+import pytest
+from api.pool_conexiones import _ajustar_statement_timeout
+
+
+class _Cursor:
+    def __init__(self, conexion):
+        self.conexion = conexion
+
+    def execute(self, sentencia):
+        self.conexion.sentencias.append(sentencia)
+
+    def close(self):
+        pass
+
+
+class _Conexion:
+    # Conexión DBAPI mínima: registra lo que se le envía
+    def __init__(self):
+        self.sentencias = []
+        self.commits = 0
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+
+class _Registro:
+    def __init__(self):
+        self.info = {}
+
+
+@pytest.fixture
+def configuracion(configuracion):
+    return dict(configuracion, DB_STATEMENT_TIMEOUT_MS=2000, METRICAS_CLAVE='secreta')
+
+
+def test_statement_timeout_solo_en_peticiones_web(app):
+    conexion, registro = _Conexion(), _Registro()
+
+    # Fuera de una petición (CLI, hilos en segundo plano): sin límite
+    _ajustar_statement_timeout(conexion, registro, None)
+    assert conexion.sentencias == ['SET statement_timeout = 0']
+
+    with app.test_request_context('/'):
+        _ajustar_statement_timeout(conexion, registro, None)
+        # Ya aplicado: no se repite
+        _ajustar_statement_timeout(conexion, registro, None)
+    assert conexion.sentencias[1:] == ['SET statement_timeout = 2000']
+
+    _ajustar_statement_timeout(conexion, registro, None)
+    assert conexion.sentencias[2:] == ['SET statement_timeout = 0']
+    assert conexion.commits == 3
+
+
+def test_metricas_exigen_la_clave(cliente):
+    assert cliente.get('/api/metricas/pool').status_code == 401
+    assert cliente.get('/api/metricas/pool', headers={'X-Metricas-Clave': 'otra'}).status_code == 401
+    respuesta = cliente.get('/api/metricas/pool', headers={'X-Metricas-Clave': 'secreta'})
+    assert respuesta.status_code == 200
+    assert 'principal' in respuesta.get_json()
+
+
+def test_metricas_no_existen_sin_clave_configurada(app, cliente):
+    app.config['METRICAS_CLAVE'] = None
+    assert cliente.get('/api/metricas/pool').status_code == 404
@@ -0,0 +1,42 @@
+# tests/test_presupuesto_sql.py
+import pytest
+from api.cache_categorias import invalidar_categorias
+
+
+@pytest.fixture
+def configuracion(configuracion):
+    # Estricto: exceder el presupuesto o repetir sentencias (N+1) hace fallar la petición
+    return dict(configuracion, SQL_PRESUPUESTO_ESTRICTO=True)
+
+
+def test_planes_de_ahorro_dentro_del_presupuesto_con_la_cache_fria(cliente, crear_usuario):
+    usuario_id, encabezados = crear_usuario(capital=1000.0)
+
+    # Cada ruta con la caché de categorías vacía (primera petición del
+    # worker o recién caducada): la consulta de categorías entra en el presupuesto
+    invalidar_categorias()
+    respuesta = cliente.post('/plandeahorro/agregarplan', headers=encabezados, json={
+        'nombre_plan': 'Vacaciones', 'monto_objetivo': 600, 'monto_inicial': 100,
+        'fecha_inicio': '2024-01-15', 'fecha_objetivo': '2024-12-31',
+    })
+    assert respuesta.status_code == 201, respuesta.get_data(as_text=True)
+    plan_id = respuesta.get_json()['nuevo_plan']['id']
+
+    for n in range(3):
+        invalidar_categorias()
+        respuesta = cliente.post('/plandeahorro/depositar', headers=encabezados, json={
+            'plan_id': plan_id, 'monto_ahorro': 50, 'fecha': f'2024-0{n + 2}-10',
+        })
+        assert respuesta.status_code == 201, respuesta.get_data(as_text=True)
+
+    for archivar in (False, True):
+        respuesta = cliente.post('/plandeahorro/agregarplan', headers=encabezados, json={
+            'nombre_plan': f'Plan {archivar}', 'monto_objetivo': 300, 'monto_inicial': 20,
+            'fecha_inicio': '2024-03-01', 'fecha_objetivo': '2024-09-30',
+        })
+        assert respuesta.status_code == 201, respuesta.get_data(as_text=True)
+        plan_id = respuesta.get_json()['nuevo_plan']['id']
+        invalidar_categorias()
+        respuesta = cliente.delete('/plandeahorro/eliminar_plan_ahorro', headers=encabezados,
+                                   json={'plan_ahorro_id': plan_id, 'archivar': archivar})
+        assert respuesta.status_code == 200, respuesta.get_data(as_text=True)
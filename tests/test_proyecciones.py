@@ -0,0 +1,48 @@
+# tests/test_proyecciones.py
+from datetime import date
+from api.proyecciones import proyectar
+
+HOY = date(2024, 6, 15)  # ventana de 12 meses: julio de 2023 a junio de 2024
+
+# (id, nombre_plan, monto_objetivo, monto_acumulado, monto_inicial, fecha_inicio, fecha_objetivo)
+PLANES = [
+    (1, 'viaje', 1000.0, 400.0, 100.0, date(2024, 4, 10), date(2024, 12, 31)),
+    (2, 'coche', 500.0, 170.0, 50.0, date(2023, 1, 15), date(2025, 6, 30)),
+    (3, 'fondo', 1000.0, 200.0, 200.0, date(2024, 6, 1), date(2025, 6, 1)),
+]
+
+DEPOSITOS = [
+    (1, date(2024, 4, 10), 100.0),  # depósito inicial
+    (1, date(2024, 4, 20), 100.0),
+    (1, date(2024, 5, 10), 100.0),
+    (1, date(2024, 6, 1), 100.0),
+    (2, date(2023, 1, 15), 50.0),  # depósito inicial, fuera de la ventana
+    (2, date(2024, 1, 5), 60.0),
+    (2, date(2024, 3, 5), 60.0),
+    (3, date(2024, 6, 1), 200.0),  # sólo el depósito inicial
+]
+
+
+def test_el_deposito_inicial_no_cuenta_como_aporte():
+    viaje, coche, fondo = proyectar(PLANES, DEPOSITOS, HOY)
+
+    # 300 en 3 meses (abril a junio); con el inicial serían 133.33
+    assert viaje['aporte_mensual'] == 100.0
+    assert viaje['restante'] == 600.0
+    assert viaje['porcentaje'] == 40.0
+    # 6 meses: ceil(6 * 30.436875) = 183 días
+    assert viaje['fecha_proyectada'] == date(2024, 12, 15)
+    # 600 / (199 días / 30.436875)
+    assert viaje['deposito_mensual_requerido'] == 91.77
+    assert viaje['en_camino'] is True
+
+    # Plan anterior a la ventana: 120 en 12 meses, su inicial ni se mira
+    assert coche['aporte_mensual'] == 10.0
+    # 33 meses: ceil(33 * 30.436875) = 1005 días
+    assert coche['fecha_proyectada'] == date(2027, 3, 17)
+    assert coche['en_camino'] is False
+
+    # Sólo el depósito inicial: sin aporte no hay fecha proyectada
+    assert fondo['aporte_mensual'] == 0.0
+    assert fondo['fecha_proyectada'] is None
+    assert fondo['en_camino'] is False
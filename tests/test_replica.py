@@ -0,0 +1,58 @@
+# tests/test_replica.py
+from datetime import date
+import pytest
+from api.models import db, Egreso
+from api.replica import BIND_REPLICA, EscriturasMemoria
+from api.cache_categorias import id_categoria
+
+
+@pytest.fixture
+def configuracion(configuracion, tmp_path):
+    # Primaria y réplica en dos archivos SQLite. La réplica no recibe nada
+    # de la primaria: una lectura que llegue a ella no ve las escrituras
+    return dict(configuracion, SQLALCHEMY_BINDS={BIND_REPLICA: f"sqlite:///{tmp_path / 'replica.db'}"},
+                REPLICA_ESCRITURAS_BACKEND='memoria', REPLICA_VENTANA_SEGUNDOS=30)
+
+
+@pytest.fixture
+def replica(app):
+    motor = db.get_engine(app, bind=BIND_REPLICA)
+    db.Model.metadata.create_all(motor)
+    yield motor
+    db.Model.metadata.drop_all(motor)
+
+
+def _egresos_en(motor, usuario_id):
+    return motor.execute(db.select([db.func.count()]).where(Egreso.__table__.c.usuario_id == usuario_id)).scalar()
+
+
+def test_lectura_tras_escribir_va_a_la_primaria(app, cliente, crear_usuario, replica):
+    usuario_id, encabezados = crear_usuario(capital=100.0)
+
+    respuesta = cliente.post('/egresos/agrega_egreso', headers=encabezados, json={
+        'monto': 30.0, 'descripcion': 'compra', 'fecha': '2024-05-10',
+        'usuario_id': usuario_id, 'categoria_id': id_categoria('Gastos Varios'),
+    })
+    assert respuesta.status_code == 201
+    # La escritura fue a la primaria
+    assert _egresos_en(db.get_engine(app), usuario_id) == 1
+    assert _egresos_en(replica, usuario_id) == 0
+
+    # Dentro de la ventana la lectura también va a la primaria
+    egresos = cliente.get('/egresos/egresos', headers=encabezados).get_json()
+    assert [e['descripcion'] for e in egresos] == ['compra']
+
+    # Pasada la ventana (registro vacío) se lee de la réplica, todavía atrasada
+    app.extensions['escrituras_recientes'] = EscriturasMemoria(30)
+    assert cliente.get('/egresos/egresos', headers=encabezados).get_json() == []
+
+
+def test_sin_registro_de_escrituras_se_lee_de_la_primaria(app, cliente, crear_usuario, replica):
+    usuario_id, encabezados = crear_usuario()
+    db.session.add(Egreso(usuario_id=usuario_id, categoria_id=id_categoria('Gastos Varios'), monto=5.0,
+                          descripcion='antiguo', fecha=date.today()))
+    db.session.commit()
+
+    app.extensions['escrituras_recientes'] = None
+    egresos = cliente.get('/egresos/egresos', headers=encabezados).get_json()
+    assert [e['descripcion'] for e in egresos] == ['antiguo']
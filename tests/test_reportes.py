@@ -0,0 +1,56 @@
+# tests/test_reportes.py
+from datetime import date
+from werkzeug.http import http_date
+from api.models import db, Ingreso, Egreso
+from api.cache_categorias import id_categoria
+
+
+def _movimientos(usuario_id):
+    # Varios ingresos y egresos con la misma fecha: el orden entre ellos lo
+    # deciden tipo e id, que es donde el cursor puede saltarse o repetir filas
+    categoria = id_categoria('Comida')
+    for dia, ingresos, egresos in ((3, 2, 3), (2, 3, 2), (1, 1, 1)):
+        fecha = date(2024, 5, dia)
+        for n in range(ingresos):
+            db.session.add(Ingreso(usuario_id=usuario_id, categoria_id=categoria, monto=10 + n,
+                                   descripcion=f'ingreso {dia}.{n}', fecha=fecha))
+        for n in range(egresos):
+            db.session.add(Egreso(usuario_id=usuario_id, categoria_id=categoria, monto=20 + n,
+                                  descripcion=f'egreso {dia}.{n}', fecha=fecha))
+    db.session.commit()
+
+
+def test_reportes_sin_paginar_mantiene_la_respuesta_anterior(cliente, crear_usuario):
+    usuario_id, encabezados = crear_usuario()
+    _movimientos(usuario_id)
+
+    respuesta = cliente.get('/usuarios/reportes', headers=encabezados)
+    assert respuesta.status_code == 200
+    assert 'X-Siguiente-Cursor' not in respuesta.headers
+    reportes = respuesta.get_json()
+    assert len(reportes) == 12
+    assert reportes[0]['fecha'] == http_date(date(2024, 5, 3).timetuple())
+    assert reportes[-1]['fecha'] == http_date(date(2024, 5, 1).timetuple())
+
+
+def test_cursor_recorre_el_desempate_entre_ingresos_y_egresos(cliente, crear_usuario):
+    usuario_id, encabezados = crear_usuario()
+    _movimientos(usuario_id)
+
+    completo = [(r['tipo'], r['id']) for r in cliente.get(
+        '/usuarios/reportes?limite=500', headers=encabezados).get_json()]
+    assert len(completo) == 12
+
+    # Páginas de 2 filas: cortan dentro de cada fecha y entre ingreso y egreso
+    paginas, url = [], '/usuarios/reportes?limite=2'
+    while url:
+        respuesta = cliente.get(url, headers=encabezados)
+        assert respuesta.status_code == 200
+        paginas.extend((r['tipo'], r['id']) for r in respuesta.get_json())
+        cursor = respuesta.headers.get('X-Siguiente-Cursor')
+        url = f'/usuarios/reportes?limite=2&cursor={cursor}' if cursor else None
+
+    assert paginas == completo
+    assert len(set(paginas)) == 12
+    fechas = [r['fecha'] for r in cliente.get('/usuarios/reportes?limite=500', headers=encabezados).get_json()]
+    assert fechas == sorted(fechas, reverse=True)
@@ -0,0 +1,51 @@
+# tests/test_suscripciones.py
+from datetime import date, timedelta
+import pytest
+from api.models import db, Categoria, Egreso, Suscripcion
+from api.cache_categorias import invalidar_categorias
+from api.facturacion import facturar_suscripciones
+
+
+def _crear(cliente, encabezados, fecha_inicio):
+    respuesta = cliente.post('/suscripciones/suscripcion', headers=encabezados, json={
+        'nombre': 'Música', 'costo': 9.99, 'frecuencia': 'mensual', 'fecha_inicio': fecha_inicio.isoformat(),
+    })
+    assert respuesta.status_code == 201
+    return respuesta.get_json()['suscripcion']['id']
+
+
+def test_el_pago_manual_solo_cubre_el_periodo_vencido(cliente, crear_usuario):
+    usuario_id, encabezados = crear_usuario(capital=100.0)
+    hoy = date.today()
+    suscripcion_id = _crear(cliente, encabezados, hoy)
+    assert Suscripcion.query.get(suscripcion_id).proximo_cobro == hoy
+
+    respuesta = cliente.post('/suscripciones/suscripcion/pagar', headers=encabezados, json={'id': suscripcion_id})
+    assert respuesta.status_code == 201
+    proximo = Suscripcion.query.get(suscripcion_id).proximo_cobro
+    assert proximo > hoy
+
+    # El siguiente periodo todavía no vence: no se adelanta ni se cobra
+    respuesta = cliente.post('/suscripciones/suscripcion/pagar', headers=encabezados, json={'id': suscripcion_id})
+    assert respuesta.status_code == 409
+    assert respuesta.get_json()['proximo_cobro'] == proximo.isoformat()
+    db.session.expire_all()
+    assert Suscripcion.query.get(suscripcion_id).proximo_cobro == proximo
+    assert Egreso.query.filter_by(usuario_id=usuario_id).count() == 1
+
+
+def test_facturar_sin_categoria_suscripciones_falla_con_un_mensaje_claro(app, cliente, crear_usuario):
+    usuario_id, encabezados = crear_usuario(capital=100.0)
+    _crear(cliente, encabezados, date.today() - timedelta(days=1))
+    Suscripcion.query.update({'proximo_cobro': date.today() - timedelta(days=1)})
+    Categoria.query.filter_by(nombre='Suscripciones').delete()
+    db.session.commit()
+    invalidar_categorias()
+
+    with pytest.raises(RuntimeError, match="'Suscripciones'"):
+        facturar_suscripciones(date.today())
+
+    resultado = app.test_cli_runner().invoke(args=['facturar-suscripciones'])
+    assert resultado.exit_code != 0
+    assert "No existe la categoría predeterminada 'Suscripciones'" in resultado.output
+    assert Egreso.query.filter_by(usuario_id=usuario_id).count() == 0
@@ -0,0 +1,43 @@
+# tests/test_totales.py
+import pytest
+from api.models import db, Usuario
+from api.cache_categorias import id_categoria
+from api.datos_prueba import sembrar
+
+
+def _suma_en_python(usuario):
+    # Cálculo anterior de calcular_totales: todas las entidades del usuario
+    return sum(i.monto for i in usuario.ingresos), sum(e.monto for e in usuario.egresos)
+
+
+def test_calcular_totales_coincide_con_la_suma_de_los_movimientos(app, cliente, crear_usuario):
+    sembrar(3, meses=4, movimientos_por_mes=15, semilla=7)
+    usuario_id, encabezados = crear_usuario(capital=1000.0)
+    categoria = id_categoria('Gastos Varios')
+
+    # Escrituras por las rutas: individual, en lote y un plan con depósito inicial
+    movimiento = {'descripcion': 'x', 'usuario_id': usuario_id, 'categoria_id': categoria}
+    assert cliente.post('/ingresos/ingreso', headers=encabezados,
+                        json=dict(movimiento, monto=300.0, fecha='2024-02-10')).status_code == 201
+    assert cliente.post('/egresos/agrega_egreso', headers=encabezados,
+                        json=dict(movimiento, monto=45.5, fecha='2024-03-01')).status_code == 201
+    assert cliente.post('/egresos/lote', headers=encabezados, json=[
+        dict(movimiento, monto=10.25, fecha='2023-12-31'), dict(movimiento, monto=4.0, fecha='2024-03-15'),
+    ]).status_code == 201
+    assert cliente.post('/plandeahorro/agregarplan', headers=encabezados, json={
+        'nombre_plan': 'viaje', 'monto_objetivo': 500, 'monto_inicial': 50,
+        'fecha_inicio': '2024-01-05', 'fecha_objetivo': '2025-01-01'}).status_code == 201
+
+    db.session.expire_all()
+    usuarios = Usuario.query.all()
+    assert len(usuarios) == 4
+    for usuario in usuarios:
+        totales = usuario.calcular_totales()
+        ingresos, egresos = _suma_en_python(usuario)
+        assert totales['total_ingresos'] == pytest.approx(ingresos)
+        assert totales['total_egresos'] == pytest.approx(egresos)
+
+    totales = cliente.get('/usuarios/totales', headers=encabezados).get_json()
+    assert totales['total_ingresos'] == 300.0
+    assert totales['total_egresos'] == 109.75
+    assert totales['capital_actual'] == 1190.25
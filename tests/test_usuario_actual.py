@@ -0,0 +1,14 @@
+# tests/test_usuario_actual.py
+
+
+def test_peticiones_seguidas_de_dos_usuarios_no_comparten_el_usuario(cliente, crear_usuario):
+    # El fixture `app` deja abierto un contexto de aplicación: todas las
+    # peticiones del test comparten el mismo `g`
+    _, encabezados_a = crear_usuario('ana', capital=100.0)
+    _, encabezados_b = crear_usuario('beto', capital=250.0)
+
+    for encabezados, capital in ((encabezados_a, 100.0), (encabezados_b, 250.0), (encabezados_a, 100.0)):
+        totales = cliente.get('/usuarios/totales', headers=encabezados).get_json()
+        assert totales['capital_actual'] == capital
+        planes = cliente.get('/plandeahorro/traerplan', headers=encabezados).get_json()
+        assert planes['capital_actual'] == capital